@@ -0,0 +1,274 @@
+"""Resident agent: warm, signed-in Chrome sessions serving jobs over a Unix socket.
+
+Every ``amazon_agent.py`` run pays for the imports, the chromedriver lookup,
+Chrome's start-up and the login before its first search, and keeps the
+browser open for ``inspect_seconds`` afterwards. ``agent_daemon.py serve``
+pays for them once: it launches ``--sessions`` browsers, signs them in (one
+login, the others get its session injected: see ``session_broker``) and
+keeps them idle on the home page. Each connection to the socket carries one
+request, a JSON line with the fields of a batch job (``query``, any Config
+field, ``add``, ``checkout``), and gets JSON lines back: ``"results"`` as soon
+as the results page is parsed and ranked, then ``"done"`` with the outcome of
+the adds and the checkout::
+
+    python agent_daemon.py serve --sessions 2 &
+    python agent_daemon.py search laptop --price-max 60000
+    python agent_daemon.py submit '{"query": "backpack", "add": true}'
+    python agent_daemon.py status
+    python agent_daemon.py stop
+
+Jobs run on whichever session is idle and wait for one otherwise; a session
+that dies is replaced in the background. The client commands only talk to
+the socket: no browser, driver lookup or login is involved.
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import amazon_agent as agent
+import batch
+
+SOCKET_PATH = ".amazon_agent.sock"
+# Seconds a job waits for an idle session (or for one to be launched) before it fails
+ACQUIRE_TIMEOUT = 180
+
+
+class AgentDaemon:
+    """``sessions`` warm browsers behind the Unix socket ``socket_path``; results keep the ``top`` choices."""
+
+    def __init__(self, config, sessions=2, socket_path=SOCKET_PATH, top=5):
+        self.config = config
+        self.sessions = max(1, int(sessions))
+        self.socket_path = socket_path
+        # the batch runner's session start-up and job steps, without its job queue
+        self.runner = batch.BatchRunner(config, sessions=self.sessions, top=top, quiet=False)
+        self.idle = queue.Queue()
+        self.drivers = set()
+        self.starting = 0
+        self.stats = {"jobs": 0, "ok": 0, "failed": 0, "launched": 0, "launch_errors": 0, "started": time.time()}
+        self.server = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # --- sessions ---
+    def _warm(self):
+        """Launch and sign in one session and park it as idle (runs on its own thread)."""
+        try:
+            driver = self.runner._start_session()
+            if not self.config.email:
+                # a signed-in session is already on the home page; the search box is what search() needs
+                driver.get(self.config.base_url + "/")
+        except Exception as e:
+            print(f"❌ Could not start a browser session: {type(e).__name__}: {e}")
+            with self._lock:
+                self.starting -= 1
+                self.stats["launch_errors"] += 1
+            return
+        with self._lock:
+            self.starting -= 1
+            self.stats["launched"] += 1
+            self.drivers.add(driver)
+        self.idle.put(driver)
+        print(f"🔥 Session ready ({len(self.drivers)}/{self.sessions}).")
+
+    def _launch(self):
+        """Start a session in the background if fewer than ``sessions`` are running or starting."""
+        with self._lock:
+            if len(self.drivers) + self.starting >= self.sessions:
+                return
+            self.starting += 1
+        threading.Thread(target=self._warm, name="warm-session", daemon=True).start()
+
+    def _acquire(self):
+        if self.idle.empty():
+            # replaces sessions that failed to launch or died, once something needs them
+            self._launch()
+        try:
+            return self.idle.get(timeout=ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError(f"no browser session became available within {ACQUIRE_TIMEOUT}s") from None
+
+    def _release(self, driver):
+        if batch._alive(driver):
+            self.idle.put(driver)
+            return
+        batch._quit(driver)
+        with self._lock:
+            self.drivers.discard(driver)
+        self._launch()
+
+    # --- requests ---
+    def handle(self, request, send):
+        """Answer one request (a job, or ``{"op": "status" | "stop"}``) through ``send(dict)``."""
+        op = request.pop("op", "job")
+        if op == "status":
+            send(dict(self.status(), event="status"))
+            return
+        if op == "stop":
+            send({"event": "stopping"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if op != "job":
+            raise ValueError(f"unknown op {op!r}")
+        job = batch.make_job(request, f"d{next(self._ids)}")
+        t0 = time.perf_counter()
+        driver = self._acquire()
+        queued = round(time.perf_counter() - t0, 3)
+        try:
+            result = self.runner.run_job(driver, job, progress=lambda r: send(dict(r, event="results", queued=queued)))
+        except Exception as e:
+            result = self.runner.failure(driver, job, e, t0)
+        finally:
+            self._release(driver)
+        with self._lock:
+            self.stats["jobs"] += 1
+            self.stats["ok" if result["status"] == "ok" else "failed"] += 1
+        send(dict(result, event="done", queued=queued))
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, sessions=len(self.drivers), idle=self.idle.qsize(), starting=self.starting,
+                        uptime=round(time.time() - self.stats["started"], 1))
+
+    # --- server ---
+    def serve(self):
+        """Warm the sessions and answer requests until ``stop``, SIGTERM or Ctrl-C."""
+        if os.path.exists(self.socket_path):
+            if _answers(self.socket_path):
+                raise SystemExit(f"An agent daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)  # left over from a daemon that did not shut down cleanly
+        # the signed-in sessions are reachable through the socket: it is created for this user only
+        umask = os.umask(0o177)
+        try:
+            self.server = _Server(self.socket_path, _Handler)
+        finally:
+            os.umask(umask)
+        self.server.agent = self
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=self.server.shutdown, daemon=True).start())
+        for _ in range(self.sessions):
+            self._launch()
+        print(f"🟢 Agent daemon listening on {self.socket_path} ({self.sessions} session(s) warming up).")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        with self._lock:
+            drivers, self.drivers = list(self.drivers), set()
+        for driver in drivers:
+            batch._quit(driver)
+        print("👋 Agent daemon stopped.")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        connected = [True]
+
+        def send(obj):
+            # a client that went away does not stop the job it started
+            if not connected[0]:
+                return
+            try:
+                self.wfile.write((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                connected[0] = False
+
+        try:
+            request = json.loads(self.rfile.readline() or b"null")
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+            self.server.agent.handle(request, send)
+        except Exception as e:
+            send({"event": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+# --- client ---
+def request(payload, socket_path=SOCKET_PATH, timeout=None):
+    """Send one request to the daemon and yield the JSON objects it answers with."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as answers:
+            for line in answers:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _answers(socket_path):
+    try:
+        return any(True for _ in request({"op": "status"}, socket_path, timeout=2))
+    except OSError:
+        return False
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Keep warm agent browser sessions and run jobs sent over a Unix socket")
+    ap.add_argument("--socket", default=SOCKET_PATH, help="path of the daemon's Unix socket")
+    sub = ap.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="start the daemon")
+    serve.add_argument("--sessions", type=int, default=2, help="warm browser sessions to keep")
+    serve.add_argument("--top", type=int, default=5, help="top results returned per job")
+    search = sub.add_parser("search", help="run one search job")
+    search.add_argument("query")
+    search.add_argument("--price-min", type=int)
+    search.add_argument("--price-max", type=int)
+    search.add_argument("--min-rating", type=float)
+    search.add_argument("--add", action="store_true", help="add the best results to the cart")
+    search.add_argument("--checkout", action="store_true", help="then proceed to checkout (stops before payment)")
+    submit = sub.add_parser("submit", help="send a job given as JSON (batch job fields)")
+    submit.add_argument("job")
+    sub.add_parser("status", help="show the daemon's sessions and counters")
+    sub.add_parser("stop", help="stop the daemon")
+    args = ap.parse_args()
+
+    if args.command == "serve":
+        AgentDaemon(agent.configure(headless=True), sessions=args.sessions, socket_path=args.socket,
+                    top=args.top).serve()
+        return
+    if args.command == "search":
+        payload = {"query": args.query, "price_min": args.price_min, "price_max": args.price_max,
+                   "min_rating": args.min_rating, "add": args.add, "checkout": args.checkout}
+        payload = {k: v for k, v in payload.items() if v not in (None, False)}
+    elif args.command == "submit":
+        payload = json.loads(args.job)
+    else:
+        payload = {"op": args.command}
+    failed = False
+    try:
+        for answer in request(payload, args.socket):
+            print(json.dumps(answer, ensure_ascii=False), flush=True)
+            failed = failed or answer.get("event") == "error" or answer.get("status") == "error"
+    except OSError as e:
+        print(f"❌ No agent daemon on {args.socket} ({e}); start one with: python agent_daemon.py serve",
+              file=sys.stderr)
+        sys.exit(2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,189 @@
+"""Amazon shopping agent: log in, search, filter, add to cart and go to checkout.
+
+Run it as a script (``python amazon_agent.py``) or import it and drive the
+stages yourself::
+
+    import amazon_agent as agent
+
+    config = agent.configure(search_item="laptop", price_max=60000)
+    driver = agent.launch_browser(config)
+    agent.login(driver, config)
+    agent.search(driver, config)
+    records, choices = agent.extract(driver, config)
+    added = agent.add_to_cart(driver, config, records, choices)
+    agent.checkout(driver, config)
+
+Importing the module has no side effects. Selenium, webdriver_manager and
+python-dotenv are only imported by the stages that need them, so the parsing
+and filtering code (``extraction``) stays cheap to import.
+"""
+import collections
+import contextlib
+import itertools
 import os
-import random
 import re
+import sys
+import threading
 import time
+import traceback
 import logging
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from urllib.parse import urlencode, urlsplit
+
+import flow
+import tracing
+from backend import SeleniumBackend, open_backend
+from catalog import Catalog
+from extraction import extract_products_js, iter_filtered, iter_search_results, parse_cart
+from flight_recorder import FlightRecorder
+from governor import Blocked, Governor
+from lean import DEFAULT_BLOCKLIST, apply_lean_options, block_urls, parse_blocklist
+from parallel_search import ParallelSearch, make_headless_driver, merge_pages, search_url
+from record_sink import RecordSink
+from selector_registry import SelectorRegistry, selector_key
+from session_broker import SessionBroker
+from session_cache import SessionCache
+from spatial import GridIndex
+from tracing import Tracer, traced
+from waits import arm_cart_watch, wait_cart_confirmation, scroll_into_view, wait_for_dom_quiet, wait_for_first
+
+PRODUCT_XPATH = "//div[contains(@class,'s-result-item') and normalize-space(@data-asin)!='']"
+# [[asin, rect], ...] for arguments[0] and [rect, ...] for arguments[1]; rect = [left, top, width, height]
+# in page coordinates, or null for detached nodes
+_RECTS_JS = """
+function rect(el) {
+  try {
+    var r = el.getBoundingClientRect();
+    return [r.left + window.scrollX, r.top + window.scrollY, r.width, r.height];
+  } catch (e) { return null; }
+}
+return {
+  products: arguments[0].map(function (p) { return [p.getAttribute('data-asin') || '', rect(p)]; }),
+  candidates: arguments[1].map(rect)
+};
+"""
+# Text scan for the diagnostic: walks the text nodes once (TreeWalker), lowercasing each
+# once, and returns {total, matches: [[element, asin, snippet], ...]} for at most arguments[1]
+# matches. The element is the innermost clickable ancestor of the matching text; text with
+# no such ancestor, inside script / style / noscript / template, or in an element that is
+# not rendered (zero-size box) is skipped. Input buttons are matched on their value.
+# Snippets are outerHTML cut to arguments[2] characters.
+_ADD_TEXT_SCAN_JS = r"""
+var phrase = arguments[0], cap = arguments[1], chars = arguments[2];
+var seen = new Set(), out = [], total = 0;
+var SKIP = {SCRIPT: 1, STYLE: 1, NOSCRIPT: 1, TEMPLATE: 1};
+function add(el) {
+  var target = el.closest('button, a, input, [role="button"]');
+  if (!target || seen.has(target)) return;
+  var r = target.getBoundingClientRect();
+  if (r.width === 0 || r.height === 0) return;
+  seen.add(target);
+  total++;
+  if (out.length >= cap) return;
+  var box = target.closest('div.s-result-item[data-asin]:not([data-asin=""])') ||
+            target.closest('[data-asin]:not([data-asin=""])');
+  var html = target.outerHTML;
+  out.push([target, box ? box.getAttribute('data-asin') : null,
+            html.length > chars ? html.slice(0, chars) + '<!-- truncated -->' : html]);
+}
+var root = document.body || document.documentElement;
+var walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT), node;
+while ((node = walker.nextNode())) {
+  if (node.data.length >= phrase.length && node.parentElement && !SKIP[node.parentElement.tagName] &&
+      node.data.toLowerCase().indexOf(phrase) >= 0) add(node.parentElement);
+}
+var inputs = root.querySelectorAll('input[type="submit"][value], input[type="button"][value]');
+for (var i = 0; i < inputs.length; i++) {
+  if (inputs[i].value.toLowerCase().indexOf(phrase) >= 0) add(inputs[i]);
+}
+return {total: total, matches: out};
+"""
+# The diagnostic keeps (and hands the flight recorder) at most this many matches, each cut to this many characters
+DIAGNOSTIC_MAX_MATCHES = 200
+DIAGNOSTIC_SNIPPET_CHARS = 2000
+# Seconds to wait for the cart badge / confirmation after an add click
+ADD_CONFIRM_TIMEOUT = 12
+
+_registries = {}
+_registries_lock = threading.Lock()
+_catalogs = {}
+_sinks = {}
+_recorders = {}
+_governors = {}
+_brokers = {}
+_driver_paths = {}
+
+
+class LoginError(Exception):
+    """Raised when neither the cached session nor the password flow signs us in."""
+
+
+@dataclass
+class Config:
+    email: str = None
+    password: str = None
+    search_item: str = "laptop"
+    price_min: int = None
+    price_max: int = None
+    min_rating: float = None
+    max_products: int = 2  # Agent can decide how many to add
+    # How choices are ordered for adding: value (rating-weighted price), rating, cheapest, page
+    rank_by: str = "value"
+    # Site to drive, e.g. https://www.amazon.in (AMAZON_DOMAIN in .env)
+    base_url: str = "https://www.amazon.in"
+    # openid.assoc_handle of the sign-in page; locale specific ("inflex" for amazon.in)
+    assoc_handle: str = "inflex"
+    headless: bool = False
+    # Browser backend: selenium (full flow), or cdp / fake running the portable flow (see flow.py)
+    backend: str = "selenium"
+    # Lean profile: headless, eager page loads, and no images/fonts/media/ad scripts (block_urls)
+    lean: bool = False
+    block_urls: tuple = DEFAULT_BLOCKLIST
+    timeout: float = 20
+    # "snapshot": parse driver.page_source in Python; "js": one in-browser execute_script
+    extract_mode: str = "snapshot"
+    # Result pages to read per query; pages after the first are fetched by a pool of headless workers
+    search_pages: int = 1
+    search_workers: int = 4
+    # Stream qualifying results straight into the add stage, stopping the search once
+    # max_products are taken (listing order instead of rank_by)
+    stream: bool = False
+    # Append every parsed result to this JSONL file as it is parsed (empty to disable)
+    records_file: str = ""
+    # Local store of result pages by query (SQLite); pages younger than the TTL are not re-fetched
+    catalog: str = ".catalog.sqlite3"
+    catalog_ttl_hours: float = 6
+    # Saved cookies/localStorage from the last successful login (empty to disable)
+    session_cache: str = ".amazon_session.json"
+    session_ttl_hours: float = 12
+    # "browser": click the add buttons; "http": POST the add-to-cart forms with the browser's cookies
+    add_mode: str = "browser"
+    # Product pages loaded at once (one tab each) when adding from product pages
+    product_tabs: int = 4
+    http_concurrency: int = 4
+    # "each": wait for every add's own confirmation; "batch": click back to back, then check the cart once
+    add_confirm: str = "each"
+    # Page loads per second across every session of the process (and of other processes sharing
+    # rate_file), lowered and raised again as the site throttles (see governor.py); 0 disables
+    rate_limit: float = 2.0
+    rate_file: str = ".rate_limit.json"
+    # Reloads of a page that came back as a CAPTCHA / throttling page (each after the back-off)
+    block_retries: int = 2
+    # Show a browser alert on the checkout page and wait for the user to dismiss it
+    payment_alert: bool = True
+    # Seconds to keep the browser open at the end of a CLI run
+    inspect_seconds: float = 60
+    # Path of the chromedriver webdriver_manager resolved last time, reused without a lookup (empty to disable)
+    chromedriver_cache: str = ".chromedriver_path"
+    # Hit/miss statistics used to try the selectors that worked before first (empty: in memory only)
+    selector_stats: str = ".selector_stats.json"
+    # Write a Chrome trace of every WebDriver command here and print a summary (empty to disable)
+    trace: str = ""
+    # Keep recent commands and page snapshots in memory (capped at flight_recorder_mb, compressed)
+    # and write them here only when a stage fails or a CAPTCHA shows up (empty to disable)
+    flight_recorder: str = "flight_recordings"
+    flight_recorder_mb: float = 8
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-# --- Load Environment Variables ---
-load_dotenv()
-
-# --- CONFIG ---
-EMAIL = os.getenv("AMAZON_EMAIL")
-PASSWORD = os.getenv("AMAZON_PASSWORD")
-SEARCH_ITEM = os.getenv("PRODUCT_TO_SEARCH", "laptop")
-MAX_PRODUCTS = 2  # Agent can decide how many to add
-
-# --- Interactive prompts (move before launching Chrome to avoid chromedriver/stdout noise) ---
-default_search = os.environ.get("PRODUCT_TO_SEARCH", SEARCH_ITEM)
-try:
-    user_input = input(f"Product to search: ").strip()
-except Exception:
-    user_input = ""
-SEARCH_ITEM = user_input if user_input else default_search
 
 def _parse_int_safe(s):
     if s is None or s == "":
@@ -51,40 +205,245 @@ def _parse_float_safe(s):
     except Exception:
         return None
 
-try:
-    pmin = input("Min price (leave blank for no min): ").strip()
-except Exception:
-    pmin = ""
-PRICE_MIN = _parse_int_safe(pmin)
+def _prompt(text):
+    try:
+        return input(text).strip()
+    except Exception:
+        return ""
+
+def selector_registry(config):
+    """The SelectorRegistry for config.selector_stats, shared by every stage of the process."""
+    path = config.selector_stats or None
+    # batch sessions and daemon jobs ask for it from several threads at once
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = SelectorRegistry(path)
+        return _registries[path]
+
+def find_first(driver, registry, page, selectors, timeout, root=None, asin=""):
+    """Race ``selectors`` (best-ranked first) in one browser-side wait and record the outcome.
+
+    Selectors are ``(by, value[, clickable[, tier]])``; they are ranked only
+    within their tier (default 0), so generic fallbacks in a higher tier stay
+    behind the specific ones. Selectors containing ``{asin}`` are filled in
+    with ``asin`` (skipped if empty). Returns the first matching element, or
+    None after ``timeout``.
+    """
+    ranked = [sel for sel in registry.rank(page, selectors, tier=lambda sel: sel[3] if len(sel) > 3 else 0)
+              if asin or "{asin}" not in sel[1]]
+    if not ranked:
+        return None
+    locators = [(sel[0], sel[1].replace("{asin}", asin)) + tuple(sel[2:3]) for sel in ranked]
+    res = wait_for_first(driver, locators, timeout=timeout, root=root)
+    # the winner is a hit and the better-ranked ones that lost are misses; the rest were never
+    # needed, and other matches of a broad selector say nothing about whether it finds the right control
+    won = res["index"]
+    tried = ranked[:won + 1] if won >= 0 else ranked
+    for i, sel in enumerate(tried):
+        registry.record(page, selector_key(sel[0], sel[1]), i == won, res.get("ms", 0) / 1000)
+    return res["element"] if won >= 0 else None
+
+def open_catalog(config):
+    """The Catalog at config.catalog (opened once per process), or None when disabled."""
+    if not config.catalog:
+        return None
+    if config.catalog not in _catalogs:
+        _catalogs[config.catalog] = Catalog(config.catalog, ttl=config.catalog_ttl_hours * 3600)
+    return _catalogs[config.catalog]
+
+def record_sink(config):
+    """The RecordSink for config.records_file (opened once per process; counts only when unset)."""
+    if config.records_file not in _sinks:
+        _sinks[config.records_file] = RecordSink(config.records_file or None)
+    return _sinks[config.records_file]
+
+def flight_recorder(config):
+    """The FlightRecorder writing to config.flight_recorder (one per process), or None when disabled."""
+    if not config.flight_recorder:
+        return None
+    if config.flight_recorder not in _recorders:
+        _recorders[config.flight_recorder] = FlightRecorder(config.flight_recorder,
+                                                            max_bytes=int(config.flight_recorder_mb * (1 << 20)))
+    return _recorders[config.flight_recorder]
+
+def session_broker(config):
+    """The SessionBroker signing config.email in once for every browser of the process."""
+    key = (config.base_url, config.email, config.session_cache)
+    if key not in _brokers:
+        cache = SessionCache(config.session_cache, ttl=config.session_ttl_hours * 3600) if config.session_cache else None
+        _brokers[key] = SessionBroker(config.base_url, login=lambda driver: sign_in(driver, config), cache=cache)
+    return _brokers[key]
+
+def governor(config):
+    """The Governor pacing page loads at config.rate_limit (one per process), or None when disabled."""
+    if not config.rate_limit or config.rate_limit <= 0:
+        return None
+    key = (config.rate_file, config.rate_limit)
+    if key not in _governors:
+        _governors[key] = Governor(max_rate=config.rate_limit, path=config.rate_file or None,
+                                   max_concurrency=max(config.search_workers, config.product_tabs,
+                                                       config.http_concurrency))
+    return _governors[key]
+
+def page_verdict(driver, config):
+    """After a stage failed: is the open page a CAPTCHA / throttling page? Backs off if so (``flow.page_verdict``)."""
+    return flow.page_verdict(SeleniumBackend(driver), config)
+
+def checked_source(driver, config, reload_url, what="page"):
+    """``(html, url)`` of the open page, reloading ``reload_url`` while it is a CAPTCHA / throttling page.
+
+    Each reload waits out the governor's back-off; after config.block_retries
+    of them raises Blocked. Without a governor the page is returned as is.
+    """
+    gov = governor(config)
+    for attempt in itertools.count():
+        html, url = driver.page_source, driver.current_url
+        if gov is None:
+            return html, url
+        verdict = gov.observe(html, url)
+        if verdict == "ok":
+            return html, url
+        if attempt >= config.block_retries:
+            raise Blocked(f"The {what} is still a {verdict} page after {attempt} reload(s)")
+        print(f"🚦 The {what} came back as a {verdict} page; reloading ({attempt + 1}/{config.block_retries})...")
+        driver.get(reload_url)
+
+def failed_stage(error):
+    """Name of the innermost stage function (this module or ``flow``) in ``error``'s traceback."""
+    frames = [f for f in traceback.extract_tb(error.__traceback__)
+              if os.path.basename(f.filename) in ("amazon_agent.py", "flow.py")]
+    return frames[-1].name if frames else "run"
+
+def _save_registry(registry):
+    try:
+        registry.save()
+    except Exception as e:
+        print(f"⚠️ Could not save selector statistics: {e}")
 
-try:
-    pmax = input("Max price (leave blank for no max): ").strip()
-except Exception:
-    pmax = ""
-PRICE_MAX = _parse_int_safe(pmax)
 
-try:
-    rmin = input("Minimum rating (e.g. 4.0) (leave blank for no min): ").strip()
-except Exception:
-    rmin = ""
-MIN_RATING = _parse_float_safe(rmin)
+# --- CONFIG ---
+def configure(interactive=False, **overrides):
+    """Build a Config from .env / environment, optional stdin prompts and keyword overrides."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    domain = os.getenv("AMAZON_DOMAIN", "www.amazon.in").strip()
+    config = Config(
+        email=os.getenv("AMAZON_EMAIL"),
+        password=os.getenv("AMAZON_PASSWORD"),
+        search_item=os.getenv("PRODUCT_TO_SEARCH", "laptop"),
+        rank_by=os.getenv("RANK_BY", "value").strip().lower(),
+        base_url=domain if "://" in domain else f"https://{domain}",
+        assoc_handle=os.getenv("AMAZON_ASSOC_HANDLE", "inflex"),
+        headless=os.getenv("HEADLESS", "false").strip().lower() in ("1", "true", "yes"),
+        backend=os.getenv("BACKEND", "selenium").strip().lower(),
+        lean=os.getenv("LEAN", "false").strip().lower() in ("1", "true", "yes"),
+        block_urls=parse_blocklist(os.getenv("BLOCK_URLS")),
+        extract_mode=os.getenv("EXTRACT_MODE", "snapshot").strip().lower(),
+        search_pages=max(1, int(os.getenv("SEARCH_PAGES", "1"))),
+        search_workers=max(1, int(os.getenv("SEARCH_WORKERS", "4"))),
+        stream=os.getenv("STREAM", "false").strip().lower() in ("1", "true", "yes"),
+        records_file=os.getenv("RECORDS_FILE", "").strip(),
+        catalog=os.getenv("CATALOG", ".catalog.sqlite3").strip(),
+        catalog_ttl_hours=float(os.getenv("CATALOG_TTL_HOURS", "6")),
+        session_cache=os.getenv("SESSION_CACHE", ".amazon_session.json").strip(),
+        session_ttl_hours=float(os.getenv("SESSION_TTL_HOURS", "12")),
+        add_mode=os.getenv("ADD_MODE", "browser").strip().lower(),
+        product_tabs=max(1, int(os.getenv("PRODUCT_TABS", "4"))),
+        http_concurrency=max(1, int(os.getenv("HTTP_CONCURRENCY", "4"))),
+        add_confirm=os.getenv("ADD_CONFIRM", "each").strip().lower(),
+        rate_limit=float(os.getenv("RATE_LIMIT", "2")),
+        rate_file=os.getenv("RATE_FILE", ".rate_limit.json").strip(),
+        block_retries=max(0, int(os.getenv("BLOCK_RETRIES", "2"))),
+        chromedriver_cache=os.getenv("CHROMEDRIVER_CACHE", ".chromedriver_path").strip(),
+        selector_stats=os.getenv("SELECTOR_STATS", ".selector_stats.json").strip(),
+        trace=os.getenv("TRACE_FILE", "").strip(),
+        flight_recorder=os.getenv("FLIGHT_RECORDER", "flight_recordings").strip(),
+        flight_recorder_mb=float(os.getenv("FLIGHT_RECORDER_MB", "8")),
+    )
+
+    # --- Interactive prompts (before launching Chrome to avoid chromedriver/stdout noise) ---
+    if interactive:
+        config.search_item = _prompt("Product to search: ") or config.search_item
+        config.price_min = _parse_int_safe(_prompt("Min price (leave blank for no min): "))
+        config.price_max = _parse_int_safe(_prompt("Max price (leave blank for no max): "))
+        config.min_rating = _parse_float_safe(_prompt("Minimum rating (e.g. 4.0) (leave blank for no min): "))
+
+    for key, value in overrides.items():
+        if not hasattr(config, key):
+            raise TypeError(f"Unknown config option: {key}")
+        setattr(config, key, value)
+    config.base_url = config.base_url.rstrip("/")
+    return config
 
-print(f"Searching for: {SEARCH_ITEM!r} | price_min={PRICE_MIN} price_max={PRICE_MAX} min_rating={MIN_RATING}")
 
 # --- SETUP DRIVER ---
-# Reduce noisy logs so user can type inputs without interference
-logging.getLogger("WDM").setLevel(logging.ERROR)
-logging.getLogger("selenium").setLevel(logging.ERROR)
-options = webdriver.ChromeOptions()
-options.add_argument("--start-maximized")
-# Chrome-specific quieting
-options.add_experimental_option('excludeSwitches', ['enable-logging'])
-options.add_argument("--log-level=3")
-# Install and set up the driver automatically and route chromedriver logs to null
-service = ChromeService(ChromeDriverManager().install(), log_path=os.devnull)
-driver = webdriver.Chrome(service=service, options=options)
-wait = WebDriverWait(driver, 20)
-print("✅ Driver setup complete.")
+def chromedriver_path(config, refresh=False):
+    """Path of the chromedriver binary.
+
+    webdriver_manager checks the latest driver version online on every
+    ``install()``; its answer is kept in ``config.chromedriver_cache`` and
+    reused while the file it names exists, so later launches skip the lookup.
+    """
+    key = config.chromedriver_cache
+    if not refresh:
+        path = _driver_paths.get(key)
+        if path is None and key:
+            try:
+                with open(key, encoding="utf-8") as f:
+                    path = f.read().strip()
+            except OSError:
+                path = None
+        if path and os.access(path, os.X_OK):
+            _driver_paths[key] = path
+            return path
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    path = ChromeDriverManager().install()
+    _driver_paths[key] = path
+    if key:
+        try:
+            with open(key, "w", encoding="utf-8") as f:
+                f.write(path)
+        except OSError as e:
+            print(f"⚠️ Could not save chromedriver path: {e}")
+    return path
+
+
+def launch_browser(config):
+    """Start Chrome (chromedriver is resolved by webdriver_manager, then cached: see chromedriver_path)."""
+    from selenium import webdriver
+    from selenium.common.exceptions import SessionNotCreatedException
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    # Reduce noisy logs so user can type inputs without interference
+    logging.getLogger("WDM").setLevel(logging.ERROR)
+    logging.getLogger("selenium").setLevel(logging.ERROR)
+    options = webdriver.ChromeOptions()
+    if config.lean:
+        apply_lean_options(options)
+    elif config.headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1366,900")
+    else:
+        options.add_argument("--start-maximized")
+    # Chrome-specific quieting
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    options.add_argument("--log-level=3")
+    # Install and set up the driver automatically and route chromedriver logs to null
+    service = ChromeService(chromedriver_path(config), log_path=os.devnull)
+    try:
+        driver = webdriver.Chrome(service=service, options=options)
+    except SessionNotCreatedException:
+        # Chrome was updated past the cached driver: resolve a matching one
+        service = ChromeService(chromedriver_path(config, refresh=True), log_path=os.devnull)
+        driver = webdriver.Chrome(service=service, options=options)
+    if config.lean:
+        block_urls(driver, config.block_urls)
+    # async readiness scripts (waits.py) run up to config.timeout in the page
+    driver.set_script_timeout(max(config.timeout, ADD_CONFIRM_TIMEOUT) + 10)
+    print("✅ Driver setup complete.")
+    return driver
 
 
 def click_element_robust(driver, el):
@@ -99,6 +458,8 @@ def click_element_robust(driver, el):
         pass
     try:
         # 2) ActionChains move+click
+        from selenium.webdriver import ActionChains
+
         ActionChains(driver).move_to_element(el).pause(0.1).click(el).perform()
         return True
     except Exception:
@@ -128,345 +489,390 @@ def click_element_robust(driver, el):
         pass
     return False
 
-# --- AMAZON LOGIN ---
-try:
-    driver.get("https://www.amazon.in/ap/signin?openid.pape.max_auth_age=0&openid.return_to=https%3A%2F%2Fwww.amazon.in%2F%3Fref_%3Dnav_signin&openid.identity=http%3A%2F%2Fspecs.openid.net%2Fauth%2F2.0%2Fidentifier_select&openid.assoc_handle=inflex&openid.mode=checkid_setup&openid.claimed_id=http%3A%2F%2Fspecs.openid.net%2Fauth%2F2.0%2Fidentifier_select&openid.ns=http%3A%2F%2Fspecs.openid.net%2Fauth%2F2.0")
-    wait.until(EC.visibility_of_element_located((By.ID, "ap_email"))).send_keys(EMAIL + Keys.RETURN)
-    wait.until(EC.visibility_of_element_located((By.ID, "ap_password"))).send_keys(PASSWORD + Keys.RETURN)
-    # Wait for the search bar on the homepage to confirm login is complete
-    wait.until(EC.presence_of_element_located((By.ID, "twotabsearchtextbox")))
-    print("✅ Login successful!")
-except Exception as e:
-    print(f"❌ Login failed. You might need to solve a CAPTCHA manually. Error: {e}")
-    driver.quit()
-    exit()
+def signin_url(config):
+    base = config.base_url
+    params = {
+        "openid.pape.max_auth_age": "0",
+        "openid.return_to": f"{base}/?ref_=nav_signin",
+        "openid.identity": "http://specs.openid.net/auth/2.0/identifier_select",
+        "openid.assoc_handle": config.assoc_handle,
+        "openid.mode": "checkid_setup",
+        "openid.claimed_id": "http://specs.openid.net/auth/2.0/identifier_select",
+        "openid.ns": "http://specs.openid.net/auth/2.0",
+    }
+    return f"{base}/ap/signin?{urlencode(params)}"
 
-# (Prompts are handled earlier before launching the browser.)
 
-# --- SEARCH PRODUCT ---
-search_box = wait.until(EC.presence_of_element_located((By.ID, "twotabsearchtextbox")))
-search_box.send_keys(SEARCH_ITEM + Keys.RETURN)
-print(f"🔍 Searching for '{SEARCH_ITEM}'...")
+# --- AMAZON LOGIN ---
+@traced("login")
+def login(driver, config):
+    """Sign in, reusing the process's (or the cached) session when it is still valid. Raises LoginError.
 
-# Wait for search results to load (target items with a non-empty data-asin)
-wait.until(EC.presence_of_element_located((By.XPATH, "//div[@data-component-type='s-search-result' and @data-asin]")))
+    The first browser of the process runs the password flow; later ones get
+    its cookies and storage injected (see ``session_broker``) and only load
+    the home page to check them.
+    """
+    broker = session_broker(config)
+    try:
+        if broker.attach(driver) == "login":
+            return True
+    except LoginError:
+        raise
+    except Exception as e:
+        print(f"⚠️ Could not reuse the shared session: {e}")
+        sign_in(driver, config)
+        return True
+    if SessionCache.probe(driver, config.base_url + "/"):
+        print("✅ Reused signed-in session, skipping login.")
+        return True
+    print("🔑 Shared session is signed out; signing in again...")
+    broker.expired(driver)
+    return True
 
-# --- SCRAPE PRODUCTS ---
-# Prefer items that have a data-asin attribute (real product results). This is more reliable.
-products = driver.find_elements(By.XPATH, "//div[contains(@class,'s-result-item') and normalize-space(@data-asin)!='']")
-choices = []
 
-print(f"🔎 Raw search result containers found: {len(products)}")
+def sign_in(driver, config):
+    """The /ap/signin email + password flow (``flow.login``) on ``driver``. Raises LoginError."""
+    flow.login(SeleniumBackend(driver), config)
 
-# Try dismissing common overlays (cookie consent, location) that block the page
-try:
-    # cookie consent by id (common pattern)
-    consent_btns = driver.find_elements(By.ID, "sp-cc-accept")
-    if consent_btns:
-        try:
-            consent_btns[0].click()
-            time.sleep(0.5)
-        except Exception:
-            pass
-except Exception:
-    pass
 
-try:
-    # general dialog close buttons (common patterns)
-    dlg_btns = driver.find_elements(By.XPATH, "//button[contains(@class,'a-button-close') or contains(@aria-label,'close')]")
-    for b in dlg_btns:
-        try:
-            b.click()
-            time.sleep(0.2)
-        except Exception:
-            continue
-except Exception:
-    pass
+# --- SEARCH PRODUCT ---
+@traced("search")
+def search(driver, config, query=None):
+    """Type ``query`` (default config.search_item) into the search bar and wait for results (``flow.search``)."""
+    flow.search(SeleniumBackend(driver), config, query)
 
-for product in products:
-    try:
-        # Use a broader selector for the product link/title
-        link_el = product.find_element(By.CSS_SELECTOR, "h2 a")
-        title = link_el.text.strip()
-        link = link_el.get_attribute("href")
 
-        # Skip obviously empty or sponsored-like entries
-        if not title or not link:
-            continue
+def dismiss_overlays(driver):
+    """Try dismissing common overlays (cookie consent, location) that block the page."""
+    from selenium.webdriver.common.by import By
 
-        # Basic metadata (best-effort)
-        try:
-            price_text = product.find_element(By.CSS_SELECTOR, "span.a-price-whole").text.strip()
-        except Exception:
-            # some items may have "span.a-offscreen" with formatted price
+    try:
+        # cookie consent by id (common pattern)
+        consent_btns = driver.find_elements(By.ID, "sp-cc-accept")
+        if consent_btns:
             try:
-                price_text = product.find_element(By.CSS_SELECTOR, "span.a-offscreen").text.strip()
+                consent_btns[0].click()
+                tracing.sleep(0.5, "overlay")
             except Exception:
-                price_text = "N/A"
-
-        try:
-            rating_text = product.find_element(By.CSS_SELECTOR, "span.a-icon-alt").get_attribute("innerHTML").strip()
-        except Exception:
-            rating_text = "N/A"
+                pass
+    except Exception:
+        pass
 
-        # parse numeric values for filtering
-        price_num = None
-        if price_text and price_text != "N/A":
-            # remove non digits, keep decimals if any
-            cleaned = re.sub(r"[^\d.]", "", price_text)
+    try:
+        # general dialog close buttons (common patterns)
+        dlg_btns = driver.find_elements(By.XPATH, "//button[contains(@class,'a-button-close') or contains(@aria-label,'close')]")
+        for b in dlg_btns:
             try:
-                # often price is integer rupees; cast to int if no dot, else float
-                price_num = int(cleaned) if cleaned and "." not in cleaned else float(cleaned)
+                b.click()
+                tracing.sleep(0.2, "overlay")
             except Exception:
-                price_num = None
-
-        rating_num = None
-        if rating_text and rating_text != "N/A":
-            rating_num = _parse_float_safe(rating_text)
-
-        # Apply user filters (if provided)
-        if PRICE_MIN is not None:
-            if price_num is None or price_num < PRICE_MIN:
-                continue
-        if PRICE_MAX is not None:
-            if price_num is None or price_num > PRICE_MAX:
-                continue
-        if MIN_RATING is not None:
-            if rating_num is None or rating_num < MIN_RATING:
                 continue
-
-        choices.append({"title": title, "price": price_text, "rating": rating_text, "url": link})
-    except Exception:
-        # skip entries we couldn't parse
-        continue
-
-print(f"📦 Found {len(choices)} parsed products on the first page.")
-if len(choices) == 0 and len(products) > 0:
-    # helpful debug: dump first product HTML snippet to help diagnose DOM mismatch
-    try:
-        first_html = products[0].get_attribute('outerHTML')
-        print("⚠️ No parsed products. Sample first result HTML (truncated):\n", first_html[:1000])
     except Exception:
         pass
-if len(products) > 0:
-    with open('sample_product.html','w', encoding='utf-8') as f:
-        f.write(products[0].get_attribute('outerHTML'))
-    print('Saved sample_product.html – open it in your browser to inspect the DOM')
 
-# --- AGENT DECISION & ADD DIRECTLY FROM SEARCH RESULTS ---
-# Attempt to click the "Add to cart" button directly inside each search-result container.
-added = []
-print("🤖 Agent will try to add up to", MAX_PRODUCTS, "items directly from the search results...")
-for product in products:
-    if len(added) >= MAX_PRODUCTS:
-        break
+
+# --- SCRAPE PRODUCTS ---
+@traced("scrape")
+def extract(driver, config, query=None):
+    """Extract the results page currently open (plus pages 2..search_pages).
+
+    Returns ``(records, choices)``: every parsed product, and those passing the
+    price/rating filters, best first (see :func:`choose`).
+    """
+    from selenium.webdriver.common.by import By
+
+    query = query or config.search_item
+    # Prefer items that have a data-asin attribute (real product results). This is more reliable.
+    products = driver.find_elements(By.XPATH, PRODUCT_XPATH)
+    print(f"🔎 Raw search result containers found: {len(products)}")
+
+    dismiss_overlays(driver)
+
+    # Extract every result container in one go instead of issuing several WebDriver
+    # calls per product: either one page_source snapshot parsed in Python, or one
+    # execute_script that walks the containers in the browser.
+    sink = record_sink(config)
+    stored = _stored_first_page(config, query)
+    first = stored if stored is not None else _first_page(driver, config, query)
+    records = list(sink.tap(first, query=query, page=1))
+    by_page = {1: records}
+    for page, page_records in _more_pages(driver, config, query, records, live=stored is None):
+        by_page[page] = list(sink.tap(page_records, query=query, page=page))
+    if config.search_pages > 1:
+        records = merge_pages(by_page)
+
+    # Apply user filters (if provided) and rank what is left
+    choices = choose(config, records)
+
+    print(f"📦 Found {len(choices)} parsed products across {config.search_pages} page(s).")
+    if len(records) == 0 and len(products) > 0:
+        # the containers are there but the parser saw none: keep the page to diagnose the DOM mismatch
+        recorder = flight_recorder(config)
+        print(f"⚠️ No parsed products from {len(products)} result containers."
+              + (" Recording the page." if recorder else ""))
+        if recorder:
+            recorder.dump(driver, "scrape-no-products")
+    return records, choices
+
+
+def stream_products(driver, config, query=None):
+    """Yield records passing the price/rating filters as soon as they are parsed.
+
+    Page 1 is parsed from the open page container by container; pages
+    2..search_pages (catalog, then headless workers) are only looked at once
+    the consumer asks for more than page 1 had. Closing the generator stops
+    the sweep, including pages not fetched yet. Records come in listing order
+    (later pages in completion order) and de-duplicated by ASIN, not ranked:
+    ranking needs the whole sweep. Every parsed record goes to
+    ``config.records_file`` on the way.
+    """
+    query = query or config.search_item
+    dismiss_overlays(driver)
+    sink = record_sink(config)
+    first = []
+
+    def pages():
+        stored = _stored_first_page(config, query)
+        yield 1, _collect(stored if stored is not None else _first_page(driver, config, query), first)
+        yield from _more_pages(driver, config, query, first, live=stored is None)
+
+    seen = set()
+    with contextlib.closing(pages()) as sweep:
+        for page, page_records in sweep:
+            for rec in iter_filtered(sink.tap(page_records, query=query, page=page),
+                                     config.price_min, config.price_max, config.min_rating):
+                if rec.get('asin') not in seen:
+                    seen.add(rec.get('asin'))
+                    yield rec
+
+
+def _stored_first_page(config, query):
+    """Page 1 of ``query`` from the catalog if it was fetched within the TTL, else None.
+
+    HTTP adds submit the forms of the open page (their tokens belong to this
+    session and the catalog does not keep them), so that mode always parses it.
+    """
+    catalog = open_catalog(config)
+    if catalog is None or config.add_mode == "http":
+        return None
     try:
-        # Best-effort title for logging
+        cached, _ = catalog.plan(query, [1])
+        records = catalog.load_page(query, 1) if cached else None
+    except Exception as e:
+        print(f"⚠️ Catalog unavailable: {e}")
+        return None
+    if records:
+        print(f"🗄️ Served page 1 from the catalog ({len(records)} result(s) fetched within the TTL).")
+    return records or None
+
+
+def _first_page(driver, config, query):
+    if config.extract_mode == "js":
+        records = extract_products_js(driver)
+        if records or governor(config) is None:
+            return records
+        # nothing in the containers: a CAPTCHA / throttling page is reloaded after the back-off
+        checked_source(driver, config, search_url(config.base_url, query, 1), "results page")
+        return extract_products_js(driver)
+    html, url = checked_source(driver, config, search_url(config.base_url, query, 1), "results page")
+    recorder = flight_recorder(config)
+    if recorder:
+        recorder.snapshot(driver, "results", html, url)
+    return iter_search_results(html, base_url=url)
+
+
+def _collect(records, into):
+    for rec in records:
+        into.append(rec)
+        yield rec
+
+
+def _more_pages(driver, config, query, first_page, live=True):
+    """Yield ``(page, records)`` for pages 2..search_pages after ``first_page`` was parsed.
+
+    Pages are served from the catalog while fresh (or while a ``live`` page 1
+    shows the listing has not moved); the rest are swept concurrently by
+    headless workers and yielded as they complete. A live page 1 and every
+    fetched page are stored in the catalog; one that came from the catalog
+    is not stored again, so it still goes stale.
+    """
+    catalog = open_catalog(config)
+    extra = list(range(2, config.search_pages + 1))
+    if catalog is not None:
         try:
-            title_el = product.find_element(By.CSS_SELECTOR, "h2 a")
-            title = title_el.text.strip()
-        except Exception:
-            title = product.get_attribute('data-asin') or 'Unknown product'
+            cached, extra = catalog.plan(query, extra, first_page_records=first_page if live else None)
+            stored = [(page, catalog.load_page(query, page) or []) for page in cached]
+            if live:
+                catalog.store_page(query, 1, first_page)
+            if cached:
+                print(f"🗄️ Served {len(cached)} page(s) from the catalog; fetching {len(extra)}.")
+        except Exception as e:
+            print(f"⚠️ Catalog unavailable: {e}")
+            stored = []
+        yield from stored
+    if not extra:
+        return
+    print(f"🧵 Fetching page(s) {extra} with {config.search_workers} headless worker(s)...")
+    try:
+        parts = urlsplit(driver.current_url)
+        factory = lambda: make_headless_driver(config.block_urls if config.lean else None, config)
+        pool = ParallelSearch(f"{parts.scheme}://{parts.netloc}", workers=config.search_workers,
+                              driver_factory=factory, governor=governor(config),
+                              block_retries=config.block_retries,
+                              broker=session_broker(config) if config.email else None)
+        with contextlib.closing(pool.iter_pages(query, extra)) as fetched:
+            for page, page_records, err in fetched:
+                if err is None and catalog is not None:
+                    catalog.store_page(query, page, page_records)
+                yield page, page_records
+        print(f"🧵 Fetched {pool.stats['pages']} extra page(s) in {pool.stats['elapsed']:.1f}s "
+              f"({len(pool.stats['errors'])} failed)")
+    except Exception as e:
+        print(f"⚠️ Multi-page search failed, using the pages we have: {e}")
 
-        # Scroll product into view so buttons are clickable
-        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", product)
-        time.sleep(0.4)
 
-        # Scoped detection tailored for the markup you shared (data-csa-c-content-id and data-csa-c-item-id)
-        btn = None
-        try:
-            asin = product.get_attribute('data-asin') or ''
-        except Exception:
-            asin = ''
+def choose(config, records):
+    """Records passing the price/rating filters, de-duplicated and ranked by config.rank_by."""
+    from ranking import rank_products
 
-        # 1) Exact match: div[action] with matching data-csa-c-item-id == product ASIN -> button[name='submit.addToCart']
-        if asin:
-            try:
-                xpath = f".//div[@data-csa-c-content-id='s-search-add-to-cart-action' and @data-csa-c-item-id='{asin}']//button[@name='submit.addToCart']"
-                btn = product.find_element(By.XPATH, xpath)
-            except Exception:
-                btn = None
+    return rank_products(records, score=config.rank_by, price_min=config.price_min,
+                         price_max=config.price_max, min_rating=config.min_rating)
 
-        # 2) Any add-to-cart action inside the product container
-        if not btn:
-            try:
-                btn = product.find_element(By.XPATH, ".//div[@data-csa-c-content-id='s-search-add-to-cart-action']//button[@name='submit.addToCart']")
-            except Exception:
-                btn = None
 
-        # 3) Generic button by name inside product container
-        if not btn:
+# --- AGENT DECISION & ADD DIRECTLY FROM SEARCH RESULTS ---
+@traced("inline-add")
+def add_inline(driver, config, products, titles_by_asin):
+    """Click the "Add to cart" button directly inside each search-result container."""
+    from selenium.webdriver.common.by import By
+
+    registry = selector_registry(config)
+    confirm = config.add_confirm != "batch"
+    # (by, value, must be clickable, tier); {asin} is replaced with the product's ASIN.
+    # Tiers: ASIN-scoped, the add button by name, by its text, then any a-button as a last resort
+    inline_selectors = [
+        (By.XPATH, ".//div[@data-csa-c-content-id='s-search-add-to-cart-action' and @data-csa-c-item-id='{asin}']//button[@name='submit.addToCart']", False, 0),
+        (By.XPATH, ".//div[@data-csa-c-content-id='s-search-add-to-cart-action']//button[@name='submit.addToCart']", False, 1),
+        (By.XPATH, ".//button[@name='submit.addToCart']", False, 1),
+        (By.XPATH, ".//input[contains(translate(@value,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart') or contains(translate(@aria-label,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]", True, 2),
+        (By.XPATH, ".//button[.//span[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]]", True, 2),
+        (By.XPATH, ".//a[.//span[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]]", True, 2),
+        (By.CSS_SELECTOR, "input[name='submit.add-to-cart'], button.a-button, .a-button input", True, 3),
+    ]
+    added = []
+    print("🤖 Agent will try to add up to", config.max_products, "items directly from the search results...")
+    for product in products:
+        if len(added) >= config.max_products:
+            break
+        try:
             try:
-                btn = product.find_element(By.XPATH, ".//button[@name='submit.addToCart']")
+                asin = product.get_attribute('data-asin') or ''
             except Exception:
-                btn = None
-
-        # 4) Fallback: older or alternate markup (text-based or input)
-        if not btn:
-            inline_selectors = [
-                (By.XPATH, ".//input[contains(translate(@value,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart') or contains(translate(@aria-label,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]") ,
-                (By.XPATH, ".//button[.//span[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]]"),
-                (By.XPATH, ".//a[.//span[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]]"),
-                (By.CSS_SELECTOR, "input[name='submit.add-to-cart'], button.a-button, .a-button input")
-            ]
-            for sel in inline_selectors:
-                try:
-                    cand = product.find_element(sel[0], sel[1])
-                    if cand and cand.is_displayed():
-                        btn = cand
-                        break
-                except Exception:
-                    continue
+                asin = ''
+            # Best-effort title for logging (already extracted, no extra WebDriver call)
+            title = titles_by_asin.get(asin) or asin or 'Unknown product'
 
-        if not btn:
-            print(f"⚠️ Inline Add button not found for: {title}")
-            continue
+            # Scroll product into view so buttons are clickable
+            scroll_into_view(driver, product)
 
-        # Try to get previous cart count (if available)
-        try:
-            prev_count = int(driver.find_element(By.ID, 'nav-cart-count').text.strip())
-        except Exception:
-            prev_count = None
+            # All candidates checked in one script, best-ranked winning (selector_registry):
+            # scoped matches for the markup you shared (data-csa-c-content-id / data-csa-c-item-id),
+            # then the generic button by name, then older or alternate markup (text-based or input)
+            btn = find_first(driver, registry, "search-inline", inline_selectors, timeout=0, root=product, asin=asin)
 
-        # Click via JS to avoid overlay issues
-        try:
-            driver.execute_script('arguments[0].click();', btn)
-        except Exception:
-            try:
-                btn.click()
-            except Exception as e:
-                print(f"⚠️ Failed to click add for {title}: {e}")
+            if not btn:
+                print(f"⚠️ Inline Add button not found for: {title}")
                 continue
 
-        # Wait briefly for confirmation: cart count change or "Added to Cart" text
-        added_ok = False
-        start = time.time()
-        while time.time() - start < 12:
-            try:
-                if prev_count is not None:
-                    cur = int(driver.find_element(By.ID, 'nav-cart-count').text.strip())
-                    if cur > prev_count:
-                        added_ok = True
-                        break
-            except Exception:
-                pass
+            # Watch the cart badge / confirmation text from before the click so nothing is missed
+            prev_count = arm_cart_watch(driver) if confirm else None
+
+            # Click via JS to avoid overlay issues
             try:
-                # generic confirmation text
-                conf = driver.find_elements(By.XPATH, "//*[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'added to cart') or contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'added to your cart')]")
-                if len(conf) > 0:
-                    added_ok = True
-                    break
+                driver.execute_script('arguments[0].click();', btn)
             except Exception:
-                pass
-            time.sleep(0.5)
+                try:
+                    btn.click()
+                except Exception as e:
+                    print(f"⚠️ Failed to click add for {title}: {e}")
+                    continue
 
-        if added_ok:
-            print(f"✅ Added to cart: {title}")
-            added.append({'title': title})
-        else:
-            print(f"⚠️ Clicked Add for {title} but no confirmation observed.")
+            if not confirm:
+                # batch mode: reconcile_cart checks every add against the cart at the end
+                print(f"🛒 Clicked Add for: {title}")
+                added.append({'title': title, 'asin': asin})
+                continue
 
-        time.sleep(0.6)
-    except Exception as e:
-        print(f"⚠️ Error while trying inline add: {e}")
-        continue
+            # Resolves as soon as the cart count changes or "Added to Cart" text appears
+            confirmation = wait_cart_confirmation(driver, prev_count, timeout=ADD_CONFIRM_TIMEOUT)
 
-# If nothing was added inline, fall back to opening product pages and using the more robust add flow
-if len(added) == 0:
-    print("⚠️ No items added from inline buttons; falling back to opening product pages to add items.")
-    # Before opening product pages, attempt a global diagnostic + mapped-click fallback.
+            if confirmation.get('ok'):
+                print(f"✅ Added to cart: {title}")
+                added.append({'title': title, 'asin': asin})
+            else:
+                print(f"⚠️ Clicked Add for {title} but no confirmation observed.")
+        except Exception as e:
+            print(f"⚠️ Error while trying inline add: {e}")
+            continue
+    _save_registry(registry)
+    return added
+
+
+@traced("diagnostic")
+def diagnostic_add(driver, config, products, choices):
+    """Scan the whole page for 'Add to cart' elements, map them to ASINs and click them."""
+    from selenium.webdriver.common.by import By
+
+    confirm = config.add_confirm != "batch"
     try:
         print("🔍 Running diagnostic: scanning the whole page for 'Add to cart' elements and mapping to ASINs...")
-        matches = driver.find_elements(By.XPATH, "//*[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]")
-        print(f"Diagnostic: found {len(matches)} elements containing 'add to cart' text (case-insensitive).")
-        dump_parts = []
-        mapped = []
-        for idx, el in enumerate(matches, start=1):
-            try:
-                outer = el.get_attribute('outerHTML') or ''
-            except Exception:
-                outer = '<no-outerHTML>'
-            # find nearest ancestor product container (data-asin)
-            asin = None
-            try:
-                anc = el.find_element(By.XPATH, "ancestor::div[contains(@class,'s-result-item') and normalize-space(@data-asin)!='']")
-                asin = anc.get_attribute('data-asin')
-            except Exception:
-                try:
-                    anc = el.find_element(By.XPATH, "ancestor::*[@data-asin]")
-                    asin = anc.get_attribute('data-asin')
-                except Exception:
-                    asin = None
-            mapped.append({'index': idx, 'asin': asin or 'N/A', 'html': outer})
-            dump_parts.append(f"--- Match {idx} ASIN={asin or 'N/A'} ---\n{outer}\n\n")
-
-        with open('diagnostic_add_button_dump.html', 'w', encoding='utf-8') as f:
-            f.write('<html><body>')
-            for p in dump_parts:
-                f.write(p)
-            f.write('</body></html>')
-        print("Diagnostic saved to diagnostic_add_button_dump.html")
+        # one walk over the text nodes in the browser: innermost clickable matches with their ASIN
+        # and a truncated snippet, capped, instead of every ancestor's full outerHTML
+        scan = driver.execute_script(_ADD_TEXT_SCAN_JS, "add to cart", DIAGNOSTIC_MAX_MATCHES,
+                                     DIAGNOSTIC_SNIPPET_CHARS) or {}
+        found = scan.get('matches', [])
+        matches = [el for el, _, _ in found]
+        print(f"Diagnostic: found {scan.get('total', 0)} elements with 'add to cart' text (case-insensitive)"
+              + (f", kept the first {len(found)}." if scan.get('total', 0) > len(found) else "."))
+        recorder = flight_recorder(config)
+        if recorder:
+            # kept in memory with the page snapshots; on disk only if this stage ends up failing
+            recorder.snapshot(driver, "diagnostic-matches.txt", "".join(
+                f"--- Match {idx} ASIN={asin or 'N/A'} ---\n{snippet}\n\n"
+                for idx, (_, asin, snippet) in enumerate(found, start=1)))
 
         # Visual mapping: compute bounding boxes for products and candidate add-buttons,
-        # map each candidate to the nearest product whose rect contains the candidate center
+        # map each candidate to the product whose rect contains the candidate center
         try:
-            # gather product rects (only use products with data-asin)
-            product_boxes = []
-            for p in products:
-                try:
-                    asin = p.get_attribute('data-asin') or ''
-                    rect = driver.execute_script(
-                        "var r = arguments[0].getBoundingClientRect(); return {left:r.left,top:r.top,width:r.width,height:r.height,cx:r.left + r.width/2, cy:r.top + r.height/2};",
-                        p,
-                    )
-                    product_boxes.append({'asin': asin, 'elem': p, 'rect': rect})
-                except Exception:
-                    continue
-
-            # gather candidate add-button elements and rects
-            cand_els = driver.find_elements(By.XPATH, "//*[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart')]")
-            candidates = []
-            for c in cand_els:
-                try:
-                    rect = driver.execute_script(
-                        "var r = arguments[0].getBoundingClientRect(); return {left:r.left,top:r.top,width:r.width,height:r.height,cx:r.left + r.width/2, cy:r.top + r.height/2};",
-                        c,
-                    )
-                    candidates.append({'el': c, 'rect': rect})
-                except Exception:
-                    continue
+            # one round-trip for every product and candidate rect (page coordinates,
+            # so the snapshot is consistent whatever the scroll position)
+            geometry = driver.execute_script(_RECTS_JS, products, matches) or {}
+            product_boxes = [
+                {'asin': asin, 'elem': p, 'rect': rect}
+                for p, (asin, rect) in zip(products, geometry.get('products', []))
+                if rect is not None
+            ]
+            # the 'add to cart' scan above already returned the candidates
+            candidates = [
+                {'el': c, 'rect': rect}
+                for c, rect in zip(matches, geometry.get('candidates', []))
+                if rect is not None
+            ]
 
-            # map candidates to products
+            # map candidates to products: containing product first, else nearest centre
+            index = GridIndex([pb['rect'] for pb in product_boxes])
             mapped_by_asin = {}
             for cand in candidates:
-                cx = cand['rect']['cx']
-                cy = cand['rect']['cy']
-                chosen = None
-                # first try containment
-                for pb in product_boxes:
-                    r = pb['rect']
-                    if cx >= r['left'] and cx <= r['left'] + r['width'] and cy >= r['top'] and cy <= r['top'] + r['height']:
-                        chosen = pb
-                        break
-                # if none contains, pick nearest by center distance
-                if not chosen and len(product_boxes) > 0:
-                    best = None
-                    best_d = None
-                    for pb in product_boxes:
-                        pcx = pb['rect']['cx']
-                        pcy = pb['rect']['cy']
-                        d = (pcx - cx) ** 2 + (pcy - cy) ** 2
-                        if best is None or d < best_d:
-                            best = pb
-                            best_d = d
-                    chosen = best
-
-                asin_key = chosen['asin'] if chosen else 'N/A'
+                left, top, width, height = cand['rect']
+                i = index.locate(left + width / 2, top + height / 2)
+                asin_key = product_boxes[i]['asin'] if i is not None else 'N/A'
                 mapped_by_asin.setdefault(asin_key, []).append(cand['el'])
 
             # prepare parsed_asins (from product URLs or data-asin)
             parsed_asins = set()
             for p in choices:
+                if p.get('asin'):
+                    parsed_asins.add(p['asin'])
+                    continue
                 url = p.get('url','')
                 if '/dp/' in url:
                     parsed_asins.add(url.split('/dp/')[-1].split('/')[0])
@@ -478,27 +884,27 @@ if len(added) == 0:
             # click mapped candidates for parsed asins (or any if parsed_asins empty)
             clicks = 0
             for asin, els in mapped_by_asin.items():
-                if clicks >= MAX_PRODUCTS:
+                if clicks >= config.max_products:
                     break
                 if len(parsed_asins) > 0 and asin not in parsed_asins:
                     continue
                 for el in els:
-                    if clicks >= MAX_PRODUCTS:
+                    if clicks >= config.max_products:
                         break
                     try:
-                        driver.execute_script('arguments[0].scrollIntoView({block:"center"});', el)
-                        time.sleep(0.25)
+                        scroll_into_view(driver, el)
+                        prev_count = arm_cart_watch(driver) if confirm else None
                         driver.execute_script('arguments[0].click();', el)
                         clicks += 1
                         print(f"🔘 Clicked visually-mapped add element for ASIN={asin}")
-                        time.sleep(1.0)
+                        if confirm:
+                            wait_cart_confirmation(driver, prev_count, timeout=ADD_CONFIRM_TIMEOUT)
                     except Exception as e:
                         print(f"⚠️ Failed visual click for ASIN={asin}: {e}")
                         continue
 
             if clicks > 0:
                 print(f"✅ Clicked {clicks} visually-mapped add-button(s) from diagnostic scan.")
-                time.sleep(2)
                 try:
                     cnt = driver.find_element(By.ID, 'nav-cart-count').text.strip()
                     print('Cart count after diagnostic clicks:', cnt)
@@ -506,161 +912,364 @@ if len(added) == 0:
                     pass
             else:
                 print('⚠️ Diagnostic scan mapped candidates but clicked 0 items.')
+                if recorder:
+                    recorder.dump(driver, "diagnostic-no-clicks")
         except Exception as e:
             print('⚠️ Visual-mapping diagnostic failed:', e)
+            if recorder:
+                recorder.dump(driver, "diagnostic-mapping", error=e)
     except Exception as e:
         print('⚠️ Diagnostic step failed:', e)
+        recorder = flight_recorder(config)
+        if recorder:
+            recorder.dump(driver, "diagnostic", error=e)
 
-    # If diagnostic clicks didn't add items, fall back to product page flow
-    selected = random.sample(choices, min(MAX_PRODUCTS, len(choices))) if len(choices) > 0 else []
+
+@traced("product-page")
+def add_from_product_pages(driver, config, choices):
+    """Add the best choices from their product pages, loading the pages in parallel tabs.
+
+    Each tab's navigation is started with a script, so opening it does not
+    wait for the page; up to config.product_tabs pages load at once. Tabs are
+    then served in turn: once a page is ready its variation is picked and the
+    add button clicked, and the tab is queued again to collect its own
+    confirmation while the others are clicked. The stage takes about as long
+    as the slowest page rather than the sum of all of them.
+    """
+    from selenium.webdriver.common.by import By
+
+    registry = selector_registry(config)
+    confirm = config.add_confirm != "batch"
+    # (by, value, must be clickable, tier): the text match stays behind the id / name ones
+    add_btn_selectors = [
+        (By.ID, "add-to-cart-button", True, 0),
+        (By.NAME, "submit.add-to-cart", True, 0),
+        (By.XPATH, "//input[@id='add-to-cart-button']", True, 0),
+        (By.XPATH, "//button[contains(., 'Add to Cart') or contains(., 'Add to basket')]", True, 1),
+    ]
+    added = []
+    pending = list(choices[:config.max_products])
+    tabs = collections.deque()  # per tab: handle, item, state ('loading' / 'clicked'), prev_count, variation
     main_window = driver.current_window_handle
-    for item in selected:
+
+    gov = governor(config)
+
+    def open_tab(item):
+        if gov:
+            # the navigation is not waited for, so only its start is paced
+            gov.pace()
         driver.switch_to.new_window('tab')
-        driver.get(item['url'])
+        if config.lean:
+            # request blocking is per tab
+            block_urls(driver, config.block_urls)
+        driver.execute_script("window.location.href = arguments[0];", item['url'])
+        tabs.append({'handle': driver.current_window_handle, 'item': item, 'state': 'loading',
+                     'prev_count': None, 'variation': None})
+
+    def close_tab(tab):
         try:
-            # reuse existing robust add-button logic (localized selectors)
-            add_btn_selectors = [
-                (By.ID, "add-to-cart-button"),
-                (By.NAME, "submit.add-to-cart"),
-                (By.XPATH, "//input[@id='add-to-cart-button']"),
-                (By.XPATH, "//button[contains(., 'Add to Cart') or contains(., 'Add to basket')]")
-            ]
+            driver.switch_to.window(tab['handle'])
+            driver.close()
+        except Exception:
+            pass
 
-            add_btn = None
-            for sel in add_btn_selectors:
-                try:
-                    add_btn = wait.until(EC.element_to_be_clickable(sel))
-                    break
-                except Exception:
+    try:
+        while pending or tabs:
+            while pending and len(tabs) < config.product_tabs:
+                open_tab(pending.pop(0))
+            tab = tabs.popleft()
+            title = tab['item']['title']
+            try:
+                driver.switch_to.window(tab['handle'])
+                if tab['state'] == 'loading':
+                    # one wait for whichever selector becomes clickable first
+                    add_btn = find_first(driver, registry, "product-page", add_btn_selectors, timeout=config.timeout)
+                    tab['variation'] = pick_variation(driver)
+                    if not add_btn:
+                        verdict = page_verdict(driver, config)
+                        raise Exception("Add-to-cart button not found by known selectors" if verdict == "ok"
+                                        else f"Got a {verdict} page instead of the product")
+                    if not confirm:
+                        # batch mode: the click's navigation has been waited for; reconcile_cart checks the cart
+                        add_btn.click()
+                        print(f"🛒 Clicked Add (product page): {title}")
+                        added.append({'title': title, 'asin': tab['item'].get('asin')})
+                        close_tab(tab)
+                        continue
+                    tab['prev_count'] = arm_cart_watch(driver)
+                    add_btn.click()
+                    # collect the confirmation after the other tabs had their turn
+                    tab['state'] = 'clicked'
+                    tabs.append(tab)
                     continue
+                # Follows the add across the navigation to the confirmation page if there is one
+                if not wait_cart_confirmation(driver, tab['prev_count'], timeout=config.timeout).get('ok'):
+                    raise Exception("No add-to-cart confirmation observed")
+                note = f" ({tab['variation']})" if tab['variation'] else ""
+                print(f"✅ Added to cart (product page): {title}{note}")
+                added.append({'title': title, 'asin': tab['item'].get('asin')})
+            except Exception as e:
+                print(f"⚠️ Could not add (product page): {title}. Reason: {e}")
+            close_tab(tab)
+    finally:
+        for tab in tabs:
+            close_tab(tab)
+        driver.switch_to.window(main_window)
+    _save_registry(registry)
+    return added
 
-            # try simple variation picks
-            try:
-                variation = driver.find_elements(By.CSS_SELECTOR, "div#variation_size_name, div#variation_color_name, select#native_dropdown_selected_size_name")
-                if variation:
-                    for v in variation:
-                        try:
-                            opt = v.find_element(By.CSS_SELECTOR, "li, option, img")
-                            opt.click()
-                            time.sleep(0.5)
-                            break
-                        except Exception:
-                            continue
-            except Exception:
-                pass
 
-            if not add_btn:
-                raise Exception("Add-to-cart button not found by known selectors")
+def pick_variation(driver):
+    """Pick the first option of a size/colour selector if the page has one; returns what was picked."""
+    from selenium.webdriver.common.by import By
 
+    try:
+        variation = driver.find_elements(By.CSS_SELECTOR, "div#variation_size_name, div#variation_color_name, select#native_dropdown_selected_size_name")
+        for v in variation:
             try:
-                prev_count = int(driver.find_element(By.ID, 'nav-cart-count').text.strip())
+                opt = v.find_element(By.CSS_SELECTOR, "li, option, img")
+                opt.click()
+                wait_for_dom_quiet(driver)
+                return v.get_attribute('id')
             except Exception:
-                prev_count = None
+                continue
+    except Exception:
+        pass
+    return None
 
-            add_btn.click()
 
-            def _added_confirmation(driver_obj):
-                try:
-                    elems = driver_obj.find_elements(By.XPATH, "//*[contains(text(), 'Added to Cart') or contains(text(), 'Added to your cart')]")
-                    if len(elems) > 0:
-                        return True
-                except Exception:
-                    pass
-                try:
-                    count = driver_obj.find_element(By.ID, 'nav-cart-count').text.strip()
-                    return prev_count is None or int(count) != prev_count
-                except Exception:
-                    return False
+@traced("http-add")
+def add_over_http(driver, config, choices):
+    """Submit the inline add-to-cart forms of ``choices`` over pooled HTTP with the browser's cookies."""
+    from http_cart import HttpCart
 
-            wait.until(_added_confirmation)
-            print(f"✅ Added to cart (product page): {item['title']}")
-        except Exception as e:
-            print(f"⚠️ Could not add (product page): {item['title']}. Reason: {e}")
-        finally:
-            driver.close()
-            driver.switch_to.window(main_window)
-            time.sleep(1)
-
-# --- PROCEED TO CART ---
-driver.get("https://www.amazon.in/gp/cart/view.html?ref_=nav_cart")
-print("🛒 Navigated to cart page.")
-
-# --- PROCEED TO CHECKOUT ---
-try:
-    # Try multiple selectors because different locales/layouts use different controls/text
-    proceed_selectors = [
-        (By.NAME, "proceedToRetailCheckout"),
-        (By.ID, "sc-buy-box-ptc-button"),
-        (By.XPATH, "//input[contains(@value,'Proceed to Buy') or contains(@value,'Proceed to checkout')]") ,
-        (By.XPATH, "//a[contains(., 'Proceed to Buy') or contains(., 'Proceed to checkout') or contains(., 'Proceed to buy')]") ,
-        (By.XPATH, "//button[contains(., 'Proceed to Buy') or contains(., 'Proceed to checkout') or contains(., 'Proceed to buy')]")
-    ]
+    wanted = [dict(r, referer=driver.current_url) for r in choices if r.get('add_form')][:config.max_products]
+    if not wanted:
+        return []
+    print(f"⚡ Adding {len(wanted)} item(s) over HTTP ({config.http_concurrency} at a time)...")
+    client = HttpCart.from_driver(driver, max_concurrency=config.http_concurrency, timeout=config.timeout,
+                                  governor=governor(config))
+    try:
+        results = client.add_many(wanted)
+        client.sync_cookies_to(driver)
+    finally:
+        client.close()
+    added = []
+    for res in results:
+        if res['ok']:
+            print(f"✅ Added to cart (HTTP): {res['title']}")
+            added.append({'title': res['title'], 'asin': res['asin']})
+        else:
+            print(f"⚠️ HTTP add failed for {res['title']}: {res.get('error')}")
+    return added
 
-    clicked = False
-    for sel in proceed_selectors:
-        try:
-            btn = wait.until(EC.element_to_be_clickable(sel))
-            btn.click()
-            clicked = True
-            print("🚀 Clicked proceed button using selector:", sel)
-            break
-        except Exception:
-            continue
 
-    if not clicked:
-        print("⚠️ Checkout/Proceed button not found by known selectors. Please check the cart page manually.")
-    else:
-        # Wait for checkout page or order flow to load (stop before payment)
-        def _checkout_loaded(d):
-            try:
-                url = d.current_url.lower()
-                if 'checkout' in url or '/gp/buy' in url or '/checkout' in url:
-                    return True
-            except Exception:
-                pass
-            # common checkout elements
-            try:
-                if len(d.find_elements(By.ID, 'shippingOptionFormId')) > 0:
-                    return True
-            except Exception:
-                pass
-            try:
-                if len(d.find_elements(By.NAME, 'placeYourOrder1')) > 0:
-                    return True
-            except Exception:
-                pass
-            return False
+def add_from_stream(driver, config, products):
+    """Take up to config.max_products items from ``products`` (see :func:`stream_products`) and add them.
+
+    The stream is closed as soon as the quota is taken, so no further
+    results are parsed or pages fetched. Returns the list of added items.
+    """
+    with contextlib.closing(products):
+        picked = list(itertools.islice(products, config.max_products))
+    print(f"📦 Took {len(picked)} qualifying product(s) from the stream.")
+    if not picked:
+        return []
+    return add_to_cart(driver, config, picked, picked)
+
+
+@traced("add-to-cart")
+def add_to_cart(driver, config, records, choices):
+    """Add up to config.max_products items; returns the list of added items."""
+    from selenium.webdriver.common.by import By
+
+    if config.add_mode == "http":
+        added = add_over_http(driver, config, choices)
+        if added:
+            return added
+        print("⚠️ Nothing added over HTTP; falling back to the browser flow.")
+
+    products = driver.find_elements(By.XPATH, PRODUCT_XPATH)
+    titles_by_asin = {r['asin']: r['title'] for r in records}
+    # only the ranked choices' containers, best first: products the filters dropped are never added
+    rank = {r['asin']: i for i, r in enumerate(choices) if r.get('asin')}
+    asins = driver.execute_script("return arguments[0].map(function (p) { return p.getAttribute('data-asin'); });",
+                                  products) if products else []
+    ordered = sorted((pa for pa in zip(products, asins) if pa[1] in rank), key=lambda pa: rank[pa[1]])
+    added = add_inline(driver, config, [p for p, _ in ordered], titles_by_asin)
+
+    # If nothing was added inline, fall back to opening product pages and using the more robust add flow
+    if len(added) == 0:
+        print("⚠️ No items added from inline buttons; falling back to opening product pages to add items.")
+        # Before opening product pages, attempt a global diagnostic + mapped-click fallback.
+        diagnostic_add(driver, config, products, choices)
+        added.extend(add_from_product_pages(driver, config, choices))
+    if config.add_confirm == "batch" and added:
+        added = reconcile_cart(driver, config, added, choices)
+    return added
+
+
+def read_cart(driver, config):
+    """Load the cart page once and return its line items by ASIN (see extraction.parse_cart)."""
+    from selenium.webdriver.common.by import By
+
+    url = f"{config.base_url}/gp/cart/view.html?ref_=nav_cart"
+    driver.get(url)
+    wait_for_first(driver, [(By.ID, "sc-active-cart"), (By.NAME, "proceedToRetailCheckout")],
+                   timeout=config.timeout, clickable=False)
+    html, _ = checked_source(driver, config, url, "cart")
+    recorder = flight_recorder(config)
+    if recorder:
+        recorder.snapshot(driver, "cart", html, url)
+    return {item['asin']: item for item in parse_cart(html)}
+
+
+@traced("reconcile")
+def reconcile_cart(driver, config, clicked, choices):
+    """Check the batch of unconfirmed adds against the cart in one pass; retry the missing ones once.
+
+    ``clicked`` are the items whose add buttons were clicked. Returns those
+    found in the cart (with the cart's quantity and price).
+    """
+    wanted = [item for item in clicked if item.get('asin')]
+    lines = read_cart(driver, config)
+    missing = {item['asin'] for item in wanted if item['asin'] not in lines}
+    if missing:
+        print(f"🔁 {len(missing)} clicked item(s) are not in the cart; retrying them...")
+        retry = [r for r in choices if r.get('asin') in missing]
+        # the stored forms are the cheapest retry; anything without one goes through its product page
+        by_http = [r for r in retry if r.get('add_form')]
+        if by_http:
+            add_over_http(driver, config, by_http)
+        by_page = [r for r in retry if not r.get('add_form')]
+        if by_page:
+            add_from_product_pages(driver, config, by_page)
+        lines = read_cart(driver, config)
+    confirmed = []
+    for item in wanted:
+        line = lines.get(item['asin'])
+        if line:
+            confirmed.append(dict(item, quantity=line['quantity'], price_num=line['price_num']))
+        else:
+            print(f"⚠️ Not in the cart after retrying: {item['title']}")
+    print(f"🧾 Cart reconciled: {len(confirmed)}/{len(wanted)} clicked item(s) present.")
+    return confirmed
+
+
+# --- PROCEED TO CART / CHECKOUT ---
+@traced("checkout")
+def checkout(driver, config):
+    """Open the cart and click Proceed to Buy (``flow.checkout``), stopping before payment. Returns True on success."""
+    registry = selector_registry(config)
+    try:
+        reached = flow.checkout(SeleniumBackend(driver), config, registry)
+    except Exception as e:
+        print("⚠️ Error while attempting to proceed to buy:", e)
+        return False
+    finally:
+        _save_registry(registry)
+    if reached and config.payment_alert:
+        payment_alert(driver, config)
+    return reached
+
 
+def payment_alert(driver, config):
+    """Show a browser alert asking for the payment details and wait for the user to dismiss it."""
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    try:
+        # Show a browser alert so the user is notified inside the browser UI
+        msg = (
+            "Please enter your payment details to complete the purchase."
+        )
+        driver.execute_script("alert(arguments[0]);", msg)
+        # Wait for the user to dismiss the alert. Use expected_conditions until_not as primary.
         try:
-            wait.until(_checkout_loaded)
-            print("✅ Reached checkout page (stopping before payment).")
-            try:
-                # Show a browser alert so the user is notified inside the browser UI
-                msg = (
-                    "Please enter your payment details to complete the purchase."
-                )
-                driver.execute_script("alert(arguments[0]);", msg)
-                # Wait for the user to dismiss the alert. Use expected_conditions until_not as primary.
+            WebDriverWait(driver, config.timeout).until_not(EC.alert_is_present())
+        except Exception:
+            # Fallback: poll for alert absence for up to 5 minutes
+            start = time.time()
+            while time.time() - start < 300:
                 try:
-                    wait.until_not(EC.alert_is_present())
+                    # if this raises, alert is gone
+                    _ = driver.switch_to.alert
+                    time.sleep(0.5)
                 except Exception:
-                    # Fallback: poll for alert absence for up to 5 minutes
-                    start = time.time()
-                    while time.time() - start < 300:
-                        try:
-                            # if this raises, alert is gone
-                            _ = driver.switch_to.alert
-                            time.sleep(0.5)
-                        except Exception:
-                            break
-            except Exception:
-                # If JS alerts are blocked or any other error, continue and leave browser open
-                pass
-        except Exception:
-            print("⚠️ Proceed clicked but checkout page not detected within timeout; verify manually.")
-except Exception as e:
-    print("⚠️ Error while attempting to proceed to buy:", e)
+                    break
+    except Exception:
+        # If JS alerts are blocked or any other error, continue and leave browser open
+        pass
+
+
+def run(config, driver=None):
+    """Run the whole flow on ``driver`` (launched if not given). Returns the driver.
+
+    With ``config.trace`` set, every WebDriver command is recorded per stage
+    and written there as a Chrome trace (see ``tracing``). With a backend
+    other than selenium the portable flow (``flow.run_flow``) runs instead
+    and the backend is returned.
+
+    If a stage raises, the flight recorder (``config.flight_recorder``) writes
+    what led up to it before the exception propagates.
+    """
+    tracer = Tracer().activate() if config.trace else None
+    recorder = flight_recorder(config)
+    gov = governor(config)
+    try:
+        if driver is None:
+            with tracing.span("launch"):
+                driver = launch_browser(config) if config.backend == "selenium" else open_backend(config)
+        if recorder and hasattr(driver, "execute"):
+            recorder.instrument(driver)
+        if gov and config.backend == "selenium":
+            gov.instrument(driver)
+        if tracer and hasattr(driver, "execute"):
+            tracer.instrument(driver)
+        if config.backend != "selenium":
+            flow.run_flow(driver, config)
+            return driver
+        login(driver, config)
+        if config.stream:
+            # the add stage pulls results as they are parsed and stops the search when it has enough
+            search(driver, config)
+            add_from_stream(driver, config, stream_products(driver, config))
+        else:
+            search(driver, config)
+            records, choices = extract(driver, config)
+            add_to_cart(driver, config, records, choices)
+        checkout(driver, config)
+    except Exception as e:
+        if recorder and driver is not None:
+            recorder.dump(driver, f"{failed_stage(e)}-{type(e).__name__}", error=e)
+        raise
+    finally:
+        if tracer:
+            tracer.deactivate()
+            try:
+                tracer.write_chrome_trace(config.trace)
+                print(tracer.format_summary())
+                print(f"📈 Trace written to {config.trace} (open in chrome://tracing or ui.perfetto.dev)")
+            except Exception as e:
+                print(f"⚠️ Could not write trace: {e}")
+    return driver
+
+
+def main():
+    config = configure(interactive=True)
+    print(f"Searching for: {config.search_item!r} | price_min={config.price_min} price_max={config.price_max} min_rating={config.min_rating}")
+    driver = launch_browser(config) if config.backend == "selenium" else open_backend(config)
+    try:
+        run(config, driver)
+    except (LoginError, Blocked) as e:
+        print(f"❌ {e}")
+        driver.quit()
+        sys.exit(1)
+
+    print(f"Automation finished. Keeping browser open for {config.inspect_seconds:g} seconds for inspection.")
+    time.sleep(config.inspect_seconds)
+    driver.quit()
+
 
-print("Automation finished. Keeping browser open for 60 seconds for inspection.")
-time.sleep(60)
-driver.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
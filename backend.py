@@ -0,0 +1,219 @@
+"""Browser backends: the handful of operations the shared stages (``flow``) need.
+
+Every backend navigates, reads the document, finds elements by CSS selector,
+clicks, types, waits and moves cookies; elements are opaque handles that are
+only passed back to the backend that returned them. Three implementations:
+
+* :class:`SeleniumBackend` (here): chromedriver over the WebDriver wire
+  protocol, i.e. the agent's usual browser;
+* ``cdp_backend.CdpBackend``: Chrome driven directly over one DevTools
+  websocket, without chromedriver in between;
+* ``fake_backend.FakeBackend``: no browser at all, an in-memory DOM built from
+  HTML fixtures (or pages fetched from ``fixture_server``), for tests and
+  benchmarks.
+
+Use :func:`open_backend` to get one by name.
+"""
+import abc
+import time
+
+BACKENDS = ("selenium", "cdp", "fake")
+
+# First element matching selector (under ``this`` if it is an element) whose text contains one of phrases
+_FIND_TEXT_FN = r"""function (selector, phrases) {
+  var els = (this && this.querySelectorAll ? this : document).querySelectorAll(selector);
+  for (var i = 0; i < els.length; i++) {
+    var text = (els[i].textContent || '').replace(/\s+/g, ' ').toLowerCase();
+    for (var j = 0; j < phrases.length; j++) if (text.indexOf(phrases[j]) >= 0) return els[i];
+  }
+  return null;
+}"""
+
+
+class Backend(abc.ABC):
+    """Interface shared by the backends. Selectors are CSS selectors."""
+
+    name = "base"
+
+    # --- documents ---
+    @abc.abstractmethod
+    def navigate(self, url):
+        """Load ``url`` and return once the document is ready."""
+
+    @property
+    @abc.abstractmethod
+    def url(self):
+        """URL of the current document."""
+
+    @abc.abstractmethod
+    def html(self):
+        """Serialized document (what ``extraction.parse_search_results`` takes)."""
+
+    # --- elements ---
+    @abc.abstractmethod
+    def query_all(self, selector, root=None):
+        """Handles of the elements matching ``selector`` (inside ``root`` if given)."""
+
+    def query(self, selector, root=None):
+        found = self.query_all(selector, root)
+        return found[0] if found else None
+
+    def find_text(self, selector, phrases, root=None):
+        """First element matching ``selector`` whose text contains one of ``phrases`` (lowercase), or None."""
+        for handle in self.query_all(selector, root):
+            text = self.text(handle).lower()
+            if any(phrase in text for phrase in phrases):
+                return handle
+        return None
+
+    @abc.abstractmethod
+    def attribute(self, handle, name):
+        """Attribute (or DOM property) ``name`` of ``handle``, None if absent."""
+
+    @abc.abstractmethod
+    def text(self, handle):
+        """Text content of ``handle`` with whitespace collapsed."""
+
+    @abc.abstractmethod
+    def click(self, handle):
+        """Click ``handle``; returns once a navigation it started has loaded."""
+
+    @abc.abstractmethod
+    def type(self, handle, text, submit=False):
+        """Set the value of a form field; ``submit`` then submits its form (like pressing Enter)."""
+
+    def wait_for(self, selectors, timeout=10):
+        """Wait for the first of ``selectors`` to match. Returns ``(index, handle)`` or ``(-1, None)``."""
+        deadline = time.monotonic() + timeout
+        while True:
+            for i, selector in enumerate(selectors):
+                handle = self.query(selector)
+                if handle is not None:
+                    return i, handle
+            if time.monotonic() >= deadline:
+                return -1, None
+            time.sleep(0.1)
+
+    def screenshot(self):
+        """PNG of the viewport, or None where there is nothing to render."""
+        return None
+
+    # --- session ---
+    @abc.abstractmethod
+    def cookies(self):
+        """Cookies of the session as ``[{"name", "value", "domain", "path", ...}]``."""
+
+    @abc.abstractmethod
+    def set_cookies(self, cookies):
+        """Add ``cookies`` (dicts as returned by :meth:`cookies`) to the session."""
+
+    def close(self):
+        pass
+
+    def quit(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SeleniumBackend(Backend):
+    """The interface on top of a Selenium WebDriver (``driver`` stays usable directly)."""
+
+    name = "selenium"
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def navigate(self, url):
+        self.driver.get(url)
+
+    @property
+    def url(self):
+        return self.driver.current_url
+
+    def html(self):
+        return self.driver.page_source
+
+    def query_all(self, selector, root=None):
+        from selenium.webdriver.common.by import By
+
+        return (root or self.driver).find_elements(By.CSS_SELECTOR, selector)
+
+    def attribute(self, handle, name):
+        return handle.get_attribute(name)
+
+    def text(self, handle):
+        return " ".join((handle.get_attribute("textContent") or "").split())
+
+    def find_text(self, selector, phrases, root=None):
+        # one script instead of a text() round-trip per element
+        return self.driver.execute_script(f"return ({_FIND_TEXT_FN}).call(arguments[2], arguments[0], arguments[1]);",
+                                          selector, list(phrases), root)
+
+    def click(self, handle):
+        try:
+            handle.click()
+        except Exception:
+            # covered by an overlay or off screen: let the page handle a synthetic click
+            self.driver.execute_script("arguments[0].click();", handle)
+
+    def type(self, handle, text, submit=False):
+        from selenium.webdriver.common.keys import Keys
+
+        handle.clear()
+        handle.send_keys(text + (Keys.RETURN if submit else ""))
+
+    def wait_for(self, selectors, timeout=10):
+        from selenium.webdriver.common.by import By
+        from waits import wait_for_first
+
+        locators = [(By.CSS_SELECTOR, s, False) for s in selectors]
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                res = wait_for_first(self.driver, locators, timeout=remaining)
+                break
+            except Exception:
+                # the document was replaced while the script waited: look again in the new one
+                if remaining <= 0:
+                    return -1, None
+                time.sleep(0.05)
+        return (res["index"], res["element"]) if res["index"] >= 0 else (-1, None)
+
+    def screenshot(self):
+        return self.driver.get_screenshot_as_png()
+
+    def cookies(self):
+        return self.driver.get_cookies()
+
+    def set_cookies(self, cookies):
+        for c in cookies:
+            self.driver.add_cookie({k: v for k, v in c.items() if k in ("name", "value", "domain", "path",
+                                                                        "secure", "httpOnly", "expiry")})
+
+    def close(self):
+        self.driver.quit()
+
+
+def open_backend(config):
+    """Start the backend named by ``config.backend`` for ``config``."""
+    if config.backend == "selenium":
+        import amazon_agent
+
+        return SeleniumBackend(amazon_agent.launch_browser(config))
+    if config.backend == "cdp":
+        from cdp_backend import CdpBackend
+
+        return CdpBackend.launch(headless=config.headless or config.lean,
+                                 block_urls=config.block_urls if config.lean else None,
+                                 eager=config.lean, timeout=config.timeout)
+    if config.backend == "fake":
+        from fake_backend import FakeBackend
+
+        return FakeBackend(timeout=config.timeout)
+    raise ValueError(f"Unknown backend {config.backend!r} (expected one of {', '.join(BACKENDS)})")
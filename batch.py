@@ -0,0 +1,289 @@
+"""Non-interactive batch mode: many queries over a few reused browser sessions.
+
+A job file lists one query per line, as JSONL or CSV (with a header row)::
+
+    {"query": "laptop", "price_max": 60000, "min_rating": 4}
+    {"id": "bags", "query": "backpack", "price_min": 500, "add": true}
+
+    query,price_min,price_max,min_rating
+    laptop,,60000,4
+
+Any Config field can be a column (``query`` is an alias for ``search_item``);
+``add`` also adds the best results to the cart and ``checkout`` then proceeds
+to checkout (stopping before payment). Jobs are pulled from a shared
+queue by ``sessions`` worker threads. Each worker owns one Chrome session,
+launched and reused for every job it takes (relaunched only if it dies); only
+the first one goes through the sign-in, the others get its session injected
+(``session_broker``), and a session that finds itself signed out refreshes it
+for all of them. One JSON line per job (status, timing, top results) is appended to
+the output file as soon as the job finishes::
+
+    python batch.py jobs.jsonl --out results.jsonl --sessions 3
+"""
+import argparse
+import contextlib
+import csv
+import dataclasses
+import io
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+
+import amazon_agent as agent
+from lean import parse_blocklist
+from session_cache import SessionCache
+
+# Job fields that are not Config fields; the Config fields take their types from the dataclass
+_JOB_FIELDS = {"id": str, "query": str, "add": bool, "checkout": bool}
+_FIELD_TYPES = dict({f.name: f.type for f in dataclasses.fields(agent.Config)}, **_JOB_FIELDS)
+_BOOLS = {"1": True, "true": True, "yes": True, "on": True, "0": False, "false": False, "no": False, "off": False}
+_STOP = object()
+
+
+def _coerce(key, value):
+    """``value`` (a CSV string or a JSON value) as the type of field ``key``; None for blanks.
+
+    Raises ValueError if it cannot be converted. Unknown keys are returned
+    unchanged (and rejected when the job runs).
+    """
+    if value is None or value == "":
+        return None
+    kind = _FIELD_TYPES.get(key)
+    if kind is None:
+        return value
+    if kind is tuple:
+        return tuple(value) if isinstance(value, (list, tuple)) else parse_blocklist(str(value))
+    if isinstance(value, (dict, list)) or (isinstance(value, bool) and kind is not bool):
+        raise ValueError(f"{key}={value!r} is not a valid {kind.__name__}")
+    if kind is str:
+        return str(value)
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        if str(value).strip().lower() not in _BOOLS:
+            raise ValueError(f"{key}={value!r} is not a valid bool (use true/false)")
+        return _BOOLS[str(value).strip().lower()]
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{key}={value!r} is not a valid {kind.__name__}") from None
+    if kind is int:
+        if not number.is_integer():
+            raise ValueError(f"{key}={value!r} is not a valid int")
+        return int(number)
+    return number
+
+
+def load_jobs(path):
+    """Read jobs from a .csv file or JSONL (anything else). Each job gets an ``id``."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    jobs = []
+    for n, row in enumerate(rows, start=1):
+        try:
+            jobs.append(make_job(row, str(n)))
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+    return jobs
+
+
+def make_job(row, default_id):
+    """A job dict from one row of fields (values coerced, ``query`` renamed). Raises ValueError without a query."""
+    try:
+        job = {k.strip(): _coerce(k.strip(), v) for k, v in row.items() if k}
+    except ValueError as e:
+        raise ValueError(f"job {row.get('id') or default_id}: {e}") from None
+    if "query" in job:
+        job["search_item"] = job.pop("query")
+    if not job.get("search_item"):
+        raise ValueError(f"job {default_id} has no query")
+    job.setdefault("id", default_id)
+    return job
+
+
+class BatchRunner:
+    """Run jobs on at most ``sessions`` browsers, streaming one result line per job to ``out``."""
+
+    def __init__(self, config, sessions=2, out=None, top=5, quiet=True):
+        self.config = config
+        self.sessions = max(1, int(sessions))
+        self.out = out
+        self.top = top
+        self.quiet = quiet
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def _job_config(self, job):
+        overrides = {k: v for k, v in job.items() if k not in ("id", "add", "checkout") and v is not None}
+        unknown = [k for k in overrides if not hasattr(self.config, k)]
+        if unknown:
+            raise TypeError(f"Unknown job field(s): {', '.join(unknown)}")
+        return dataclasses.replace(self.config, payment_alert=False, inspect_seconds=0, **overrides)
+
+    def _start_session(self):
+        driver = agent.launch_browser(self.config)
+        recorder = agent.flight_recorder(self.config)
+        if recorder:
+            recorder.instrument(driver)
+        gov = agent.governor(self.config)
+        if gov:
+            # one pace and one back-off for all sessions
+            gov.instrument(driver)
+        if self.config.email:
+            agent.login(driver, self.config)
+        return driver
+
+    def run_job(self, driver, job, progress=None):
+        """Search (+ extract, optionally add and check out) one job on an open session. Returns the result dict.
+
+        ``progress(result)``, if given, gets the result as soon as the search results are ranked.
+        """
+        config = self._job_config(job)
+        t0 = time.perf_counter()
+        if self.config.email:
+            broker = agent.session_broker(self.config)
+            # another session may have signed in again since this one got its cookies
+            broker.sync(driver)
+        agent.search(driver, config)
+        if self.config.email and not SessionCache.signed_in(driver):
+            print("🔑 Session signed out; signing in again for every session...")
+            broker.expired(driver)
+            agent.search(driver, config)
+        if config.stream:
+            # as in amazon_agent.run: the first qualifying results in listing order, and the sweep stops there
+            with contextlib.closing(agent.stream_products(driver, config)) as products:
+                choices = list(itertools.islice(products, max(config.max_products, self.top)))
+            records = choices
+        else:
+            records, choices = agent.extract(driver, config)
+        result = {
+            "id": job["id"],
+            "query": config.search_item,
+            "status": "ok",
+            "records": len(records),
+            "choices": len(choices),
+            "top": [{k: r.get(k) for k in ("asin", "title", "price_num", "rating_num", "reviews_num", "url")}
+                    for r in choices[:self.top]],
+        }
+        if progress:
+            progress(dict(result, seconds=round(time.perf_counter() - t0, 3)))
+        if job.get("add"):
+            result["added"] = agent.add_to_cart(driver, config, records, choices)
+        if job.get("checkout"):
+            result["checkout"] = agent.checkout(driver, config)
+        result["seconds"] = round(time.perf_counter() - t0, 3)
+        return result
+
+    def failure(self, driver, job, error, t0):
+        """The result dict of a job that raised ``error`` (with a flight recording of ``driver``)."""
+        result = {"id": job["id"], "query": job.get("search_item"), "status": "error",
+                  "error": f"{type(error).__name__}: {error}", "seconds": round(time.perf_counter() - t0, 3)}
+        recorder = agent.flight_recorder(self.config)
+        if recorder and driver is not None:
+            result["recording"] = recorder.dump(driver, f"{job['id']}-{agent.failed_stage(error)}", error=error)
+        return result
+
+    def _emit(self, sink, result):
+        with self._lock:
+            if result["status"] == "ok":
+                self.stats["ok"] += 1
+            else:
+                self.stats["failed"] += 1
+            if sink:
+                sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+                sink.flush()
+            done = self.stats["ok"] + self.stats["failed"]
+        print(f"[{done}/{self.stats['jobs']}] {result['id']} {result['query']!r}: {result['status']}"
+              + (f" ({result.get('choices', 0)} matches, {result['seconds']:.1f}s)" if result["status"] == "ok"
+                 else f" - {result.get('error')}"), file=sys.__stdout__, flush=True)
+
+    def _worker(self, jobs_q, sink):
+        driver = None
+        try:
+            while True:
+                job = jobs_q.get()
+                if job is _STOP:
+                    break
+                t0 = time.perf_counter()
+                try:
+                    if driver is None:
+                        driver = self._start_session()
+                    result = self.run_job(driver, job)
+                except Exception as e:
+                    result = self.failure(driver, job, e, t0)
+                    # a broken session is replaced for the next job
+                    if driver is not None and not _alive(driver):
+                        _quit(driver)
+                        driver = None
+                self._emit(sink, result)
+        finally:
+            if driver is not None:
+                _quit(driver)
+
+    def run(self, jobs):
+        """Run every job; returns stats (jobs, ok, failed, elapsed, jobs_per_min)."""
+        jobs = list(jobs)
+        jobs_q = queue.Queue()
+        for job in jobs:
+            jobs_q.put(job)
+        n_workers = min(self.sessions, len(jobs)) or 1
+        for _ in range(n_workers):
+            jobs_q.put(_STOP)
+        self.stats = {"jobs": len(jobs), "ok": 0, "failed": 0, "sessions": n_workers}
+        t0 = time.perf_counter()
+        sink = open(self.out, "a", encoding="utf-8") if self.out else contextlib.nullcontext()
+        # the stages print as they go; with several sessions that output is just noise
+        # (redirect_stdout is process-wide, so it wraps all workers at once)
+        quiet = contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+        with sink, quiet:
+            threads = [threading.Thread(target=self._worker, args=(jobs_q, sink if self.out else None), daemon=True)
+                       for _ in range(n_workers)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        elapsed = time.perf_counter() - t0
+        self.stats.update(elapsed=elapsed, jobs_per_min=60 * len(jobs) / elapsed if elapsed else 0.0)
+        return self.stats
+
+
+def _alive(driver):
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run many agent queries from a JSONL/CSV job file")
+    ap.add_argument("jobs", help="job file (.jsonl or .csv)")
+    ap.add_argument("--out", default="batch_results.jsonl", help="JSONL file results are appended to")
+    ap.add_argument("--sessions", type=int, default=2, help="browser sessions to run jobs on")
+    ap.add_argument("--top", type=int, default=5, help="top results to record per job")
+    ap.add_argument("--verbose", action="store_true", help="show the agent's own output")
+    args = ap.parse_args()
+
+    config = agent.configure(headless=True)
+    jobs = load_jobs(args.jobs)
+    print(f"Running {len(jobs)} job(s) on {min(args.sessions, len(jobs))} session(s) -> {args.out}")
+    stats = BatchRunner(config, sessions=args.sessions, out=args.out, top=args.top, quiet=not args.verbose).run(jobs)
+    print(f"Done: {stats['ok']} ok, {stats['failed']} failed in {stats['elapsed']:.1f}s "
+          f"({stats['jobs_per_min']:.1f} jobs/min)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: the portable flow (flow.run_flow) on each browser backend.
+
+Against the local fixture site, each backend runs the whole flow (login,
+search, scrape, product-page adds, checkout) ``--runs`` times, then a tight
+loop of small operations on a loaded results page (find the cart badge and
+read its text) to show the per-command cost of the transport: WebDriver HTTP
+to chromedriver (selenium), one DevTools websocket (cdp), or none (fake).
+Backends that cannot start here (no Chrome) are reported and skipped.
+
+    python benchmarks/bench_backends.py --backends fake,cdp,selenium --runs 3
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import amazon_agent as agent  # noqa: E402
+from backend import open_backend  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+from flow import run_flow  # noqa: E402
+
+
+def bench_backend(name, site, runs, ops):
+    config = agent.Config(backend=name, base_url=site.url, email=site.email, password=site.password,
+                          headless=True, session_cache="", catalog="", selector_stats="", timeout=10)
+    stages, totals, flows_ok = {}, [], 0
+    t0 = time.perf_counter()
+    backend = open_backend(config)
+    launch_ms = (time.perf_counter() - t0) * 1000
+    try:
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                summary = run_flow(backend, config)
+            totals.append((time.perf_counter() - t0) * 1000)
+            flows_ok += bool(summary["added"]) and summary["checkout"]
+            for stage, seconds in summary["stages"].items():
+                stages.setdefault(stage, []).append(seconds * 1000)
+        backend.navigate(f"{site.url}/s?k=laptop")
+        t0 = time.perf_counter()
+        for _ in range(ops):
+            backend.text(backend.query("#nav-cart-count"))
+        op_us = (time.perf_counter() - t0) / ops / 2 * 1e6
+    finally:
+        backend.close()
+    return {
+        "launch_ms": launch_ms,
+        "flow_ms": statistics.median(totals),
+        "stages_ms": {k: statistics.median(v) for k, v in stages.items()},
+        "op_us": op_us,
+        "ok": f"{flows_ok}/{runs}",
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--backends", default="fake,cdp,selenium")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--ops", type=int, default=200, help="find+read operations for the per-command cost")
+    ap.add_argument("--latency", type=float, default=0.0, help="fixture latency per response (s)")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    results = {}
+    with FixtureServer(latency=args.latency) as site:
+        for name in args.backends.split(","):
+            try:
+                results[name] = bench_backend(name, site, args.runs, args.ops)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    stage_names = sorted({s for r in results.values() for s in r.get("stages_ms", {})},
+                         key=["login", "search", "scrape", "product-page", "checkout"].index)
+    print(f"{'backend':<10}{'launch':>8}{'flow':>8}" + "".join(f"{s:>14}" for s in stage_names)
+          + f"{'us/command':>12}{'ok':>6}")
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:<10}skipped: {r['error'][:100]}")
+            continue
+        print(f"{name:<10}{r['launch_ms']:>8.0f}{r['flow_ms']:>8.0f}"
+              + "".join(f"{r['stages_ms'].get(s, 0):>14.1f}" for s in stage_names)
+              + f"{r['op_us']:>12.0f}{r['ok']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""End-to-end benchmark of the agent against the local fixture site.
+
+Starts fixture_server.FixtureServer, runs the agent's stages (launch, login,
+search, extract, add_to_cart, checkout) in headless Chrome, and records wall
+time and WebDriver command count per stage (via ``tracing.Tracer``). Results
+are written as JSON so runs can be compared for regressions (runs/hour is the
+headline number); ``--trace`` also saves the last run as a Chrome trace.
+
+    python benchmarks/bench_e2e.py --runs 5 --latency 0.05 --out bench_e2e.json
+    python benchmarks/bench_e2e.py --runs 3 --add-mode http --extract-mode js
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import amazon_agent as agent  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+from tracing import Tracer  # noqa: E402
+
+STAGES = ("launch", "login", "search", "extract", "add_to_cart", "checkout")
+
+
+def run_once(config, quiet=True, trace_path=None):
+    stages = {}
+    out = io.StringIO() if quiet else sys.stdout
+    tracer = Tracer().activate()
+    with contextlib.redirect_stdout(out):
+        t0 = time.perf_counter()
+        driver = agent.launch_browser(config)
+        stages["launch"] = {"seconds": time.perf_counter() - t0, "commands": 0}
+        tracer.instrument(driver)
+        result = {}
+        try:
+            steps = (
+                ("login", lambda: agent.login(driver, config)),
+                ("search", lambda: agent.search(driver, config)),
+                ("extract", lambda: result.update(extracted=agent.extract(driver, config))),
+                ("add_to_cart", lambda: result.update(added=agent.add_to_cart(driver, config, *result["extracted"]))),
+                ("checkout", lambda: result.update(checkout=agent.checkout(driver, config))),
+            )
+            for name, fn in steps:
+                before, t = len(tracer.events), time.perf_counter()
+                fn()
+                commands = sum(1 for e in tracer.events[before:] if e["kind"] == "command")
+                stages[name] = {"seconds": time.perf_counter() - t, "commands": commands}
+        finally:
+            tracer.deactivate()
+            driver.quit()
+    if trace_path:
+        tracer.write_chrome_trace(trace_path)
+    return {
+        "stages": stages,
+        "total_seconds": sum(s["seconds"] for s in stages.values()),
+        "records": len(result.get("extracted", ([], []))[0]),
+        "added": len(result.get("added", [])),
+        "checkout": bool(result.get("checkout")),
+    }
+
+
+def summarize(runs):
+    summary = {}
+    for stage in STAGES:
+        secs = [r["stages"][stage]["seconds"] for r in runs if stage in r["stages"]]
+        cmds = [r["stages"][stage]["commands"] for r in runs if stage in r["stages"]]
+        if secs:
+            summary[stage] = {
+                "median_seconds": statistics.median(secs),
+                "max_seconds": max(secs),
+                "median_commands": statistics.median(cmds),
+            }
+    totals = [r["total_seconds"] for r in runs]
+    summary["total"] = {"median_seconds": statistics.median(totals)}
+    summary["runs_per_hour"] = 3600 / statistics.median(totals) if totals else 0
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.0, help="fixture latency per response (s)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="fixture 503 rate")
+    ap.add_argument("--results", type=int, default=24, help="results per fixture search page")
+    ap.add_argument("--search-pages", type=int, default=1)
+    ap.add_argument("--extract-mode", default="snapshot", choices=("snapshot", "js"))
+    ap.add_argument("--add-mode", default="browser", choices=("browser", "http"))
+    ap.add_argument("--max-products", type=int, default=2)
+    ap.add_argument("--out", default="bench_e2e.json", help="where to write the JSON results")
+    ap.add_argument("--trace", help="write a Chrome trace of the last run here")
+    ap.add_argument("--verbose", action="store_true", help="show the agent's own output")
+    args = ap.parse_args()
+    args.out = os.path.abspath(args.out)
+    args.trace = args.trace and os.path.abspath(args.trace)
+    # the agent drops debug files (sample_product.html, ...) in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_e2e_"))
+
+    site = FixtureServer(latency=args.latency, fail_rate=args.fail_rate, results_per_page=args.results).start()
+    try:
+        config = agent.configure(
+            base_url=site.url, email=site.email, password=site.password, search_item="laptop",
+            headless=True, session_cache="", payment_alert=False, inspect_seconds=0,
+            extract_mode=args.extract_mode, add_mode=args.add_mode, search_pages=args.search_pages,
+            max_products=args.max_products,
+        )
+        runs = []
+        for i in range(args.runs):
+            res = run_once(config, quiet=not args.verbose,
+                           trace_path=args.trace if i == args.runs - 1 else None)
+            runs.append(res)
+            line = "  ".join(f"{s}={res['stages'][s]['seconds']:.2f}s/{res['stages'][s]['commands']}cmd"
+                             for s in STAGES if s in res["stages"])
+            print(f"run {i + 1}: total={res['total_seconds']:.2f}s  {line}  added={res['added']}")
+    finally:
+        site.stop()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "runs": runs,
+        "summary": summarize(runs),
+        "fixture_requests": site.requests,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"runs/hour: {report['summary']['runs_per_hour']:.0f}  (written to {args.out})")
+
+
+if __name__ == "__main__":
+    main()
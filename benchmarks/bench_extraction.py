@@ -0,0 +1,124 @@
+"""Benchmark: page_source snapshot parsing vs. per-element WebDriver extraction.
+
+Offline (default) it times parse_search_results on a synthetic results page
+built from N copies of a saved container (sample_product.html by default).
+With --browser it also loads that page in headless Chrome and compares the
+legacy per-element path against one page_source call and one bulk
+execute_script, counting WebDriver commands for each.
+
+    python benchmarks/bench_extraction.py --results 60 --repeat 20
+    python benchmarks/bench_extraction.py --results 60 --browser
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extraction import parse_search_results, extract_products_js, extract_products_webdriver  # noqa: E402
+
+
+def build_results_page(template_html, n):
+    """Repeat a saved result container n times with distinct ASINs."""
+    m = re.search(r'data-asin="([^"]+)"', template_html)
+    asin = m.group(1) if m else None
+    parts = ["<html><body><div class='s-main-slot'>"]
+    for i in range(n):
+        fake = f"B{i:09d}"
+        parts.append(template_html.replace(asin, fake) if asin else template_html)
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def _timeit(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, times
+
+
+def _report(label, times, extra=""):
+    print(f"{label:<28} median={statistics.median(times) * 1000:8.2f} ms  "
+          f"min={min(times) * 1000:8.2f} ms {extra}")
+
+
+def _count_commands(driver):
+    """Wrap driver.execute so every WebDriver command (driver or element) is counted."""
+    counter = {"n": 0}
+    original = driver.execute
+
+    def counting_execute(command, params=None):
+        counter["n"] += 1
+        return original(command, params)
+
+    driver.execute = counting_execute
+    return counter
+
+
+def run_browser(page_path, repeat):
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get("file://" + page_path)
+        counter = _count_commands(driver)
+
+        def legacy():
+            products = driver.find_elements(By.XPATH, "//div[contains(@class,'s-result-item') and normalize-space(@data-asin)!='']")
+            return extract_products_webdriver(driver, products)
+
+        def snapshot():
+            return parse_search_results(driver.page_source, base_url=driver.current_url)
+
+        def bulk_js():
+            return extract_products_js(driver)
+
+        for label, fn in (("per-element (legacy)", legacy), ("page_source snapshot", snapshot),
+                          ("execute_script bulk", bulk_js)):
+            counter["n"] = 0
+            records, times = _timeit(fn, repeat)
+            _report(label, times, f"records={len(records)} commands/run={counter['n'] // repeat}")
+    finally:
+        driver.quit()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--template", default=os.path.join(ROOT, "sample_product.html"),
+                    help="saved result container (or full results page with --raw)")
+    ap.add_argument("--raw", action="store_true", help="use the template file as-is (a saved full page)")
+    ap.add_argument("--results", type=int, default=60, help="containers per synthetic page")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--browser", action="store_true", help="also compare against the WebDriver path")
+    args = ap.parse_args()
+
+    with open(args.template, encoding="utf-8") as f:
+        template = f.read()
+    html = template if args.raw else build_results_page(template, args.results)
+    print(f"page size: {len(html) / 1024:.0f} KiB")
+
+    records, times = _timeit(lambda: parse_search_results(html, base_url="https://www.amazon.in/"), args.repeat)
+    _report("parse_search_results", times, f"records={len(records)}")
+
+    if args.browser:
+        with tempfile.NamedTemporaryFile("w", suffix=".html", delete=False, encoding="utf-8") as f:
+            f.write(html)
+        try:
+            run_browser(f.name, args.repeat)
+        finally:
+            os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark: sustained page throughput against a throttling site, with and without the governor.
+
+The local fixture site is started with a rate limit (``--throttle`` page
+requests per second; past it every page is the robot check for
+``--penalty`` seconds). ``--clients`` threads then load search pages over
+HTTP for ``--seconds`` each, either flat out ("none"), paced by a fixed
+token bucket ("fixed", ``--fixed-rate``) or by the AIMD governor starting
+at ``--max-rate`` ("governor"). Reported: pages that came back normal per
+second, requests that hit the block, and the governor's back-offs.
+
+    python benchmarks/bench_governor.py --throttle 8 --clients 6 --seconds 30
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests  # noqa: E402
+
+from fixture_server import FixtureServer  # noqa: E402
+from governor import Governor, TokenBucket, classify  # noqa: E402
+from parallel_search import search_url  # noqa: E402
+
+
+def run_mode(mode, args):
+    with FixtureServer(assets=False, latency=args.latency, throttle=args.throttle,
+                       throttle_penalty=args.penalty) as site:
+        gov = Governor(max_rate=args.max_rate, max_concurrency=args.clients, backoff=args.backoff) \
+            if mode == "governor" else None
+        bucket = TokenBucket(args.fixed_rate) if mode == "fixed" else None
+        counts = {"ok": 0, "blocked": 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + args.seconds
+
+        def client(n):
+            session = requests.Session()
+            page = 0
+            while time.monotonic() < deadline:
+                page += 1
+                url = search_url(site.url, f"q{n}", page % 5 + 1)
+                if gov:
+                    with gov.slot():
+                        resp = session.get(url, timeout=10)
+                    verdict = gov.observe(resp.text, resp.url, resp.status_code)
+                else:
+                    if bucket:
+                        bucket.acquire()
+                    resp = session.get(url, timeout=10)
+                    verdict = classify(resp.text, resp.url, resp.status_code)
+                with lock:
+                    counts["ok" if verdict == "ok" else "blocked"] += 1
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    result = {"ok": counts["ok"], "blocked": counts["blocked"], "ok_per_sec": counts["ok"] / elapsed,
+              "elapsed": elapsed}
+    if gov:
+        result.update(backoffs=gov.stats["backoffs"], backoff_s=gov.stats["backoff_s"],
+                      final_rate=gov.bucket.rate, final_limit=gov.limit)
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--modes", default="none,fixed,governor")
+    ap.add_argument("--throttle", type=float, default=8, help="site limit, page requests per second")
+    ap.add_argument("--penalty", type=float, default=5, help="seconds the site blocks once tripped")
+    ap.add_argument("--clients", type=int, default=6)
+    ap.add_argument("--seconds", type=float, default=30)
+    ap.add_argument("--latency", type=float, default=0.05, help="fixture latency per response (s)")
+    ap.add_argument("--fixed-rate", type=float, default=4, help="pages per second of the fixed bucket")
+    ap.add_argument("--max-rate", type=float, default=16, help="governor's starting / highest rate")
+    ap.add_argument("--backoff", type=float, default=5, help="governor's first back-off (s)")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    results = {mode: run_mode(mode, args) for mode in args.modes.split(",")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"site limit {args.throttle:g}/s, {args.clients} clients, {args.seconds:g}s each mode")
+    print(f"{'mode':<10}{'ok':>7}{'blocked':>9}{'ok/s':>8}{'back-offs':>11}{'final rate':>12}")
+    for mode, r in results.items():
+        extra = (f"{r['backoffs']:>11}{r['final_rate']:>12.2f}" if "backoffs" in r else "")
+        print(f"{mode:<10}{r['ok']:>7}{r['blocked']:>9}{r['ok_per_sec']:>8.2f}{extra}")
+
+
+if __name__ == "__main__":
+    main()
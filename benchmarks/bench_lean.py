@@ -0,0 +1,81 @@
+"""Benchmark: default vs lean page-load profile on the local fixture site.
+
+For each profile a Chrome session loads the fixture's home, search and
+product pages (which reference images, a web font, a promo video and a
+third-party ad script). Per page it reports bytes served by the fixture
+(measured server-side, after the page has settled, so late downloads count
+too), time until ``driver.get`` returned, and time-to-interactive from
+Navigation Timing (``domInteractive``).
+
+The default profile runs headless as well so both profiles can run without a
+display; the lean profile adds ``pageLoadStrategy=eager`` and URL blocking.
+
+    python benchmarks/bench_lean.py --repeat 3 --latency 0.02
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import amazon_agent as agent  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+_TTI_JS = "var n = performance.getEntriesByType('navigation')[0]; return n ? n.domInteractive : null;"
+
+
+def measure_profile(site, lean, paths, repeat, settle):
+    config = agent.configure(base_url=site.url, headless=True, lean=lean, session_cache="")
+    driver = agent.launch_browser(config)
+    rows = {path: {"bytes": [], "get_ms": [], "tti_ms": []} for path in paths}
+    try:
+        for _ in range(repeat):
+            for path in paths:
+                time.sleep(settle)  # let the previous page finish downloading
+                before = site.bytes_sent
+                t0 = time.perf_counter()
+                driver.get(site.url + path)
+                get_ms = (time.perf_counter() - t0) * 1000
+                tti = driver.execute_script(_TTI_JS)
+                time.sleep(settle)
+                rows[path]["bytes"].append(site.bytes_sent - before)
+                rows[path]["get_ms"].append(get_ms)
+                rows[path]["tti_ms"].append(tti or 0.0)
+    finally:
+        driver.quit()
+    return {path: {k: statistics.median(v) for k, v in r.items()} for path, r in rows.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.0, help="fixture latency per response (s)")
+    ap.add_argument("--settle", type=float, default=1.0, help="seconds to let a page finish loading before counting bytes")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    with FixtureServer(latency=args.latency) as site:
+        asin = site.search("laptop", 1)[0]["asin"]
+        paths = ["/", "/s?k=laptop", f"/dp/{asin}"]
+        results = {name: measure_profile(site, lean, paths, args.repeat, args.settle)
+                   for name, lean in (("default", False), ("lean", True))}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'page':<22}{'profile':<9}{'KB':>9}{'get ms':>9}{'TTI ms':>9}")
+    for path in paths:
+        for name in results:
+            r = results[name][path]
+            print(f"{path[:21]:<22}{name:<9}{r['bytes'] / 1024:>9.0f}{r['get_ms']:>9.0f}{r['tti_ms']:>9.0f}")
+    for name in results:
+        total = sum(r["bytes"] for r in results[name].values())
+        print(f"{name}: {total / 1024:.0f} KB per home+search+product round")
+
+
+if __name__ == "__main__":
+    main()
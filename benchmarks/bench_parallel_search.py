@@ -0,0 +1,51 @@
+"""Benchmark: multi-page search throughput per worker count.
+
+Runs the same query over pages 1..N with 1, 2, 4... headless workers and
+reports pages/s. It also checks that the merged ASIN order is identical for
+every worker count (the merge must not depend on completion order). Pages
+come from fixture_server.FixtureServer (``--latency`` per response) unless
+``--base-url`` points at a real site.
+
+    python benchmarks/bench_parallel_search.py --query laptop --pages 8 --workers 1,2,4 --latency 0.2
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixture_server import FixtureServer  # noqa: E402
+from parallel_search import ParallelSearch, merge_pages  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--base-url", help="search a real site instead of the local fixture")
+    ap.add_argument("--query", default="laptop")
+    ap.add_argument("--pages", type=int, default=8)
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    ap.add_argument("--latency", type=float, default=0.2, help="fixture latency per response (s)")
+    args = ap.parse_args()
+
+    site = None if args.base_url else FixtureServer(latency=args.latency, pages=args.pages).start()
+    base_url = args.base_url or site.url
+    try:
+        reference = None
+        print(f"{'workers':>7} {'pages':>5} {'failed':>6} {'records':>7} {'seconds':>8} {'pages/s':>8}  deterministic")
+        for n in [int(x) for x in args.workers.split(",") if x.strip()]:
+            pool = ParallelSearch(base_url, workers=n)
+            merged = merge_pages(pool.fetch(args.query, range(1, args.pages + 1)))
+            asins = [r["asin"] for r in merged]
+            if reference is None:
+                reference = asins
+            st = pool.stats
+            print(f"{st['workers']:>7} {st['pages']:>5} {len(st['errors']):>6} {len(merged):>7} "
+                  f"{st['elapsed']:>8.2f} {st['pages_per_sec']:>8.2f}  {asins == reference}")
+    finally:
+        if site:
+            site.stop()
+
+
+if __name__ == "__main__":
+    main()
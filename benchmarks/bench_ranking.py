@@ -0,0 +1,87 @@
+"""Micro-benchmark: filter + de-duplicate + rank search results, pure Python vs columnar.
+
+Synthetic records shaped like the extractor's output (with some duplicate
+ASINs and missing prices/ratings) are ranked with the "value" score two ways:
+per-record Python (extraction.filter_products, a dict for de-duplication and
+sorted()) and ranking.ResultTable (column build, then a vectorized top_k).
+"end-to-end" includes building the columns from the record dicts; "per query"
+is a re-rank or re-filter of an already built table. "rank_products" is the
+one-shot ranking the agent uses (plain Python, see ranking.rank_products).
+
+    python benchmarks/bench_ranking.py --rows 10000,100000 --k 10
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extraction import filter_products  # noqa: E402
+from ranking import PRIOR_RATING, PRIOR_REVIEWS, ResultTable, rank_products  # noqa: E402
+
+
+def make_records(n, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        asin = f"B{rng.randrange(int(n * 0.95)):09d}"  # ~5% duplicates
+        price = None if rng.random() < 0.03 else rng.randrange(199, 150000)
+        rating = None if rng.random() < 0.05 else round(rng.uniform(1, 5), 1)
+        reviews = None if rating is None else rng.randrange(0, 50000)
+        records.append({"asin": asin, "title": f"Product {i}", "price_num": price,
+                        "rating_num": rating, "reviews_num": reviews})
+    return records
+
+
+def python_rank(records, k, price_min, price_max, min_rating):
+    seen = {}
+    for r in records:
+        seen.setdefault(r["asin"], r)
+    kept = filter_products(seen.values(), price_min, price_max, min_rating)
+
+    def value(r):
+        reviews = r["reviews_num"] or 0
+        rating = PRIOR_RATING if r["rating_num"] is None else r["rating_num"]
+        adjusted = (rating * reviews + PRIOR_RATING * PRIOR_REVIEWS) / (reviews + PRIOR_REVIEWS)
+        return adjusted / math.log10(r["price_num"] + 10)
+
+    return sorted(kept, key=value, reverse=True)[:k]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", default="10000,100000")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    bounds = {"price_min": 1000, "price_max": 80000, "min_rating": 3.5}
+
+    print(f"{'rows':>8}{'python ms':>12}{'build ms':>11}{'top_k ms':>11}{'end-to-end':>12}{'per query':>11}"
+          f"{'rank_products':>15}  same top-k")
+    for n in (int(x) for x in args.rows.split(",")):
+        records = make_records(n)
+        py_ms, py_top = timed(lambda: python_rank(records, args.k, **bounds), args.repeat)
+        build_ms, table = timed(lambda: ResultTable(records), args.repeat)
+        topk_ms, rows = timed(lambda: table.top_k(args.k, "value", **bounds), args.repeat)
+        once_ms, once = timed(lambda: rank_products(records, args.k, "value", **bounds), args.repeat)
+        same = [r["asin"] for r in py_top] == [r["asin"] for r in table.take(rows)] == [r["asin"] for r in once]
+        print(f"{n:>8}{py_ms:>12.1f}{build_ms:>11.1f}{topk_ms:>11.2f}"
+              f"{py_ms / (build_ms + topk_ms):>11.1f}x{py_ms / topk_ms:>10.1f}x{py_ms / once_ms:>14.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
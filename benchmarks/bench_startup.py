@@ -0,0 +1,82 @@
+"""Benchmark: import time of amazon_agent and time to first search results.
+
+Import time is measured in fresh interpreters so module caches do not hide the
+cost; the run also reports whether Selenium got pulled in by the import. With
+--browser it launches Chrome and measures launch + first search (anonymous,
+no login).
+
+    python benchmarks/bench_startup.py --repeat 10
+    python benchmarks/bench_startup.py --browser --query laptop
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SNIPPET = (
+    "import sys, time, json; t = time.perf_counter(); import amazon_agent; "
+    "print(json.dumps({'seconds': time.perf_counter() - t, 'selenium': 'selenium' in sys.modules}))"
+)
+
+
+def measure_import(repeat):
+    times = []
+    selenium_loaded = False
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+        res = json.loads(out.strip().splitlines()[-1])
+        times.append(res["seconds"])
+        selenium_loaded = selenium_loaded or res["selenium"]
+    return times, selenium_loaded
+
+
+def measure_first_search(query, base_url):
+    sys.path.insert(0, ROOT)
+    import amazon_agent as agent
+
+    t0 = time.perf_counter()
+    config = agent.configure(search_item=query, headless=True, session_cache="",
+                             **({"base_url": base_url} if base_url else {}))
+    driver = agent.launch_browser(config)
+    t_launch = time.perf_counter()
+    try:
+        agent.search(driver, config)
+        t_search = time.perf_counter()
+        records, _ = agent.extract(driver, config)
+        t_extract = time.perf_counter()
+    finally:
+        driver.quit()
+    return {
+        "launch": t_launch - t0,
+        "first_search": t_search - t0,
+        "first_records": t_extract - t0,
+        "records": len(records),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--browser", action="store_true", help="also time launch + first search")
+    ap.add_argument("--query", default="laptop")
+    ap.add_argument("--base-url", default=None)
+    args = ap.parse_args()
+
+    times, selenium_loaded = measure_import(args.repeat)
+    print(f"import amazon_agent: median={statistics.median(times) * 1000:.1f} ms "
+          f"min={min(times) * 1000:.1f} ms  selenium imported: {selenium_loaded}")
+
+    if args.browser:
+        res = measure_first_search(args.query, args.base_url)
+        print(f"launch={res['launch']:.2f}s  first search={res['first_search']:.2f}s  "
+              f"first records={res['first_records']:.2f}s ({res['records']} records)")
+
+
+if __name__ == "__main__":
+    main()
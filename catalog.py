@@ -0,0 +1,178 @@
+"""Local product catalog: search results keyed by ASIN, with price history.
+
+Every parsed result page is stored in SQLite: products by ASIN (latest record
+plus a price/rating history row whenever either changes) and a per
+(query, page) index of which ASINs the page listed, when it was fetched and a
+digest of that listing. Callers ask :meth:`Catalog.plan` which pages of a
+query must be fetched again:
+
+* pages fetched within ``ttl`` are served from the store;
+* stale pages are served from the store anyway when a freshly fetched page 1
+  lists (nearly) the same ASINs as last time, i.e. the result set has not
+  moved, as long as they are younger than ``max_age``;
+* everything else is fetched.
+
+So a recurring query costs one live page instead of a full multi-page sweep
+until the listing actually changes. Records are stored without their
+``add_form``: its anti-CSRF token belongs to the session that loaded the
+page, so an add has to use the form of a page it loaded itself.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    asin TEXT PRIMARY KEY,
+    title TEXT,
+    url TEXT,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    asin TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    price REAL,
+    rating REAL
+);
+CREATE INDEX IF NOT EXISTS price_history_asin ON price_history (asin, seen_at);
+CREATE TABLE IF NOT EXISTS query_pages (
+    query TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (query, page)
+);
+CREATE TABLE IF NOT EXISTS query_items (
+    query TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    asin TEXT NOT NULL,
+    PRIMARY KEY (query, page, position)
+);
+"""
+
+# Keys that describe where a record was listed rather than the product itself
+_LISTING_KEYS = ("page", "position", "referer")
+# Keys only valid for the session that loaded the page
+_SESSION_KEYS = ("add_form",)
+
+
+def normalize_query(query):
+    return " ".join((query or "").lower().split())
+
+
+def listing_digest(records):
+    """Digest of a page's ASIN order, used to tell whether the listing changed."""
+    return hashlib.sha1("\n".join(r.get("asin", "") for r in records).encode()).hexdigest()
+
+
+class Catalog:
+    """SQLite-backed store of result pages and products.
+
+    Safe to share between threads of one process; other processes can use the
+    same file (SQLite locking, WAL journal).
+    """
+
+    def __init__(self, path, ttl=6 * 3600, max_age=None, similarity=0.8):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age if max_age is not None else 4 * ttl
+        # share of page-1 ASINs (Jaccard) that must match for the listing to count as unchanged;
+        # sponsored slots rotate on every load, so an exact match is too strict
+        self.similarity = similarity
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # --- writes ---
+    def store_page(self, query, page, records, now=None):
+        """Save one fetched result page. Returns True if its listing changed."""
+        now = time.time() if now is None else now
+        query = normalize_query(query)
+        digest = listing_digest(records)
+        with self._lock, self.db:
+            row = self.db.execute("SELECT digest FROM query_pages WHERE query=? AND page=?",
+                                  (query, page)).fetchone()
+            for rec in records:
+                self._upsert_product(rec, now)
+            self.db.execute("DELETE FROM query_items WHERE query=? AND page=?", (query, page))
+            self.db.executemany("INSERT INTO query_items VALUES (?, ?, ?, ?)",
+                                [(query, page, i, r["asin"]) for i, r in enumerate(records) if r.get("asin")])
+            self.db.execute("INSERT OR REPLACE INTO query_pages VALUES (?, ?, ?, ?)", (query, page, now, digest))
+        return row is None or row[0] != digest
+
+    def _upsert_product(self, rec, now):
+        asin = rec.get("asin")
+        if not asin:
+            return
+        data = {k: v for k, v in rec.items() if k not in _LISTING_KEYS and k not in _SESSION_KEYS}
+        self.db.execute(
+            "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(asin) DO UPDATE SET "
+            "title=excluded.title, url=excluded.url, data=excluded.data, last_seen=excluded.last_seen",
+            (asin, rec.get("title"), rec.get("url"), json.dumps(data), now, now))
+        price, rating = rec.get("price_num"), rec.get("rating_num")
+        last = self.db.execute("SELECT price, rating FROM price_history WHERE asin=? ORDER BY seen_at DESC LIMIT 1",
+                               (asin,)).fetchone()
+        if last is None or last != (price, rating):
+            self.db.execute("INSERT INTO price_history VALUES (?, ?, ?, ?)", (asin, now, price, rating))
+
+    # --- reads ---
+    def page_info(self, query):
+        """``{page: (fetched_at, digest)}`` for a query."""
+        with self._lock:
+            rows = self.db.execute("SELECT page, fetched_at, digest FROM query_pages WHERE query=?",
+                                   (normalize_query(query),)).fetchall()
+        return {page: (fetched_at, digest) for page, fetched_at, digest in rows}
+
+    def load_page(self, query, page):
+        """Records of a stored page in listing order (latest product data), or None."""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT p.data FROM query_items q JOIN products p ON p.asin = q.asin "
+                "WHERE q.query=? AND q.page=? ORDER BY q.position",
+                (normalize_query(query), page)).fetchall()
+        if not rows and page not in self.page_info(query):
+            return None
+        # rows written before the add forms were left out still carry one
+        return [{k: v for k, v in json.loads(data).items() if k not in _SESSION_KEYS} for (data,) in rows]
+
+    def history(self, asin):
+        """``[(seen_at, price, rating), ...]`` oldest first."""
+        with self._lock:
+            return self.db.execute("SELECT seen_at, price, rating FROM price_history WHERE asin=? ORDER BY seen_at",
+                                   (asin,)).fetchall()
+
+    def plan(self, query, pages, first_page_records=None, now=None):
+        """Split ``pages`` into ``(cached, to_fetch)`` lists of page numbers.
+
+        ``first_page_records`` is a freshly fetched page 1, if the caller has
+        one; when its listing matches the stored one, stale pages younger than
+        ``max_age`` count as cached too.
+        """
+        now = time.time() if now is None else now
+        info = self.page_info(query)
+        unchanged = False
+        if first_page_records is not None and 1 in info:
+            with self._lock:
+                old = {a for (a,) in self.db.execute("SELECT asin FROM query_items WHERE query=? AND page=1",
+                                                       (normalize_query(query),))}
+            new = {r.get("asin") for r in first_page_records if r.get("asin")}
+            union = old | new
+            unchanged = bool(union) and len(old & new) / len(union) >= self.similarity
+        cached, to_fetch = [], []
+        for page in pages:
+            if page in info:
+                age = now - info[page][0]
+                if age <= self.ttl or (unchanged and age <= self.max_age):
+                    cached.append(page)
+                    continue
+            to_fetch.append(page)
+        return cached, to_fetch
@@ -0,0 +1,359 @@
+"""Chrome driven over the DevTools protocol directly: one websocket, no chromedriver.
+
+With Selenium every operation is an HTTP request to chromedriver, which
+translates it into one or more DevTools commands and polls for their effect.
+:class:`CdpBackend` talks to the page target's websocket itself. Commands are
+JSON messages tagged with an id; a reader thread resolves a
+``concurrent.futures.Future`` per id and dispatches events, so independent
+commands can be pipelined (sent back to back, awaited together, see
+:meth:`CdpBackend.pipeline`) instead of paying a round-trip each.
+
+Waits are promises evaluated in the page (``Runtime.evaluate`` with
+``awaitPromise``) that resolve on the DOM mutation they wait for. Like
+chromedriver, an action that starts a navigation (a click on a submit
+button, Enter in a form) returns once the new document has loaded.
+
+Needs a Chrome/Chromium binary (``CHROME_BINARY`` or one on PATH) and the
+``websocket-client`` package, which Selenium already depends on.
+"""
+import base64
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+
+from backend import _FIND_TEXT_FN, Backend
+
+_CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+# Resolves with the index of the first selector that matches, or -1 after timeoutMs
+_WAIT_FOR_JS = r"""
+(function (selectors, timeoutMs) {
+  return new Promise(function (resolve) {
+    var obs = null, timer = null;
+    function check() {
+      for (var i = 0; i < selectors.length; i++) {
+        try { if (document.querySelector(selectors[i])) return i; } catch (e) {}
+      }
+      return -1;
+    }
+    function finish(i) {
+      if (obs) obs.disconnect();
+      clearTimeout(timer);
+      resolve(i);
+    }
+    var first = check();
+    if (first >= 0 || timeoutMs <= 0) { resolve(first); return; }
+    obs = new MutationObserver(function () { var i = check(); if (i >= 0) finish(i); });
+    obs.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+    timer = setTimeout(function () { finish(check()); }, timeoutMs);
+  });
+})
+"""
+_QUERY_ALL_FN = "function (s) { return Array.from(this.querySelectorAll(s)); }"
+_ATTRIBUTE_FN = """function (n) {
+  var v = n in this && typeof this[n] !== 'object' && typeof this[n] !== 'function' ? this[n] : this.getAttribute(n);
+  return v == null ? null : String(v);
+}"""
+_TEXT_FN = "function () { return this.textContent.replace(/\\s+/g, ' ').trim(); }"
+_CLICK_FN = "function () { this.scrollIntoView({block: 'center'}); this.click(); }"
+_TYPE_FN = """function (text, submit) {
+  this.focus();
+  this.value = text;
+  this.dispatchEvent(new Event('input', {bubbles: true}));
+  this.dispatchEvent(new Event('change', {bubbles: true}));
+  if (submit && this.form) { if (this.form.requestSubmit) this.form.requestSubmit(); else this.form.submit(); }
+}"""
+
+
+class CdpError(Exception):
+    """A DevTools command answered with an error."""
+
+    def __init__(self, method, error):
+        super().__init__(f"{method}: {error.get('message')} ({error.get('code')})")
+        self.method = method
+        self.error = error
+
+
+def find_chrome():
+    """Path of the Chrome binary to launch (``CHROME_BINARY`` first), or None."""
+    binary = os.getenv("CHROME_BINARY")
+    if binary:
+        return binary
+    return next((shutil.which(name) for name in _CHROME_NAMES if shutil.which(name)), None)
+
+
+class CdpBackend(Backend):
+    """Backend over a page target's DevTools websocket (``ws_url``).
+
+    Use :meth:`launch` to start a private Chrome; ``process`` and
+    ``profile_dir`` are then cleaned up by :meth:`close`.
+    """
+
+    name = "cdp"
+
+    def __init__(self, ws_url, process=None, profile_dir=None, timeout=20, eager=False):
+        import websocket
+
+        self.timeout = timeout
+        self.process = process
+        self.profile_dir = profile_dir
+        # eager: documents count as loaded at DOMContentLoaded, like pageLoadStrategy=eager
+        self._ready_event = "Page.domContentEventFired" if eager else "Page.loadEventFired"
+        self._ws = websocket.create_connection(ws_url, suppress_origin=True, enable_multithread=True)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._loaded.set()
+        self._navigating = False
+        self._main_frame = None
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        self.pipeline([("Page.enable", None), ("Runtime.enable", None)])
+        self._main_frame = self.execute("Page.getFrameTree")["frameTree"]["frame"]["id"]
+
+    @classmethod
+    def launch(cls, binary=None, headless=True, block_urls=None, eager=False, timeout=20, args=()):
+        """Start Chrome with a throwaway profile and connect to its first tab.
+
+        ``block_urls`` (see ``lean``) turns images off and refuses requests
+        matching those patterns, as in the lean Selenium profile.
+        """
+        binary = binary or find_chrome()
+        if not binary:
+            raise RuntimeError("No Chrome binary found; set CHROME_BINARY")
+        profile_dir = tempfile.mkdtemp(prefix="agent-cdp-")
+        cmd = [binary, "--remote-debugging-port=0", f"--user-data-dir={profile_dir}",
+               "--no-first-run", "--no-default-browser-check", "--window-size=1366,900", *args]
+        if headless:
+            cmd.append("--headless=new")
+        if block_urls:
+            cmd.append("--blink-settings=imagesEnabled=false")
+        cmd.append("about:blank")
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            port = _wait_devtools_port(profile_dir, process, timeout)
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/list", timeout=timeout) as resp:
+                targets = json.load(resp)
+            ws_url = next(t["webSocketDebuggerUrl"] for t in targets if t.get("type") == "page")
+            backend = cls(ws_url, process=process, profile_dir=profile_dir, timeout=timeout, eager=eager)
+        except BaseException:
+            process.kill()
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        if block_urls:
+            backend.pipeline([("Network.enable", None), ("Network.setBlockedURLs", {"urls": list(block_urls)})])
+        return backend
+
+    # --- transport ---
+    def _read_loop(self):
+        while True:
+            try:
+                msg = json.loads(self._ws.recv())
+            except Exception as e:
+                # socket closed: fail whatever is still waiting
+                with self._lock:
+                    pending, self._pending = self._pending, {}
+                for method, fut in pending.values():
+                    fut.set_exception(ConnectionError(f"DevTools connection closed: {e}"))
+                return
+            if "id" in msg:
+                with self._lock:
+                    method, fut = self._pending.pop(msg["id"], (None, None))
+                if fut is None:
+                    continue
+                if "error" in msg:
+                    fut.set_exception(CdpError(method, msg["error"]))
+                else:
+                    fut.set_result(msg.get("result", {}))
+            else:
+                self._on_event(msg.get("method"), msg.get("params", {}))
+
+    def _on_event(self, method, params):
+        if method == "Page.frameStartedLoading" and params.get("frameId") == self._main_frame:
+            self._navigating = True
+            self._loaded.clear()
+        elif method == self._ready_event:
+            self._loaded.set()
+
+    def send(self, method, params=None):
+        """Send a command without waiting; returns a Future for its result."""
+        msg_id = next(self._ids)
+        fut = Future()
+        with self._lock:
+            self._pending[msg_id] = (method, fut)
+        self._ws.send(json.dumps({"id": msg_id, "method": method, "params": params or {}}))
+        return fut
+
+    def execute(self, method, params=None):
+        """Send a command and wait for its result."""
+        return self.send(method, params).result(self.timeout + 5)
+
+    def pipeline(self, calls):
+        """Send every ``(method, params)`` before waiting for any; returns their results in order."""
+        futures = [self.send(method, params) for method, params in calls]
+        return [f.result(self.timeout + 5) for f in futures]
+
+    # --- helpers ---
+    def _call_on(self, handle, fn, *args, by_value=True):
+        res = self.execute("Runtime.callFunctionOn", {
+            "objectId": handle, "functionDeclaration": fn, "arguments": [{"value": a} for a in args],
+            "returnByValue": by_value, "awaitPromise": False,
+        })
+        if "exceptionDetails" in res:
+            raise RuntimeError(res["exceptionDetails"].get("text", "script error"))
+        return res["result"].get("value") if by_value else res["result"].get("objectId")
+
+    def _evaluate(self, expression, await_promise=False):
+        res = self.execute("Runtime.evaluate", {"expression": expression, "returnByValue": True,
+                                                "awaitPromise": await_promise})
+        if "exceptionDetails" in res:
+            raise RuntimeError(res["exceptionDetails"].get("text", "script error"))
+        return res["result"].get("value")
+
+    def _settle(self):
+        """Wait for a navigation started by the last action, if any."""
+        if self._navigating and not self._loaded.wait(self.timeout):
+            raise TimeoutError("Page did not finish loading")
+        self._navigating = False
+
+    # --- documents ---
+    def navigate(self, url):
+        self._navigating = True
+        self._loaded.clear()
+        res = self.execute("Page.navigate", {"url": url, "frameId": self._main_frame})
+        if res.get("errorText"):
+            self._navigating = False
+            self._loaded.set()
+            raise RuntimeError(f"Navigation to {url} failed: {res['errorText']}")
+        if not res.get("loaderId"):
+            # same-document navigation (fragment change): no load event follows
+            self._navigating = False
+            self._loaded.set()
+        self._settle()
+
+    @property
+    def url(self):
+        return self._evaluate("location.href")
+
+    def html(self):
+        return self._evaluate("document.documentElement.outerHTML")
+
+    # --- elements ---
+    def query_all(self, selector, root=None):
+        if root is None:
+            array = self.execute("Runtime.evaluate", {
+                "expression": f"Array.from(document.querySelectorAll({json.dumps(selector)}))"})["result"]["objectId"]
+        else:
+            array = self._call_on(root, _QUERY_ALL_FN, selector, by_value=False)
+        props = self.execute("Runtime.getProperties", {"objectId": array, "ownProperties": True})["result"]
+        # the elements stay referenced by their own ids; the array is not needed past this point.
+        # Not awaited: it rides along with the next command instead of costing a round-trip
+        self.send("Runtime.releaseObject", {"objectId": array})
+        items = sorted((int(p["name"]), p["value"]["objectId"]) for p in props if p["name"].isdigit())
+        return [object_id for _, object_id in items]
+
+    def attribute(self, handle, name):
+        return self._call_on(handle, _ATTRIBUTE_FN, name)
+
+    def attributes(self, handles, name):
+        """``attribute(h, name)`` for many handles in one pipelined batch."""
+        calls = [("Runtime.callFunctionOn", {"objectId": h, "functionDeclaration": _ATTRIBUTE_FN,
+                                             "arguments": [{"value": name}], "returnByValue": True})
+                 for h in handles]
+        return [res["result"].get("value") for res in self.pipeline(calls)]
+
+    def text(self, handle):
+        return self._call_on(handle, _TEXT_FN)
+
+    def find_text(self, selector, phrases, root=None):
+        if root is not None:
+            return self._call_on(root, _FIND_TEXT_FN, selector, list(phrases), by_value=False)
+        res = self.execute("Runtime.evaluate", {
+            "expression": f"({_FIND_TEXT_FN}).call(document, {json.dumps(selector)}, {json.dumps(list(phrases))})"})
+        return res["result"].get("objectId")
+
+    def click(self, handle):
+        self._navigating = False
+        self._call_on(handle, _CLICK_FN)
+        self._settle()
+
+    def type(self, handle, text, submit=False):
+        self._navigating = False
+        self._call_on(handle, _TYPE_FN, text, bool(submit))
+        self._settle()
+
+    def wait_for(self, selectors, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                index = self._evaluate(f"({_WAIT_FOR_JS})({json.dumps(list(selectors))}, {int(remaining * 1000)})",
+                                       await_promise=True)
+            except CdpError:
+                # the document was replaced while waiting: wait for the new one and look again
+                if remaining <= 0:
+                    return -1, None
+                self._loaded.wait(remaining)
+                time.sleep(0.05)
+                continue
+            if index is None or index < 0:
+                return -1, None
+            handle = self.query(selectors[index])
+            if handle is not None:
+                return index, handle
+
+    def screenshot(self):
+        return base64.b64decode(self.execute("Page.captureScreenshot")["data"])
+
+    # --- session ---
+    def cookies(self):
+        return self.execute("Network.getCookies")["cookies"]
+
+    def set_cookies(self, cookies):
+        keep = ("name", "value", "domain", "path", "secure", "httpOnly", "expires", "sameSite")
+        self.execute("Network.setCookies", {"cookies": [{k: v for k, v in c.items() if k in keep} for c in cookies]})
+
+    def close(self):
+        try:
+            self.send("Browser.close")
+        except Exception:
+            pass
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        if self.process is not None:
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+def _wait_devtools_port(profile_dir, process, timeout):
+    """Port Chrome wrote to DevToolsActivePort once its DevTools server is up."""
+    path = os.path.join(profile_dir, "DevToolsActivePort")
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Chrome exited during startup (code {process.returncode})")
+        try:
+            with open(path, encoding="utf-8") as f:
+                port = f.readline().strip()
+            if port:
+                return int(port)
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError("Chrome did not open its DevTools port")
@@ -0,0 +1,453 @@
+"""Offline extraction of search results from a single page_source snapshot.
+
+Instead of asking chromedriver for every title/price/rating of every result
+container (several HTTP round-trips per product), grab ``driver.page_source``
+once and parse all ``s-result-item[data-asin]`` containers in-process.
+Only the standard library is used so this module imports in milliseconds and
+can be exercised against saved pages such as ``sample_product.html``.
+"""
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Elements that never get an end tag; they must not be pushed on the tag stack.
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+}
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _clean(text):
+    return _WS_RE.sub(" ", text).strip()
+
+
+def parse_price(price_text):
+    """Turn a price string like '₹1,299' or '1,299.' into an int/float (or None)."""
+    if not price_text or price_text == "N/A":
+        return None
+    # remove non digits, keep decimals if any
+    cleaned = re.sub(r"[^\d.]", "", price_text).rstrip(".")
+    if not cleaned:
+        return None
+    try:
+        # often price is integer rupees; cast to int if no dot, else float
+        return int(cleaned) if "." not in cleaned else float(cleaned)
+    except Exception:
+        return None
+
+
+def parse_rating(rating_text):
+    """Turn '4.3 out of 5 stars' into 4.3 (or None)."""
+    if not rating_text or rating_text == "N/A":
+        return None
+    m = re.search(r"(\d+(\.\d+)?)", rating_text)
+    if not m:
+        return None
+    try:
+        return float(m.group(1))
+    except Exception:
+        return None
+
+
+def parse_count(count_text):
+    """Turn '1,434 ratings' or '(1.4K)' into 1434 / 1400 (or None)."""
+    if not count_text:
+        return None
+    m = re.search(r"(\d[\d,]*(?:\.\d+)?)\s*([KkMm]?)", count_text)
+    if not m:
+        return None
+    value = float(m.group(1).replace(",", ""))
+    value *= {"k": 1e3, "m": 1e6}.get(m.group(2).lower(), 1)
+    return int(value)
+
+
+def matches_filters(record, price_min=None, price_max=None, min_rating=None):
+    """Apply the PRICE_MIN / PRICE_MAX / MIN_RATING filters to one parsed record."""
+    price_num = record.get("price_num")
+    rating_num = record.get("rating_num")
+    if price_min is not None:
+        if price_num is None or price_num < price_min:
+            return False
+    if price_max is not None:
+        if price_num is None or price_num > price_max:
+            return False
+    if min_rating is not None:
+        if rating_num is None or rating_num < min_rating:
+            return False
+    return True
+
+
+class _SearchResultParser(HTMLParser):
+    """Single pass over the document collecting one record per result container."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.records = []
+        self._stack = []          # open (non-void) tag names
+        self._current = None      # record being built
+        self._container_depth = None
+        self._anchors = []        # (stack depth, href) of open <a> elements
+        self._captures = []       # [field, stack depth, text parts]
+        self._h2_depth = None
+        self._h2_href = None
+        self._form = None         # add-to-cart form being read: {depth, action, fields, add}
+
+    # --- helpers ---
+    def _start_capture(self, field):
+        self._captures.append([field, len(self._stack), []])
+
+    def _finish_captures(self):
+        depth = len(self._stack)
+        while self._captures and self._captures[-1][1] > depth:
+            field, _, parts = self._captures.pop()
+            text = _clean("".join(parts))
+            if field == "title":
+                # headings without a product link (brand lines etc.) are skipped
+                if text and self._h2_href and not self._current.get("title"):
+                    self._current["title"] = text
+                    self._current["url"] = self._h2_href
+            elif text and not self._current.get(field):
+                self._current[field] = text
+
+    def _close_record(self):
+        rec = self._current
+        rec.setdefault("add_form", None)
+        self._current = None
+        self._container_depth = None
+        self._anchors = []
+        self._captures = []
+        self._h2_depth = None
+        self._h2_href = None
+        self._form = None
+        if not rec.get("title") or not rec.get("url"):
+            # Skip obviously empty or sponsored-like entries
+            return
+        price_text = rec.pop("price_whole", None) or rec.pop("price_offscreen", None) or "N/A"
+        rec.pop("price_offscreen", None)
+        rating_text = rec.get("rating") or "N/A"
+        rec["price"] = price_text
+        rec["rating"] = rating_text
+        rec["price_num"] = parse_price(price_text)
+        rec["rating_num"] = parse_rating(rating_text)
+        rec["reviews_num"] = parse_count(rec.pop("reviews", None))
+        self.records.append(rec)
+
+    # --- HTMLParser hooks ---
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if self._current is None:
+            if tag == "div":
+                asin = (a.get("data-asin") or "").strip()
+                if asin and "s-result-item" in (a.get("class") or "").split():
+                    self._current = {"asin": asin, "title": None, "url": None, "rating": None}
+                    self._container_depth = len(self._stack) + 1
+            if tag not in _VOID_TAGS:
+                self._stack.append(tag)
+            return
+
+        if tag in ("input", "button") and self._form is not None:
+            name = a.get("name")
+            if name in ("submit.addToCart", "submit.add-to-cart"):
+                self._form["add"] = True
+            elif name and tag == "input" and a.get("type", "text") != "submit":
+                self._form["fields"][name] = a.get("value") or ""
+        if tag in _VOID_TAGS:
+            return
+        self._stack.append(tag)
+        depth = len(self._stack)
+        classes = (a.get("class") or "").split()
+
+        if tag == "form" and self._form is None and (a.get("method") or "get").lower() == "post":
+            self._form = {"depth": depth, "action": a.get("action") or "", "fields": {}, "add": False}
+
+        if tag == "a":
+            href = a.get("href")
+            self._anchors.append((depth, href))
+            # <a aria-label="1,434 ratings" href="...#customerReviews">
+            label = a.get("aria-label") or ""
+            if "reviews" not in self._current and re.fullmatch(r"[\d,.]+ ratings?", label.strip()):
+                self._current["reviews"] = label.strip()
+            # <h2><a href=...>title</a></h2>
+            if self._h2_depth is not None and href and not self._h2_href:
+                self._h2_href = href
+        elif tag == "h2" and self._h2_depth is None and not self._current.get("title"):
+            self._h2_depth = depth
+            # <a href=...><h2>title</h2></a>
+            self._h2_href = next((h for _, h in reversed(self._anchors) if h), None)
+            self._start_capture("title")
+        elif tag == "span":
+            if "a-price-whole" in classes and "price_whole" not in self._current:
+                self._start_capture("price_whole")
+            elif "a-offscreen" in classes and "price_offscreen" not in self._current:
+                self._start_capture("price_offscreen")
+            elif "a-icon-alt" in classes and not self._current.get("rating"):
+                self._start_capture("rating")
+
+    def handle_startendtag(self, tag, attrs):
+        # <tag/> never opens a scope
+        if tag not in _VOID_TAGS:
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+        else:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS or tag not in self._stack:
+            return
+        # pop up to and including the matching tag (tolerates unclosed children)
+        while self._stack:
+            top = self._stack.pop()
+            if self._current is not None:
+                depth = len(self._stack)
+                self._finish_captures()
+                while self._anchors and self._anchors[-1][0] > depth:
+                    self._anchors.pop()
+                if self._h2_depth is not None and self._h2_depth > depth:
+                    self._h2_depth = None
+                    self._h2_href = None
+                if self._form is not None and self._form["depth"] > depth:
+                    form, self._form = self._form, None
+                    # the form that carries the inline "Add to cart" button of this result
+                    if (form["add"] or "add-to-cart" in form["action"]) and not self._current.get("add_form"):
+                        self._current["add_form"] = {"action": form["action"], "fields": form["fields"]}
+                if self._container_depth is not None and self._container_depth > depth:
+                    self._close_record()
+            if top == tag:
+                break
+
+    def handle_data(self, data):
+        for cap in self._captures:
+            cap[2].append(data)
+
+    def close(self):
+        super().close()
+        if self._current is not None:
+            # truncated snapshot: flush whatever the last container had
+            self._stack = []
+            self._finish_captures()
+            self._close_record()
+
+
+def parse_search_results(html, base_url=""):
+    """Parse every ``s-result-item[data-asin]`` container in ``html``.
+
+    Returns a list of dicts with asin, title, url, price, rating (raw text as
+    shown on the page) plus price_num / rating_num / reviews_num and add_form
+    (action and hidden fields of the inline add-to-cart form, or None).
+    Relative links are resolved against ``base_url`` (pass
+    ``driver.current_url``).
+    """
+    return list(iter_search_results(html, base_url))
+
+
+def iter_search_results(html, base_url="", chunk_size=32 * 1024):
+    """Like :func:`parse_search_results`, but yield each record as soon as its container closes.
+
+    The snapshot is fed to the parser ``chunk_size`` characters at a time, so
+    a consumer that stops early never parses the rest of the page.
+    """
+    parser = _SearchResultParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        yield from _drain(parser, base_url)
+    parser.close()
+    yield from _drain(parser, base_url)
+
+
+def _drain(parser, base_url):
+    records, parser.records = parser.records, []
+    for rec in records:
+        if base_url:
+            rec["url"] = urljoin(base_url, rec["url"])
+            if rec["add_form"]:
+                rec["add_form"]["action"] = urljoin(base_url, rec["add_form"]["action"])
+        yield rec
+
+
+class _CartParser(HTMLParser):
+    """Collects ``.sc-list-item[data-asin]`` line items, noting which are in the active cart."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items = []
+        self.has_active = False
+        self._stack = []
+        self._active_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag not in _VOID_TAGS:
+            self._stack.append(tag)
+        if a.get("id") == "sc-active-cart" and self._active_depth is None:
+            self._active_depth = len(self._stack)
+            self.has_active = True
+        asin = (a.get("data-asin") or "").strip()
+        if asin and "sc-list-item" in (a.get("class") or "").split():
+            self.items.append({
+                "asin": asin,
+                "quantity": parse_count(a.get("data-quantity")) or 1,
+                "price_num": parse_price(a.get("data-price")),
+                "active": self._active_depth is not None,
+            })
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS or tag not in self._stack:
+            return
+        while self._stack and self._stack.pop() != tag:
+            pass
+        if self._active_depth is not None and len(self._stack) < self._active_depth:
+            self._active_depth = None
+
+
+def parse_cart(html):
+    """Line items of a cart page: ``[{asin, quantity, price_num}]`` in page order.
+
+    Only items in the active cart (``#sc-active-cart``) count when the page
+    has one, so "saved for later" lines are left out.
+    """
+    parser = _CartParser()
+    parser.feed(html)
+    parser.close()
+    return [{k: v for k, v in item.items() if k != "active"}
+            for item in parser.items if item["active"] or not parser.has_active]
+
+
+# Amazon's robot check ("Type the characters you see in this image") posts to this form / field
+_CAPTCHA_MARKERS = ("/errors/validateCaptcha", 'id="captchacharacters"')
+
+
+def is_captcha_page(html, url=""):
+    """True if ``html`` (loaded from ``url``) is the robot-check page instead of the one asked for."""
+    return "validatecaptcha" in url.lower() or any(marker in html for marker in _CAPTCHA_MARKERS)
+
+
+# One round-trip: walk every result container in the browser and return a
+# compact array. textContent (not innerText) avoids forcing a layout per node.
+BULK_EXTRACT_JS = r"""
+var out = [];
+var nodes = document.querySelectorAll('div.s-result-item[data-asin]');
+function txt(root, sel) {
+  var el = root.querySelector(sel);
+  return el ? el.textContent.replace(/\s+/g, ' ').trim() : '';
+}
+for (var i = 0; i < nodes.length; i++) {
+  var n = nodes[i];
+  var asin = (n.getAttribute('data-asin') || '').trim();
+  if (!asin) continue;
+  var title = '', href = '';
+  var heads = n.querySelectorAll('h2');
+  for (var j = 0; j < heads.length; j++) {
+    var a = heads[j].closest('a[href]') || heads[j].querySelector('a[href]');
+    if (!a) continue;
+    title = heads[j].textContent.replace(/\s+/g, ' ').trim();
+    href = a.href;
+    if (title) break;
+  }
+  var rev = n.querySelector('a[aria-label$=" ratings"], a[aria-label$=" rating"]');
+  var r = n.getBoundingClientRect();
+  var form = null, btn = n.querySelector("form button[name='submit.addToCart'], form input[name='submit.add-to-cart']");
+  if (btn && btn.form && (btn.form.method || '').toLowerCase() === 'post') {
+    var fields = {}, els = btn.form.querySelectorAll('input[name]');
+    for (var k = 0; k < els.length; k++) {
+      if (els[k].type !== 'submit' && els[k] !== btn) fields[els[k].name] = els[k].value;
+    }
+    form = {action: btn.form.action, fields: fields};
+  }
+  out.push([
+    asin, title, href,
+    txt(n, 'span.a-price-whole') || txt(n, 'span.a-offscreen'),
+    txt(n, 'span.a-icon-alt'),
+    !!n.querySelector("button[name='submit.addToCart'], input[name='submit.add-to-cart']"),
+    [r.left, r.top, r.width, r.height],
+    form,
+    rev ? rev.getAttribute('aria-label') : ''
+  ]);
+}
+return out;
+"""
+
+
+def extract_products_js(driver):
+    """Extract every result container with a single ``execute_script`` call.
+
+    Returns records shaped like :func:`parse_search_results` (including
+    ``add_form``) plus ``has_add_button`` and ``rect`` (left, top, width,
+    height in viewport px).
+    """
+    records = []
+    rows = driver.execute_script(BULK_EXTRACT_JS) or []
+    for asin, title, href, price_text, rating_text, has_add, rect, form, reviews_text in rows:
+        if not title or not href:
+            continue
+        price_text = price_text or "N/A"
+        rating_text = rating_text or "N/A"
+        records.append({
+            "asin": asin,
+            "title": title,
+            "url": href,
+            "price": price_text,
+            "rating": rating_text,
+            "price_num": parse_price(price_text),
+            "rating_num": parse_rating(rating_text),
+            "reviews_num": parse_count(reviews_text),
+            "has_add_button": has_add,
+            "rect": {"left": rect[0], "top": rect[1], "width": rect[2], "height": rect[3]},
+            "add_form": form,
+        })
+    return records
+
+
+def filter_products(records, price_min=None, price_max=None, min_rating=None):
+    """Bulk version of :func:`matches_filters`; keeps page order."""
+    if price_min is None and price_max is None and min_rating is None:
+        return list(records)
+    return [r for r in records if matches_filters(r, price_min, price_max, min_rating)]
+
+
+def iter_filtered(records, price_min=None, price_max=None, min_rating=None):
+    """Lazy version of :func:`filter_products`: yields matching records as they arrive."""
+    for r in records:
+        if matches_filters(r, price_min, price_max, min_rating):
+            yield r
+
+
+def extract_products_webdriver(driver, products):
+    """Legacy per-element extraction (several WebDriver calls per container).
+
+    Kept for benchmarking against :func:`parse_search_results`.
+    """
+    from selenium.webdriver.common.by import By
+
+    records = []
+    for product in products:
+        try:
+            link_el = product.find_element(By.CSS_SELECTOR, "h2 a")
+            title = link_el.text.strip()
+            link = link_el.get_attribute("href")
+            if not title or not link:
+                continue
+            try:
+                price_text = product.find_element(By.CSS_SELECTOR, "span.a-price-whole").text.strip()
+            except Exception:
+                try:
+                    price_text = product.find_element(By.CSS_SELECTOR, "span.a-offscreen").text.strip()
+                except Exception:
+                    price_text = "N/A"
+            try:
+                rating_text = product.find_element(By.CSS_SELECTOR, "span.a-icon-alt").get_attribute("innerHTML").strip()
+            except Exception:
+                rating_text = "N/A"
+            records.append({
+                "asin": product.get_attribute("data-asin"),
+                "title": title,
+                "url": link,
+                "price": price_text,
+                "rating": rating_text,
+                "price_num": parse_price(price_text),
+                "rating_num": parse_rating(rating_text),
+            })
+        except Exception:
+            continue
+    return records
@@ -0,0 +1,357 @@
+"""In-memory fake browser: HTML fixtures parsed into a small DOM, no Chrome.
+
+:class:`FakeBackend` implements the ``backend.Backend`` interface the way a
+browser with JavaScript switched off would: pages come from a dict of HTML
+fixtures (by URL or path) or, for anything not in it, over plain HTTP with a
+cookie-keeping session (e.g. from ``fixture_server``); links navigate, submit
+buttons and Enter in a field submit their form (GET or POST, following
+redirects); scripts never run. Selectors support type, ``#id``, ``.class``,
+``[attr]`` / ``[attr=v]`` (also ``~= ^= $= *=``), descendant and ``>``
+combinators and comma-separated groups, which covers what the flow uses.
+
+Commands cost microseconds instead of a chromedriver round-trip, so the
+portable flow can be unit-tested and its own overhead benchmarked.
+"""
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from backend import Backend
+from extraction import _VOID_TAGS
+
+_SUBMIT_TYPES = ("submit", "image")
+
+
+class Node:
+    """Element (``tag`` set) or text node (``tag`` None, ``data`` set)."""
+
+    __slots__ = ("tag", "attrs", "children", "parent", "data")
+
+    def __init__(self, tag, attrs=None, parent=None, data=None):
+        self.tag = tag
+        self.attrs = attrs if attrs is not None else {}
+        self.children = []
+        self.parent = parent
+        self.data = data
+
+    def iter(self):
+        """Descendant elements in document order."""
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if node.tag is not None:
+                yield node
+                stack.extend(reversed(node.children))
+
+    def text(self):
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.tag is None:
+                parts.append(node.data)
+            else:
+                stack.extend(reversed(node.children))
+        return "".join(parts)
+
+    def closest(self, tags):
+        node = self
+        while node is not None and node.tag not in tags:
+            node = node.parent
+        return node
+
+    def __repr__(self):
+        return f"<{self.tag} {self.attrs}>" if self.tag else f"<text {self.data[:20]!r}>"
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.document = Node("#document")
+        self._open = [self.document]
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {k: v if v is not None else "" for k, v in attrs}, parent=self._open[-1])
+        self._open[-1].children.append(node)
+        if tag not in _VOID_TAGS:
+            self._open.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self._open.pop()
+
+    def handle_endtag(self, tag):
+        # close up to the matching element (tolerates unclosed children)
+        for i in range(len(self._open) - 1, 0, -1):
+            if self._open[i].tag == tag:
+                del self._open[i:]
+                return
+
+    def handle_data(self, data):
+        self._open[-1].children.append(Node(None, parent=self._open[-1], data=data))
+
+
+def parse_document(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.document
+
+
+# --- selectors ---
+_COMPOUND_RE = re.compile(r"([a-zA-Z][\w-]*|\*)?((?:#[\w-]+|\.[\w-]+|\[[^\]]*\])*)")
+_PART_RE = re.compile(r"#([\w-]+)|\.([\w-]+)|\[\s*([\w:.-]+)\s*(?:([~^$*]?=)\s*(?:\"([^\"]*)\"|'([^']*)'|([^\]\s]*)))?\s*\]")
+_COMBINATOR_RE = re.compile(r"\s*(>)\s*|\s+")
+_ID_RE = re.compile(r"#[\w-]+")
+_selector_cache = {}
+
+
+def _parse_compound(text):
+    m = _COMPOUND_RE.fullmatch(text)
+    tag, parts = m.group(1), m.group(2)
+    tests = []
+    for p in _PART_RE.finditer(parts):
+        if p.group(1):
+            tests.append(("id", p.group(1)))
+        elif p.group(2):
+            tests.append(("class", p.group(2)))
+        else:
+            value = next((v for v in p.group(5, 6, 7) if v is not None), None)
+            tests.append(("attr", (p.group(3).lower(), p.group(4), value)))
+    return (None if tag in (None, "*") else tag.lower()), tests
+
+
+def compile_selector(selector):
+    """``[[(combinator, tag, tests), ...], ...]``: one step list per comma group (cached)."""
+    if selector in _selector_cache:
+        return _selector_cache[selector]
+    groups = []
+    for group in selector.split(","):
+        group = group.strip()
+        steps, pos, comb = [], 0, None
+        while pos < len(group):
+            m = _COMPOUND_RE.match(group, pos)
+            if not m or m.end() == pos:
+                raise ValueError(f"Unsupported selector: {selector!r}")
+            steps.append((comb,) + _parse_compound(m.group(0)))
+            pos = m.end()
+            c = _COMBINATOR_RE.match(group, pos)
+            if c:
+                comb = c.group(1) or " "
+                pos = c.end()
+        groups.append(steps)
+    _selector_cache[selector] = groups
+    return groups
+
+
+def _compound_matches(node, tag, tests):
+    if tag is not None and node.tag != tag:
+        return False
+    attrs = node.attrs
+    for kind, arg in tests:
+        if kind == "id":
+            if attrs.get("id") != arg:
+                return False
+        elif kind == "class":
+            if arg not in attrs.get("class", "").split():
+                return False
+        else:
+            name, op, value = arg
+            have = attrs.get(name)
+            if have is None:
+                return False
+            if op is None:
+                continue
+            if op == "=" and have != value:
+                return False
+            if op == "~=" and value not in have.split():
+                return False
+            if op == "^=" and not (value and have.startswith(value)):
+                return False
+            if op == "$=" and not (value and have.endswith(value)):
+                return False
+            if op == "*=" and not (value and value in have):
+                return False
+    return True
+
+
+def _steps_match(node, steps, i):
+    comb, tag, tests = steps[i]
+    if not _compound_matches(node, tag, tests):
+        return False
+    if i == 0:
+        return True
+    parent = node.parent
+    if comb == ">":
+        return parent is not None and parent.tag != "#document" and _steps_match(parent, steps, i - 1)
+    while parent is not None and parent.tag != "#document":
+        if _steps_match(parent, steps, i - 1):
+            return True
+        parent = parent.parent
+    return False
+
+
+def _is_submit(node):
+    default = "submit" if node.tag == "button" else "text"
+    return node.tag in ("button", "input") and node.attrs.get("type", default).lower() in _SUBMIT_TYPES
+
+
+def select(root, selector):
+    """Elements under ``root`` matching ``selector``, in document order."""
+    groups = compile_selector(selector)
+    return [n for n in root.iter() if any(_steps_match(n, steps, len(steps) - 1) for steps in groups)]
+
+
+class FakeBackend(Backend):
+    """Backend over parsed HTML. ``pages`` maps URLs (or paths) to HTML; other URLs are fetched over HTTP
+    unless ``fetch`` is False, in which case they load a 404 page."""
+
+    name = "fake"
+
+    def __init__(self, pages=None, fetch=True, timeout=20):
+        self.pages = dict(pages or {})
+        self.fetch = fetch
+        self.timeout = timeout
+        self.session = None
+        self.status = None
+        self._url = "about:blank"
+        self._html = "<html><head></head><body></body></html>"
+        self.document = parse_document(self._html)
+        self._ids = None
+
+    # --- loading ---
+    def _lookup(self, url):
+        parts = urlsplit(url)
+        path_query = parts.path + (f"?{parts.query}" if parts.query else "")
+        for key in (url, path_query, parts.path):
+            if key in self.pages:
+                return self.pages[key]
+        return None
+
+    def _load(self, url, method="GET", data=None):
+        if method == "GET" and data:
+            url = f"{url.split('?', 1)[0]}?{urlencode(data)}"
+            data = None
+        html = self._lookup(url)
+        if html is not None:
+            self.status = 200
+        elif self.fetch and urlsplit(url).scheme in ("http", "https"):
+            if self.session is None:
+                import requests
+
+                self.session = requests.Session()
+            resp = self.session.request(method, url, data=data, timeout=self.timeout)
+            url, html, self.status = resp.url, resp.text, resp.status_code
+        else:
+            html, self.status = "<html><body><h1>Not found</h1></body></html>", 404
+        self._url, self._html = url, html
+        self.document = parse_document(html)
+        self._ids = None
+
+    def navigate(self, url):
+        self._load(urljoin(self._url, url))
+
+    @property
+    def url(self):
+        return self._url
+
+    def html(self):
+        """Source of the current page as loaded (field values typed since are not reflected)."""
+        return self._html
+
+    # --- elements ---
+    def query_all(self, selector, root=None):
+        if root is None and _ID_RE.fullmatch(selector):
+            if self._ids is None:
+                self._ids = {}
+                for node in self.document.iter():
+                    self._ids.setdefault(node.attrs.get("id"), node)
+            node = self._ids.get(selector[1:])
+            return [node] if node is not None else []
+        return select(root or self.document, selector)
+
+    def attribute(self, handle, name):
+        if name == "textContent":
+            return handle.text()
+        value = handle.attrs.get(name)
+        if value is not None and name in ("href", "src", "action"):
+            return urljoin(self._url, value)
+        return value
+
+    def text(self, handle):
+        return " ".join(handle.text().split())
+
+    def click(self, handle):
+        target = handle.closest(("a", "button", "input"))
+        if target is None:
+            return
+        if target.tag == "a" and target.attrs.get("href"):
+            self.navigate(target.attrs["href"])
+        elif _is_submit(target) and "disabled" not in target.attrs:
+            self.submit(target.closest(("form",)), submitter=target)
+
+    def type(self, handle, text, submit=False):
+        handle.attrs["value"] = text
+        if submit:
+            form = handle.closest(("form",))
+            # implicit submission: the form's first submit button counts as pressed
+            buttons = select(form, "button, input") if form is not None else []
+            self.submit(form, submitter=next((b for b in buttons if _is_submit(b)), None))
+
+    def submit(self, form, submitter=None):
+        """Submit ``form`` the way a browser would (successful controls only)."""
+        if form is None:
+            return
+        data = []
+        for field in select(form, "input, select, textarea"):
+            name = field.attrs.get("name")
+            if not name or "disabled" in field.attrs:
+                continue
+            kind = field.attrs.get("type", "text").lower()
+            if field.tag == "input" and kind in _SUBMIT_TYPES + ("button", "reset"):
+                continue
+            if kind in ("checkbox", "radio") and "checked" not in field.attrs:
+                continue
+            if field.tag == "select":
+                options = select(field, "option")
+                chosen = next((o for o in options if "selected" in o.attrs), options[0] if options else None)
+                value = (chosen.attrs.get("value", chosen.text()) if chosen else "")
+            elif field.tag == "textarea":
+                value = field.attrs.get("value", field.text())
+            else:
+                value = field.attrs.get("value", "on" if kind in ("checkbox", "radio") else "")
+            data.append((name, value))
+        if submitter is not None and submitter.attrs.get("name"):
+            data.append((submitter.attrs["name"], submitter.attrs.get("value", "")))
+        method = (form.attrs.get("method") or "get").upper()
+        action = urljoin(self._url, form.attrs.get("action") or self._url)
+        self._load(action, "POST" if method == "POST" else "GET", data)
+
+    def wait_for(self, selectors, timeout=10):
+        """Checked once: nothing changes a fake document between commands."""
+        for i, selector in enumerate(selectors):
+            handle = self.query(selector)
+            if handle is not None:
+                return i, handle
+        return -1, None
+
+    # --- session ---
+    def cookies(self):
+        if self.session is None:
+            return []
+        return [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "secure": c.secure}
+                for c in self.session.cookies]
+
+    def set_cookies(self, cookies):
+        if self.session is None:
+            import requests
+
+            self.session = requests.Session()
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
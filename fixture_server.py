@@ -0,0 +1,494 @@
+"""Local stand-in for the Amazon pages and endpoints the agent talks to.
+
+Serves sign-in, home, search results (rendered from a saved result container
+such as ``sample_product.html``), product, cart and checkout pages using the
+same IDs and names the agent relies on (``ap_email``, ``ap_password``,
+``twotabsearchtextbox``, ``nav-cart-count``, ``add-to-cart-button``,
+``proceedToRetailCheckout``, ``placeYourOrder1``) plus the add-to-cart form
+endpoint. Latency and failures are configurable so stages can be benchmarked
+and regression-tested without touching amazon.in::
+
+    python fixture_server.py --port 8765 --latency 0.05 --fail-rate 0.02
+
+With ``throttle`` it also behaves like a rate-limiting site: past that many
+page requests per second it serves the robot-check page (or a 503) to
+everyone for a penalty period.
+
+or from Python::
+
+    with FixtureServer(latency=0.05) as site:
+        config = amazon_agent.configure(base_url=site.url, email=site.email, password=site.password)
+"""
+import argparse
+import collections
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+CSRF_TOKEN = "fixture-csrf-token"
+# Routes that are assets, not pages: they do not count towards the throttle
+_ASSET_ROUTES = ("image", "static", "media", "ads")
+_CAPTCHA_PAGE = (
+    "<!doctype html><html><head><title>Amazon.in</title></head><body>"
+    "<h4>Enter the characters you see below</h4>"
+    "<p>Sorry, we just need to make sure you're not a robot. For best results, please make sure your browser"
+    " is accepting cookies.</p>"
+    '<form method="get" action="/errors/validateCaptcha">'
+    '<input autocomplete="off" spellcheck="false" type="text" id="captchacharacters" name="field-keywords">'
+    '<button type="submit">Continue shopping</button></form></body></html>'
+)
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_product.html")
+
+# Search-page script: submit the inline add-to-cart forms with fetch, like the real page does
+_INLINE_ADD_SCRIPT = """
+<script>
+document.addEventListener('click', function (ev) {
+  var btn = ev.target.closest("button[name='submit.addToCart']");
+  if (!btn || !btn.form) return;
+  ev.preventDefault();
+  fetch(btn.form.action, {method: 'POST', body: new URLSearchParams(new FormData(btn.form)),
+                          headers: {'X-Requested-With': 'XMLHttpRequest'}, credentials: 'same-origin'})
+    .then(function (r) { return r.json(); })
+    .then(function (res) {
+      if (!res.ok) return;
+      document.getElementById('nav-cart-count').textContent = res.count;
+      var msg = document.createElement('div');
+      msg.className = 'a-alert-success';
+      msg.textContent = 'Added to cart';
+      btn.form.parentNode.appendChild(msg);
+    });
+});
+</script>
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+    site = None  # set per server
+
+    def log_message(self, fmt, *args):
+        if self.site.verbose:
+            super().log_message(fmt, *args)
+
+    # --- helpers ---
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get("session-id")
+        sid = morsel.value if morsel else None
+        return sid if sid in self.site.sessions else None
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+            self.site.count_bytes(len(data))
+
+    def _redirect(self, location, headers=None):
+        self._send(302, "", headers=dict(headers or {}, Location=location))
+
+    def _page(self, title, body, extra_head=""):
+        session = self._session()
+        count = self.site.cart_count(session)
+        greeting = "Hello, Fixture" if session else "Hello, sign in"
+        if self.site.assets:
+            # what a real page drags in besides the DOM: stylesheet + web font, a
+            # third-party ad script and an autoplaying promo video
+            cdn = self.site.cdn_url
+            extra_head += (f"<link rel='stylesheet' href='/static/site.css'>"
+                           f"<script async src='{cdn}/ads/beacon.js'></script>")
+            body += f"<video src='{cdn}/media/promo.mp4' preload='auto' autoplay muted></video>"
+        return (
+            f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>{extra_head}</head><body>"
+            "<header id='navbar'>"
+            "<form id='nav-search-bar-form' action='/s' method='get'>"
+            "<input type='text' id='twotabsearchtextbox' name='k' autocomplete='off'></form>"
+            f"<a id='nav-link-accountList' href='/ap/signin'><span id='nav-link-accountList-nav-line-1'>{greeting}</span></a>"
+            f"<a id='nav-cart' href='/gp/cart/view.html'><span id='nav-cart-count'>{count}</span></a>"
+            f"</header><main>{body}</main></body></html>"
+        )
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return {k: v[-1] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+
+    def _route(self, routes):
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        for pattern, name in routes:
+            m = re.fullmatch(pattern, parts.path)
+            if m:
+                blocked = self.site.throttled(name)
+                if blocked or self.site.should_fail(name):
+                    # a refused POST's body must not be read as the next request on this connection
+                    self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                    if blocked == "captcha":
+                        return self._send(200, _CAPTCHA_PAGE)
+                    return self._send(503, "<html><body><h1>Service Unavailable</h1></body></html>")
+                self.site.delay(name)
+                return getattr(self, "_" + name)(query, *m.groups())
+        self._send(404, self._page("Not found", "<h1>Not found</h1>"))
+
+    # --- routes ---
+    def do_GET(self):
+        self._route([
+            (r"/", "home"),
+            (r"/ap/signin", "signin"),
+            (r"/s", "search"),
+            (r"/dp/([A-Z0-9]+)", "product"),
+            (r"/gp/cart/view\.html", "cart"),
+            (r"/cart/smart-wagon", "added"),
+            (r"/gp/buy/spc/handlers/display\.html", "checkout"),
+            (r"/images/I/([^/]+)", "image"),
+            (r"/static/([^/]+)", "static"),
+            (r"/media/([^/]+)", "media"),
+            (r"/ads/([^/]+)", "ads"),
+        ])
+
+    def do_POST(self):
+        self._route([
+            (r"/ap/signin", "signin_post"),
+            (r"/cart/add-to-cart", "add_to_cart"),
+        ])
+
+    def _home(self, query):
+        self._send(200, self._page("Amazon Fixture", "<h1>Welcome</h1>"))
+
+    def _signin(self, query):
+        # step 1: email; step 2 (after POST): password
+        return_to = query.get("openid.return_to", "/")
+        body = ("<form name='signIn' method='post' action='/ap/signin'>"
+                f"<input type='hidden' name='return_to' value='{html.escape(return_to)}'>"
+                "<input type='email' id='ap_email' name='email'></form>")
+        self._send(200, self._page("Amazon Sign-In", body))
+
+    def _signin_post(self, query):
+        form = self._form()
+        return_to = form.get("return_to") or "/"
+        if "password" not in form:
+            body = ("<form name='signIn' method='post' action='/ap/signin'>"
+                    f"<input type='hidden' name='return_to' value='{html.escape(return_to)}'>"
+                    f"<input type='hidden' name='email' value='{html.escape(form.get('email', ''))}'>"
+                    "<input type='password' id='ap_password' name='password'></form>")
+            return self._send(200, self._page("Amazon Sign-In", body))
+        if form.get("email") != self.site.email or form["password"] != self.site.password:
+            return self._send(200, self._page("Amazon Sign-In", "<div id='auth-error-message-box'>Incorrect password</div>"))
+        sid = self.site.new_session()["value"]
+        path = urlsplit(return_to).path or "/"
+        self._redirect(path, headers={"Set-Cookie": f"session-id={sid}; Path=/; HttpOnly"})
+
+    def _search(self, query):
+        q = query.get("k", "")
+        page = int(query.get("page") or 1)
+        items = self.site.search(q, page)
+        cards = "".join(self.site.render_result(p) for p in items)
+        pagination = ""
+        if page < self.site.pages:
+            pagination = f"<a class='s-pagination-next' href='/s?k={quote(q)}&amp;page={page + 1}'>Next</a>"
+        body = f"<div class='s-main-slot s-result-list'>{cards}</div>{pagination}{_INLINE_ADD_SCRIPT}"
+        self._send(200, self._page(f"Amazon.in : {q}", body))
+
+    def _product(self, query, asin):
+        p = self.site.product(asin)
+        body = (f"<img id='landingImage' src='{self.site.cdn_url}/images/I/{asin}._SX679_.jpg'>"
+                f"<h1 id='title'><span id='productTitle'>{html.escape(p['title'])}</span></h1>"
+                f"<span class='a-price'><span class='a-offscreen'>₹{p['price']:,}</span></span>"
+                "<form id='addToCart' method='post' action='/cart/add-to-cart'>"
+                f"<input type='hidden' name='anti-csrftoken-a2z' value='{CSRF_TOKEN}'>"
+                f"<input type='hidden' name='items[0.base][asin]' value='{asin}'>"
+                "<input type='hidden' name='items[0.base][quantity]' value='1'>"
+                "<input type='submit' id='add-to-cart-button' name='submit.add-to-cart' value='Add to Cart'>"
+                "</form>")
+        self._send(200, self._page(p["title"], body))
+
+    def _add_to_cart(self, query):
+        form = self._form()
+        session = self._session()
+        via_fetch = self.headers.get("X-Requested-With") == "XMLHttpRequest"
+        if not session:
+            if via_fetch:
+                return self._send(401, json.dumps({"ok": False}), "application/json")
+            return self._redirect("/ap/signin")
+        if form.get("anti-csrftoken-a2z") != CSRF_TOKEN:
+            return self._send(403, self._page("Forbidden", "<h1>Invalid request</h1>"))
+        asin = form.get("items[0.base][asin]")
+        if not asin:
+            return self._send(400, self._page("Bad request", "<h1>Missing ASIN</h1>"))
+        count = self.site.add_to_cart(session, asin, int(form.get("items[0.base][quantity]") or 1))
+        if via_fetch:
+            return self._send(200, json.dumps({"ok": True, "count": count}), "application/json")
+        self._redirect(f"/cart/smart-wagon?newItems={quote(asin)}")
+
+    def _added(self, query):
+        body = "<div id='NATC_SMART_WAGON_CONF_MSG_SUCCESS'><h1>Added to cart</h1></div>"
+        self._send(200, self._page("Added to cart", body))
+
+    def _cart(self, query):
+        session = self._session()
+        rows = []
+        for asin, qty in self.site.carts.get(session, {}).items():
+            p = self.site.product(asin)
+            rows.append(
+                f"<div class='sc-list-item' data-asin='{html.escape(asin)}' data-quantity='{qty}' data-price='{p['price']}'>"
+                f"<span class='sc-product-title'>{html.escape(p['title'])}</span>"
+                f"<span class='sc-product-price'>₹{p['price']:,}</span></div>")
+        body = (f"<div id='sc-active-cart'>{''.join(rows)}</div>"
+                "<form id='sc-buy-box' method='get' action='/gp/buy/spc/handlers/display.html'>"
+                "<input type='submit' name='proceedToRetailCheckout' value='Proceed to Buy'></form>")
+        self._send(200, self._page("Shopping Cart", body))
+
+    def _image(self, query, name):
+        self._send(200, self.site.payload("image"), "image/jpeg")
+
+    def _static(self, query, name):
+        if name.endswith(".css"):
+            css = ("@font-face{font-family:Ember;src:url(/static/ember.woff2) format('woff2')}"
+                   "body{font-family:Ember,sans-serif}")
+            return self._send(200, css, "text/css")
+        self._send(200, self.site.payload("font"), "font/woff2")
+
+    def _media(self, query, name):
+        self._send(200, self.site.payload("media"), "video/mp4")
+
+    def _ads(self, query, name):
+        self._send(200, b"/*" + self.site.payload("script") + b"*/", "application/javascript")
+
+    def _checkout(self, query):
+        if not self._session():
+            return self._redirect("/ap/signin")
+        body = ("<form id='shippingOptionFormId'><h1>Checkout</h1>"
+                "<input type='submit' name='placeYourOrder1' value='Place your order' disabled></form>")
+        self._send(200, self._page("Checkout", body))
+
+
+class FixtureServer:
+    """Threaded local stand-in site; use as a context manager or call start()/stop().
+
+    ``latency`` (seconds) is added to every response; ``route_latency`` maps a
+    route name (home, signin, search, product, cart, add_to_cart, checkout, ...)
+    to its own delay. ``fail_rate`` / ``route_fail_rate`` answer that share of
+    requests with a 503. ``seed`` makes the failures reproducible.
+
+    With ``assets`` every page also references a stylesheet, web font, promo
+    video and third-party ad script, and results/product pages reference
+    images; ``asset_kb`` sets their sizes. Images, video and the ad script come
+    from ``cdn_url`` (same server, "localhost" instead of the IP) so they
+    are cross-origin, like Amazon's CDN. ``bytes_sent`` counts response bodies.
+
+    ``throttle`` (page requests per second, over a sliding one-second window
+    shared by all clients) trips a block for ``throttle_penalty`` seconds in
+    which every page request gets ``throttle_response``: the robot-check page
+    ("captcha") or a 503 ("503"). ``blocked`` counts the requests refused so.
+    """
+
+    ASSET_KB = {"image": 40, "font": 60, "media": 400, "script": 30}
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, route_latency=None, fail_rate=0.0,
+                 route_fail_rate=None, results_per_page=24, pages=5, template=DEFAULT_TEMPLATE,
+                 email="fixture@example.com", password="fixture", seed=0, assets=True, asset_kb=None,
+                 throttle=None, throttle_penalty=2.0, throttle_response="captcha", verbose=False):
+        self.latency = latency
+        self.route_latency = dict(route_latency or {})
+        self.fail_rate = fail_rate
+        self.route_fail_rate = dict(route_fail_rate or {})
+        self.results_per_page = results_per_page
+        self.pages = pages
+        self.email = email
+        self.password = password
+        self.verbose = verbose
+        self.assets = assets
+        self.asset_kb = dict(self.ASSET_KB, **(asset_kb or {}))
+        self._payloads = {}
+        self.throttle = throttle
+        self.throttle_penalty = throttle_penalty
+        self.throttle_response = throttle_response
+        self._recent = collections.deque()
+        self._blocked_until = 0.0
+        self.blocked = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.carts = {}      # session-id -> {asin: quantity}
+        self.sessions = set()
+        self.requests = {}   # route name -> count
+        self._rng = random.Random(seed)
+        self._template = self._load_template(template)
+        handler = type("Handler", (_Handler,), {"site": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def cdn_url(self):
+        return f"http://localhost:{self.httpd.server_address[1]}"
+
+    # --- behaviour knobs ---
+    def delay(self, route):
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+        seconds = self.route_latency.get(route, self.latency)
+        if seconds:
+            time.sleep(seconds)
+
+    def count_bytes(self, n):
+        with self.lock:
+            self.bytes_sent += n
+
+    def payload(self, kind):
+        if kind not in self._payloads:
+            self._payloads[kind] = b"\0" * (self.asset_kb[kind] * 1024)
+        return self._payloads[kind]
+
+    def should_fail(self, route):
+        rate = self.route_fail_rate.get(route, self.fail_rate)
+        if not rate:
+            return False
+        with self.lock:
+            return self._rng.random() < rate
+
+    def throttled(self, route):
+        """``throttle_response`` if this page request is refused by the rate limit, else None."""
+        if not self.throttle or route in _ASSET_ROUTES:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            while self._recent and self._recent[0] <= now - 1.0:
+                self._recent.popleft()
+            self._recent.append(now)
+            if now >= self._blocked_until and len(self._recent) > self.throttle:
+                self._blocked_until = now + self.throttle_penalty
+            if now < self._blocked_until:
+                self.blocked += 1
+                return self.throttle_response
+        return None
+
+    # --- catalogue ---
+    @staticmethod
+    def _load_template(path):
+        """Turn a saved result container into a template with @@FIELD@@ placeholders."""
+        with open(path, encoding="utf-8") as f:
+            tpl = f.read()
+        asin = re.search(r'data-asin="([^"]+)"', tpl).group(1)
+        title = re.search(r'<h2 aria-label="[^"]*"[^>]*><span>([^<]+)</span>', tpl)
+        if title:
+            tpl = tpl.replace(title.group(1), "@@TITLE@@")
+        tpl = re.sub(r'(<span class="a-price-whole">)[^<]*', r"\g<1>@@PRICE@@", tpl)
+        tpl = re.sub(r'(<span class="a-price"[^>]*><span class="a-offscreen">)[^<]*', r"\g<1>₹@@PRICE@@", tpl, count=1)
+        tpl = re.sub(r'(<span class="a-icon-alt">)[^<]*', r"\g<1>@@RATING@@ out of 5 stars", tpl, count=1)
+        tpl = re.sub(r'aria-label="[\d,.]+ ratings?"', 'aria-label="@@REVIEWS@@ ratings"', tpl)
+        tpl = re.sub(r'href="/sspa/click[^"]*"', 'href="/dp/@@ASIN@@"', tpl)
+        tpl = re.sub(r"https://m\.media-amazon\.com/images/I/[^._]+", "@@CDN@@/images/I/@@ASIN@@", tpl)
+        tpl = re.sub(r'(name="anti-csrftoken-a2z" (?:value|content)=")[^"]*', r"\g<1>" + CSRF_TOKEN, tpl)
+        tpl = re.sub(r'(<meta name="anti-csrftoken-a2z" content=")[^"]*', r"\g<1>" + CSRF_TOKEN, tpl)
+        return tpl.replace(asin, "@@ASIN@@")
+
+    @staticmethod
+    def product(asin):
+        """Deterministic product data derived from the ASIN."""
+        h = int(hashlib.sha1(asin.encode()).hexdigest(), 16)
+        return {
+            "asin": asin,
+            "title": f"Fixture product {asin} with a reasonably long descriptive title",
+            "price": 199 + h % 60000,
+            "rating": round(2.5 + (h >> 20) % 26 / 10, 1),
+            "reviews": (h >> 40) % 20000,
+        }
+
+    def search(self, query, page):
+        if page < 1 or page > self.pages:
+            return []
+        out = []
+        for i in range(self.results_per_page):
+            n = (page - 1) * self.results_per_page + i
+            digest = hashlib.sha1(f"{query}|{n}".encode()).hexdigest().upper()
+            out.append(self.product("F" + digest[:9]))
+        return out
+
+    def render_result(self, p):
+        return (self._template.replace("@@ASIN@@", p["asin"]).replace("@@CDN@@", self.cdn_url)
+                .replace("@@TITLE@@", html.escape(p["title"]))
+                .replace("@@PRICE@@", f"{p['price']:,}")
+                .replace("@@RATING@@", str(p["rating"]))
+                .replace("@@REVIEWS@@", f"{p['reviews']:,}"))
+
+    # --- sessions & carts ---
+    def new_session(self):
+        """Create a signed-in session and return its cookie dict (as WebDriver would)."""
+        sid = uuid.uuid4().hex
+        with self.lock:
+            self.sessions.add(sid)
+        host = self.httpd.server_address[0]
+        return {"name": "session-id", "value": sid, "domain": host, "path": "/"}
+
+    def add_to_cart(self, session, asin, quantity=1):
+        with self.lock:
+            cart = self.carts.setdefault(session, {})
+            cart[asin] = cart.get(asin, 0) + quantity
+            return sum(cart.values())
+
+    def cart_count(self, session):
+        with self.lock:
+            return sum(self.carts.get(session, {}).values()) if session else 0
+
+    # --- lifecycle ---
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local Amazon stand-in server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 503")
+    ap.add_argument("--throttle", type=float, default=None, help="page requests per second before blocking")
+    ap.add_argument("--throttle-penalty", type=float, default=2.0, help="seconds a tripped throttle blocks for")
+    ap.add_argument("--throttle-response", choices=("captcha", "503"), default="captcha")
+    ap.add_argument("--results", type=int, default=24, help="results per search page")
+    ap.add_argument("--pages", type=int, default=5, help="search result pages per query")
+    ap.add_argument("--template", default=DEFAULT_TEMPLATE, help="saved result container used for search pages")
+    ap.add_argument("--no-assets", action="store_true", help="serve bare pages without images, fonts, video or ads")
+    args = ap.parse_args()
+    site = FixtureServer(args.host, args.port, latency=args.latency, fail_rate=args.fail_rate,
+                         results_per_page=args.results, pages=args.pages, template=args.template,
+                         assets=not args.no_assets, throttle=args.throttle, throttle_penalty=args.throttle_penalty,
+                         throttle_response=args.throttle_response, verbose=True)
+    print(f"Serving on {site.url} (sign in as {site.email} / {site.password})")
+    try:
+        site.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Failure flight recorder: the last moments of a session, kept in memory, written out only on failure.
+
+A :class:`FlightRecorder` keeps a bounded record of what led up to now:
+
+* every WebDriver (or DevTools) command with its target, duration and
+  outcome, in a ring of the last ``commands`` entries;
+* compressed DOM snapshots of pages the stages read anyway (the results
+  page, the cart) and other text artifacts (the diagnostic's matches), in
+  a ring capped at ``max_bytes`` of compressed data, oldest evicted first.
+
+Nothing touches the disk while things go well. When a stage fails, or a
+snapshot turns out to be Amazon's robot check, :meth:`FlightRecorder.dump`
+adds the live page (DOM and screenshot) and a traceback and the ring is
+written to one zip file under ``directory``::
+
+    recorder = FlightRecorder("flight_recordings", max_bytes=8 << 20)
+    recorder.instrument(driver)
+    recorder.snapshot(driver, "scrape", driver.page_source, url)
+    ...
+    recorder.dump(driver, "checkout-TimeoutException", error=e)
+
+The calling thread only appends to a deque or hands a string to a queue.
+Compression, eviction, the CAPTCHA check and file writes run on a
+background writer thread, which is drained when the interpreter exits.
+"""
+import atexit
+import collections
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import time
+import traceback
+import zipfile
+import zlib
+
+from backend import Backend
+from extraction import is_captcha_page
+from tracing import _describe
+
+# Commands kept in the ring (per recorder, all sessions together)
+COMMAND_LOG = 500
+# Snapshots waiting for the writer; past this, new ones are dropped rather than queued
+MAX_PENDING = 32
+
+
+class FlightRecorder:
+    """Bounded in-memory record of recent driver activity, flushed to ``directory`` on failure."""
+
+    def __init__(self, directory="flight_recordings", max_bytes=8 << 20, commands=COMMAND_LOG):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.commands = collections.deque(maxlen=commands)
+        # (seq, time, session, label, url, compressed text)
+        self.artifacts = collections.deque()
+        self.bytes = 0
+        self.dropped = 0
+        self.written = []
+        self._seq = itertools.count(1)
+        self._sessions = itertools.count(1)
+        self._dumps = itertools.count(1)
+        self._jobs = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="flight-recorder", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- capture (caller's thread) ---
+    def instrument(self, driver):
+        """Log every command ``driver`` sends (Selenium drivers and CdpBackend). Returns the driver."""
+        if getattr(driver, "_flight_recorder", None) is self:
+            return driver
+        original = driver.execute
+        session = next(self._sessions)
+        log, seq = self.commands, self._seq
+
+        def execute(driver_command, params=None):
+            t0 = time.perf_counter()
+            result = "ok"
+            try:
+                return original(driver_command, params)
+            except Exception as e:
+                result = type(e).__name__
+                raise
+            finally:
+                # params are described when (if ever) the ring is written
+                log.append((next(seq), time.time(), session, driver_command, params,
+                            (time.perf_counter() - t0) * 1000, result))
+
+        driver.execute = execute
+        driver._flight_recorder = self
+        driver._flight_session = session
+        return driver
+
+    def snapshot(self, driver, label, text, url=""):
+        """Keep ``text`` in the ring, compressed off-thread.
+
+        ``label`` names the snapshot (``.html`` is added unless it has an
+        extension). Dropped, not queued, when the writer is behind.
+        """
+        if self._jobs.qsize() >= MAX_PENDING:
+            self.dropped += 1
+            return
+        self._jobs.put(("snapshot", getattr(driver, "_flight_session", None), label, url, text))
+
+    def dump(self, driver=None, reason="failure", error=None):
+        """Write the ring, the live page of ``driver`` and ``error``'s traceback to a zip file.
+
+        The live DOM and screenshot are read here (from the failing session);
+        the file is written by the background thread. Returns its path.
+        """
+        live = _capture(driver) if driver is not None else {}
+        trace = "".join(traceback.format_exception(type(error), error, error.__traceback__)) if error else ""
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._dumps):03d}-{_slug(reason)}.zip"
+        path = os.path.join(self.directory, name)
+        self._jobs.put(("dump", path, getattr(driver, "_flight_session", None), reason, trace, live))
+        return path
+
+    def flush(self):
+        """Wait until every queued snapshot and dump has been processed."""
+        self._jobs.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._jobs.put(None)
+            self._writer.join()
+
+    # --- writer thread ---
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                if job[0] == "snapshot":
+                    self._store(*job[1:])
+                else:
+                    self._write(*job[1:])
+            except Exception as e:
+                print(f"⚠️ Flight recorder: {e}")
+            finally:
+                self._jobs.task_done()
+
+    def _store(self, session, label, url, text):
+        data = zlib.compress(text.encode("utf-8", "replace"), 6)
+        self.artifacts.append((next(self._seq), time.time(), session, label, url, data))
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes and self.artifacts:
+            self.bytes -= len(self.artifacts.popleft()[-1])
+        if is_captcha_page(text, url):
+            self._write(os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+                                                     f"{next(self._dumps):03d}-captcha-{_slug(label)}.zip"),
+                        session, f"captcha on {label}", "", {})
+
+    def _write(self, path, session, reason, trace, live):
+        def mine(entry_session):
+            return session is None or entry_session in (session, None)
+
+        commands = [c for c in list(self.commands) if mine(c[2])]
+        artifacts = [a for a in list(self.artifacts) if mine(a[2])]
+        os.makedirs(self.directory, exist_ok=True)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("commands.jsonl", "".join(
+                json.dumps({"seq": seq, "time": round(t, 3), "session": s, "command": name,
+                            "target": _describe(params) if isinstance(params, dict) else "",
+                            "ms": round(ms, 1), "result": result}) + "\n"
+                for seq, t, s, name, params, ms, result in commands))
+            for seq, t, _, label, url, data in artifacts:
+                name = _slug(label) if "." in label else f"{_slug(label)}.html"
+                z.writestr(f"snapshots/{seq:06d}-{name}", zlib.decompress(data))
+            if live.get("html") is not None:
+                z.writestr("page.html", live["html"])
+            if live.get("png"):
+                z.writestr("screenshot.png", live["png"], compress_type=zipfile.ZIP_STORED)
+            if trace:
+                z.writestr("traceback.txt", trace)
+            captcha = live.get("html") is not None and is_captcha_page(live["html"], live.get("url", ""))
+            z.writestr("summary.json", json.dumps({
+                "reason": reason,
+                "captcha": captcha,
+                "url": live.get("url"),
+                "written": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commands": len(commands),
+                "snapshots": [{"seq": a[0], "label": a[3], "url": a[4], "time": round(a[1], 3)} for a in artifacts],
+                "ring_bytes": self.bytes,
+                "dropped_snapshots": self.dropped,
+                "capture_errors": live.get("errors", []),
+            }, indent=2))
+        self.written.append(path)
+        print(f"🛩️ Flight recording ({reason}) written to {path}")
+
+
+def _capture(driver):
+    """URL, DOM and screenshot of the page ``driver`` (Selenium or a Backend) is on; failures are noted."""
+    live, errors = {}, []
+    if isinstance(driver, Backend):
+        grabs = (("url", lambda: driver.url), ("html", driver.html), ("png", driver.screenshot))
+    else:
+        grabs = (("url", lambda: driver.current_url), ("html", lambda: driver.page_source),
+                 ("png", driver.get_screenshot_as_png))
+    for key, grab in grabs:
+        try:
+            live[key] = grab()
+        except Exception as e:
+            # the session may be the thing that broke
+            errors.append(f"{key}: {type(e).__name__}: {e}")
+    live["errors"] = errors
+    return live
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", text).strip("-")[:60] or "failure"
@@ -0,0 +1,249 @@
+"""The agent's stages written against ``backend.Backend`` only.
+
+Sign-in, search, the blocked-page check and checkout use nothing but CSS
+selectors, clicks, typing and waits. They are the agent's only
+implementation of those stages: ``amazon_agent`` runs them on its Selenium
+driver (wrapped in ``backend.SeleniumBackend``), and :func:`run_flow` runs
+them on any backend, DevTools (CDP) and fake included::
+
+    config = amazon_agent.configure(backend="fake", base_url=site.url, email=site.email, password=site.password)
+    with backend.open_backend(config) as b:
+        summary = run_flow(b, config)
+
+Adding to the cart is where the two differ. ``amazon_agent`` adds inline from
+the results page, from product pages in parallel tabs or over HTTP, and
+confirms in the page with MutationObservers, all of which need Selenium.
+:func:`run_flow` adds with :func:`add_from_product_pages`, one product page
+at a time. Multi-page search, the catalog and the session cache are also
+Selenium-only.
+"""
+import itertools
+import time
+
+import tracing
+from extraction import parse_search_results
+from governor import classify
+from parallel_search import search_url
+from selector_registry import selector_key
+
+SEARCH_BOX = "#twotabsearchtextbox"
+RESULT = "div[data-component-type='s-search-result'][data-asin]"
+CAPTCHA = "#captchacharacters"
+ADD_BUTTONS = ["#add-to-cart-button", "input[name='submit.add-to-cart']"]
+ADDED = ["#NATC_SMART_WAGON_CONF_MSG_SUCCESS", "#sw-atc-details-single-container", "#attach-added-to-cart-message"]
+# (selector, tier): the button's name / id, then any input labelled Proceed to ... (see selector_registry)
+PROCEED = [
+    ("input[name='proceedToRetailCheckout']", 0),
+    ("#sc-buy-box-ptc-button", 0),
+    ("input[value*='Proceed to Buy']", 1),
+    ("input[value*='Proceed to checkout']", 1),
+    ("input[value*='Proceed to buy']", 1),
+]
+# Links and buttons are matched on their text, looked for between the checks for PROCEED
+PROCEED_TEXT = ("a, button", ("proceed to buy", "proceed to checkout"))
+CHECKOUT = ["#shippingOptionFormId", "input[name='placeYourOrder1']"]
+CHECKOUT_URLS = ("checkout", "/gp/buy")
+# Slice of a wait after which the fallbacks that are not part of the race are looked for
+_POLL = 1.0
+
+
+def cart_count(backend):
+    el = backend.query("#nav-cart-count")
+    digits = "".join(ch for ch in (backend.text(el) if el is not None else "") if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def page_verdict(backend, config):
+    """After a stage failed: is the open page a CAPTCHA / throttling page? Backs off if so."""
+    from amazon_agent import governor
+
+    gov = governor(config)
+    if gov is None:
+        return "ok"
+    try:
+        verdict = classify(backend.html(), backend.url)
+    except Exception:
+        return "ok"
+    if verdict != "ok":
+        gov.throttled(verdict)
+    return verdict
+
+
+def _sign_in_once(backend, config):
+    """The email and password forms, once. Returns None if the home page came up, else what went wrong."""
+    from amazon_agent import signin_url
+
+    backend.navigate(signin_url(config))
+    _, field = backend.wait_for(["#ap_email"], config.timeout)
+    if field is None:
+        return "no email field on the sign-in page"
+    backend.type(field, config.email, submit=True)
+    index, field = backend.wait_for(["#ap_password", "#auth-error-message-box"], config.timeout)
+    if index != 0:
+        return "no password field after the email step"
+    backend.type(field, config.password, submit=True)
+    index, _ = backend.wait_for(["#auth-error-message-box", SEARCH_BOX], config.timeout)
+    if index != 1:
+        return "wrong credentials or a CAPTCHA"
+    return None
+
+
+def login(backend, config):
+    """Sign in with config.email / config.password. Raises amazon_agent.LoginError.
+
+    A sign-in that ends on a CAPTCHA / throttling page is tried again after
+    the governor's back-off, up to config.block_retries times.
+    """
+    from amazon_agent import LoginError
+
+    for attempt in itertools.count():
+        cause = None
+        try:
+            problem = _sign_in_once(backend, config)
+        except Exception as e:
+            problem, cause = f"{type(e).__name__}: {e}", e
+        if problem is None:
+            print("✅ Login successful!")
+            return
+        # a throttled sign-in is worth another go once the back-off is over; a wrong password is not
+        verdict = page_verdict(backend, config)
+        if verdict == "ok":
+            raise LoginError(f"Login failed. You might need to solve a CAPTCHA manually. Error: {problem}") from cause
+        if attempt >= config.block_retries:
+            raise LoginError(f"Login failed: still getting a {verdict} page after {attempt} retries.") from cause
+        print(f"🚦 Sign-in got a {verdict} page; retrying ({attempt + 1}/{config.block_retries})...")
+
+
+def search(backend, config, query=None):
+    """Submit ``query`` (default config.search_item) in the search bar and wait for results.
+
+    Returns once the results, or the robot check, are showing (the stage that
+    reads the page reloads a blocked one). Raises TimeoutError if neither
+    shows up; a blocked page is retried as in :func:`login`.
+    """
+    query = query or config.search_item
+    for attempt in itertools.count():
+        try:
+            box = backend.query(SEARCH_BOX)
+            if box is None:
+                backend.navigate(config.base_url + "/")
+                _, box = backend.wait_for([SEARCH_BOX], config.timeout)
+            if box is not None:
+                backend.type(box, query, submit=True)
+            else:
+                backend.navigate(search_url(config.base_url, query, 1))
+            print(f"🔍 Searching for '{query}'...")
+            if backend.wait_for([RESULT, CAPTCHA], config.timeout)[0] < 0:
+                raise TimeoutError(f"No search results for {query!r} within {config.timeout:g}s")
+            return
+        except Exception:
+            verdict = page_verdict(backend, config)
+            if verdict == "ok" or attempt >= config.block_retries:
+                raise
+            print(f"🚦 Search got a {verdict} page; retrying ({attempt + 1}/{config.block_retries})...")
+            backend.navigate(config.base_url + "/")
+
+
+def extract(backend, config):
+    """``(records, choices)`` from the open results page, as ``amazon_agent.extract`` (page 1 only)."""
+    from amazon_agent import choose
+
+    records = parse_search_results(backend.html(), base_url=backend.url)
+    choices = choose(config, records)
+    print(f"📦 Found {len(choices)} parsed products.")
+    return records, choices
+
+
+def add_from_product_pages(backend, config, choices):
+    """Add the first config.max_products choices from their product pages; returns the added ones."""
+    added = []
+    for item in choices[:config.max_products]:
+        backend.navigate(item["url"])
+        _, button = backend.wait_for(ADD_BUTTONS, config.timeout)
+        if button is None:
+            print(f"⚠️ Could not add (product page): {item['title']}. Reason: no add-to-cart button")
+            continue
+        before = cart_count(backend)
+        backend.click(button)
+        index, _ = backend.wait_for(ADDED, config.timeout)
+        after = cart_count(backend)
+        if index >= 0 or (after is not None and after > (before or 0)):
+            print(f"✅ Added to cart (product page): {item['title']}")
+            added.append({"title": item["title"], "asin": item.get("asin")})
+        else:
+            print(f"⚠️ Could not add (product page): {item['title']}. Reason: no confirmation observed")
+    return added
+
+
+def _checkout_reached(backend, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        if any(marker in backend.url.lower() for marker in CHECKOUT_URLS):
+            return True
+        remaining = deadline - time.monotonic()
+        if backend.wait_for(CHECKOUT, max(0.0, min(_POLL, remaining)))[0] >= 0:
+            return True
+        if remaining <= 0:
+            return False
+
+
+def checkout(backend, config, registry=None):
+    """Open the cart and press Proceed to Buy, stopping before payment. Returns True on success.
+
+    The PROCEED selectors are raced best-ranked first by ``registry`` (a
+    ``selector_registry.SelectorRegistry``), which records the winner.
+    """
+    if "/gp/cart/view.html" not in backend.url:
+        # reconcile_cart may have just loaded it
+        backend.navigate(f"{config.base_url}/gp/cart/view.html?ref_=nav_cart")
+    print("🛒 Navigated to cart page.")
+
+    def key(sel):
+        return selector_key("css selector", sel[0])
+
+    ranked = registry.rank("cart", PROCEED, key=key, tier=lambda sel: sel[1]) if registry else list(PROCEED)
+    t0 = time.perf_counter()
+    deadline = time.monotonic() + config.timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        index, button = backend.wait_for([sel[0] for sel in ranked], max(0.0, min(_POLL, remaining)))
+        if button is None:
+            button = backend.find_text(*PROCEED_TEXT)
+        if button is not None or remaining <= 0:
+            break
+    if registry:
+        # the winner is a hit, the better-ranked ones that lost are misses (as in amazon_agent.find_first)
+        for i, sel in enumerate(ranked[:index + 1] if index >= 0 else ranked):
+            registry.record("cart", key(sel), i == index, time.perf_counter() - t0)
+
+    if button is None:
+        print("⚠️ Checkout/Proceed button not found by known selectors. Please check the cart page manually.")
+        return False
+    backend.click(button)
+    print("🚀 Clicked Proceed to Buy.")
+    reached = _checkout_reached(backend, config.timeout)
+    print("✅ Reached checkout page (stopping before payment)." if reached
+          else "⚠️ Proceed clicked but checkout page not detected within timeout; verify manually.")
+    return reached
+
+
+def run_flow(backend, config):
+    """Run every stage on ``backend``; returns a summary with per-stage seconds."""
+    stages = {}
+
+    def stage(name, fn, *args):
+        t0 = time.perf_counter()
+        with tracing.span(name):
+            try:
+                return fn(*args)
+            finally:
+                stages[name] = time.perf_counter() - t0
+
+    if config.email:
+        stage("login", login, backend, config)
+    stage("search", search, backend, config)
+    records, choices = stage("scrape", extract, backend, config)
+    added = stage("product-page", add_from_product_pages, backend, config, choices)
+    reached = stage("checkout", checkout, backend, config)
+    return {"backend": backend.name, "records": len(records), "choices": len(choices),
+            "added": added, "checkout": reached, "stages": stages}
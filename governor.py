@@ -0,0 +1,255 @@
+"""Throttling-aware request governor: one pace for every session, backing off when the site pushes back.
+
+Amazon answers too many page loads with its robot check (a CAPTCHA form), a
+"to discuss automated access" notice or a 503. Sessions that keep going at
+full speed then only dig deeper. The :class:`Governor` paces every page load
+of the process (the agent's browser, the search workers, batch sessions,
+HTTP adds) through one :class:`TokenBucket` and a concurrency limit, and
+adjusts both the way TCP adjusts its window (AIMD):
+
+* pages that come back normal raise the rate by ``step`` per second of
+  such pages, up to a ceiling just under the rate of the last block; the
+  ceiling itself creeps back towards ``max_rate`` ten times slower, so
+  the rate probes above the last known-bad rate only cautiously. Every
+  ``limit`` normal pages in a row allow one more concurrent load (up to
+  ``max_concurrency``);
+* a blocked page halves the rate and the concurrency limit and pauses
+  every session for a back-off that doubles with each block in a row
+  (``backoff`` .. ``max_backoff`` seconds, with jitter so sessions do not
+  come back in lockstep).
+
+With ``path`` the bucket's rate, tokens and pause live in a small JSON file
+(guarded by ``session_cache.FileLock``), so several agent processes on the
+machine share one budget and one back-off::
+
+    gov = Governor(max_rate=2.0, max_concurrency=4, path=".rate_limit.json")
+    gov.instrument(driver)                  # every driver.get() takes a slot and a token
+    verdict = gov.observe(driver.page_source, driver.current_url)   # "ok", "captcha" or "throttled"
+"""
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+
+import tracing
+from extraction import is_captcha_page
+from session_cache import FileLock
+
+# Statuses and phrases of the pages the site serves instead of the one asked for when throttling
+THROTTLE_STATUSES = (429, 503)
+_BLOCK_MARKERS = ("to discuss automated access", "service unavailable", "sorry! something went wrong")
+# Block pages are small; only this much of a page is searched for the markers
+_BLOCK_SCAN_CHARS = 20000
+
+
+class Blocked(Exception):
+    """Raised when a page is still a CAPTCHA / throttling page after the retries."""
+
+
+def classify(html="", url="", status=None):
+    """``"captcha"`` (robot check), ``"throttled"`` (429/503 or a block notice) or ``"ok"``."""
+    if is_captcha_page(html, url):
+        return "captcha"
+    if status in THROTTLE_STATUSES:
+        return "throttled"
+    head = html[:_BLOCK_SCAN_CHARS].lower()
+    if any(marker in head for marker in _BLOCK_MARKERS):
+        return "throttled"
+    return "ok"
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``burst`` saved up; optionally shared across processes via ``path``."""
+
+    def __init__(self, rate, burst=None, path=None):
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.path = path
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(path + ".lock", timeout=10) if path else None
+        self._state = self._fresh(rate)
+
+    def _fresh(self, rate):
+        return {"rate": float(rate), "tokens": self.burst, "stamp": time.time(), "paused_until": 0.0}
+
+    def _update(self, fn):
+        """Apply ``fn(state, now)`` to the (shared) state and return its result."""
+        with self._lock:
+            if self._file_lock is None:
+                return fn(self._state, time.time())
+            with self._file_lock:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        state = json.load(f)
+                except Exception:
+                    # first user, or a torn file: start from this process's view
+                    state = self._state
+                result = fn(state, time.time())
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp, self.path)
+                self._state = state
+                return result
+
+    def _take(self, state, now):
+        if now < state["paused_until"]:
+            # nothing is saved up during a pause: it must not end in a burst
+            state["tokens"], state["stamp"] = 0.0, now
+            return state["paused_until"] - now
+        tokens = min(self.burst, state["tokens"] + max(0.0, now - state["stamp"]) * state["rate"])
+        state["stamp"] = now
+        if tokens >= 1:
+            state["tokens"] = tokens - 1
+            return 0.0
+        state["tokens"] = tokens
+        return (1 - tokens) / state["rate"]
+
+    def acquire(self, timeout=None):
+        """Wait for a token (and the end of any pause). Returns False if ``timeout`` ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._update(self._take)
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            tracing.sleep(wait, "rate-limit")
+
+    @property
+    def rate(self):
+        return self._update(lambda state, now: state["rate"])
+
+    def adjust(self, fn):
+        """Set the rate to ``fn(rate)``; returns the new rate."""
+        def apply(state, now):
+            state["rate"] = fn(state["rate"])
+            return state["rate"]
+        return self._update(apply)
+
+    def pause(self, seconds):
+        """Hand out no tokens for ``seconds`` (extends, never shortens, a pause in progress).
+
+        Returns False if a pause was already in progress.
+        """
+        def apply(state, now):
+            was_paused = now < state["paused_until"]
+            state["paused_until"] = max(state["paused_until"], now + seconds)
+            return not was_paused
+        return self._update(apply)
+
+
+class Governor:
+    """AIMD control of the shared page-load rate and of this process's concurrent loads."""
+
+    # Normal pages in a row after which the back-off starts again from ``backoff``
+    RESET_AFTER = 10
+
+    def __init__(self, max_rate=2.0, min_rate=0.05, max_concurrency=4, path=None, step=None,
+                 decrease=0.5, backoff=5.0, max_backoff=300.0):
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        self.max_concurrency = max(1, int(max_concurrency))
+        # rate added per second of normal pages: from half to full speed in about half a minute
+        self.step = step if step is not None else self.max_rate / 60
+        self.decrease = decrease
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # no bursts: loads are spaced evenly at the current rate
+        self.bucket = TokenBucket(self.max_rate, burst=1.0, path=path)
+        self.ceiling = self.max_rate
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.stats = {"ok": 0, "captcha": 0, "throttled": 0, "backoffs": 0, "backoff_s": 0.0}
+        self._cond = threading.Condition()
+        self._streak = 0
+        self._run = 0
+
+    # --- pacing ---
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one of ``limit`` concurrent slots and a token for the duration of a page load."""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            self.bucket.acquire()
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def pace(self):
+        """Wait for a token only, for loads that are started without being waited for (new tabs)."""
+        self.bucket.acquire()
+
+    def instrument(self, driver):
+        """Pace every ``driver.get`` through :meth:`slot`. Returns the driver."""
+        if getattr(driver, "_governor", None) is self:
+            return driver
+        original = driver.execute
+        governor = self
+
+        def execute(driver_command, params=None):
+            if driver_command != "get":
+                return original(driver_command, params)
+            with governor.slot():
+                return original(driver_command, params)
+
+        driver.execute = execute
+        driver._governor = self
+        return driver
+
+    # --- feedback ---
+    def observe(self, html, url="", status=None):
+        """Classify a loaded page and adjust the pace; returns the verdict (see :func:`classify`)."""
+        verdict = classify(html, url, status)
+        if verdict == "ok":
+            self.success()
+        else:
+            self.throttled(verdict)
+        return verdict
+
+    def success(self):
+        with self._cond:
+            self.stats["ok"] += 1
+            self._run += 1
+            if self._run >= self.RESET_AFTER:
+                self._streak = 0
+            if self._run >= self.limit and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._run = 0
+                self._cond.notify_all()
+        # ``rate`` successes per second, so ``step / rate`` each makes ``step`` per second
+        def increase(rate):
+            self.ceiling = min(self.max_rate, self.ceiling + self.step / 10 / rate)
+            return max(rate, min(self.ceiling, rate + self.step / rate))
+        self.bucket.adjust(increase)
+
+    def throttled(self, kind="throttled"):
+        """Back off after a blocked page. Returns the pause in seconds (0 if one was already running)."""
+        with self._cond:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+            self._run = 0
+            delay = min(self.max_backoff, self.backoff * 2 ** self._streak)
+        delay = random.uniform(delay / 2, delay)
+        # sessions that were already loading when the block started report it too: one cut per episode
+        if not self.bucket.pause(delay):
+            return 0.0
+        def cut(rate):
+            self.ceiling = max(self.min_rate, rate * 0.9)
+            return max(self.min_rate, rate * self.decrease)
+        rate = self.bucket.adjust(cut)
+        with self._cond:
+            self._streak += 1
+            self.limit = max(1, self.limit // 2)
+            self.stats["backoffs"] += 1
+            self.stats["backoff_s"] += delay
+        print(f"🚦 Got a {kind} page: pausing {delay:.0f}s, then {rate:.2f} page(s)/s, {self.limit} at a time.")
+        return delay
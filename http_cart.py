@@ -0,0 +1,120 @@
+"""Add-to-cart over plain HTTP, reusing the browser's signed-in session.
+
+The inline "Add to cart" button on a results page is a normal form POST
+(``/cart/add-to-cart`` with the ASIN, offer id and an anti-CSRF token). The
+extractors already read that form for each result (``record['add_form']``),
+so once the browser has logged in we can copy its cookies and user agent into
+a keep-alive, connection-pooled ``requests`` session and submit many adds
+concurrently, leaving the browser for login and checkout only. With a
+``governor.Governor`` each POST is paced by it and a CAPTCHA or 503 answer
+makes it back off like a blocked page load does. An add only counts once
+the page it ends on shows the "Added to cart" confirmation: a 2xx answer
+alone can be an error page or a form that was not accepted.
+"""
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from governor import classify
+
+# A response redirected here did not add anything (signed out)
+_FAIL_URL_MARKERS = ("/ap/signin",)
+# Ids of the "Added to cart" confirmation the add redirects to (as flow.ADDED)
+_ADDED_MARKERS = ("NATC_SMART_WAGON_CONF_MSG_SUCCESS", "sw-atc-details-single-container",
+                  "attach-added-to-cart-message")
+
+
+class HttpCart:
+    """Pooled HTTP client submitting add-to-cart forms with browser cookies.
+
+    ``max_concurrency`` bounds the number of in-flight requests; the connection
+    pool is sized to match so every worker keeps its own keep-alive socket.
+    """
+
+    def __init__(self, cookies=(), user_agent=None, max_concurrency=4, timeout=15, governor=None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout = timeout
+        self.governor = governor
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        """Copy cookies and user agent from a signed-in WebDriver session (two commands)."""
+        user_agent = driver.execute_script("return navigator.userAgent")
+        return cls(cookies=driver.get_cookies(), user_agent=user_agent, **kwargs)
+
+    def add(self, record):
+        """Submit one record's add-to-cart form. Returns a result dict with ``ok``."""
+        form = record.get("add_form")
+        result = {"asin": record.get("asin"), "title": record.get("title"), "ok": False}
+        if not form or not form.get("action"):
+            result["error"] = "no add-to-cart form"
+            return result
+        parts = urlsplit(form["action"])
+        headers = {
+            "Origin": f"{parts.scheme}://{parts.netloc}",
+            "Referer": record.get("referer") or f"{parts.scheme}://{parts.netloc}/",
+        }
+        try:
+            with self.governor.slot() if self.governor else contextlib.nullcontext():
+                t0 = time.perf_counter()
+                resp = self.session.post(form["action"], data=form["fields"], headers=headers, timeout=self.timeout)
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+        result["ms"] = (time.perf_counter() - t0) * 1000
+        result["status"] = resp.status_code
+        redirected_to = " ".join(r.headers.get("Location", "") for r in resp.history) + " " + resp.url
+        verdict = classify(resp.text, redirected_to, resp.status_code)
+        if self.governor:
+            if verdict == "ok":
+                self.governor.success()
+            else:
+                self.governor.throttled(verdict)
+        if verdict != "ok":
+            result["error"] = f"blocked ({verdict})"
+        elif any(m in redirected_to for m in _FAIL_URL_MARKERS):
+            result["error"] = "signed out"
+        elif resp.status_code >= 400:
+            result["error"] = f"HTTP {resp.status_code}"
+        elif not any(m in resp.text for m in _ADDED_MARKERS):
+            result["error"] = "no add-to-cart confirmation in the response"
+        else:
+            result["ok"] = True
+        return result
+
+    def add_many(self, records):
+        """Submit all forms concurrently (at most max_concurrency at a time), in input order."""
+        records = list(records)
+        if not records:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(records))) as pool:
+            return list(pool.map(self.add, records))
+
+    def sync_cookies_to(self, driver):
+        """Push cookies the server rotated during the adds back into the browser.
+
+        The browser must be on a page of the cookies' domain.
+        """
+        host = urlsplit(driver.current_url).hostname or ""
+        for c in self.session.cookies:
+            if c.domain and not host.endswith(c.domain.lstrip(".")):
+                continue
+            try:
+                driver.add_cookie({"name": c.name, "value": c.value, "path": c.path or "/"})
+            except Exception:
+                continue
+
+    def close(self):
+        self.session.close()
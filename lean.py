@@ -0,0 +1,45 @@
+"""Lean page-load profile: headless, ``eager`` page loads and network blocking.
+
+The agent reads DOM and forms, never pixels, so images, fonts, video and ad or
+tracking scripts are pure overhead. The lean profile stops ``driver.get`` at
+DOMContentLoaded (``pageLoadStrategy=eager``) and asks Chrome, through the
+DevTools Network domain, to refuse requests whose URL matches a pattern list.
+
+Patterns use the ``Network.setBlockedURLs`` syntax: ``*`` matches any run of
+characters. Blocking is per page target, so call :func:`block_urls` again
+after opening a new tab.
+"""
+
+# Images, fonts, media and the ad/tracking hosts Amazon pages pull in
+DEFAULT_BLOCKLIST = (
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*amazon-adsystem.com*", "*doubleclick.net*", "*googletagmanager.com*",
+    "*unagi*.amazon.com*", "*fls-*.amazon.*", "*/ads/*",
+)
+
+
+def parse_blocklist(value):
+    """Comma-separated patterns; a leading ``+`` extends the default list instead of replacing it."""
+    value = (value or "").strip()
+    if not value:
+        return DEFAULT_BLOCKLIST
+    extend = value.startswith("+")
+    patterns = tuple(p.strip() for p in value.lstrip("+").split(",") if p.strip())
+    return DEFAULT_BLOCKLIST + patterns if extend else patterns
+
+
+def apply_lean_options(options):
+    """Headless, eager page loads and no image decoding on a ChromeOptions object."""
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1366,900")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.page_load_strategy = "eager"
+    return options
+
+
+def block_urls(driver, patterns=DEFAULT_BLOCKLIST):
+    """Block requests matching ``patterns`` in the driver's current tab (Chrome only)."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
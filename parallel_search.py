@@ -0,0 +1,257 @@
+"""Fetch pages 1..N of a search concurrently with a pool of headless browsers.
+
+Each worker owns an independent Chrome session and its own WebDriverWait. It
+pulls page numbers from a shared queue, loads the results page, parses it with
+:func:`extraction.parse_search_results` and streams ``(page, records)`` back to
+the merger. The merger de-duplicates by ASIN and orders the output by
+(page, position) so the result does not depend on which worker finished first.
+:meth:`ParallelSearch.iter_pages` hands pages over as they complete instead,
+and stops the sweep when its consumer has seen enough.
+
+With a ``governor.Governor`` every page load takes one of its slots and
+tokens, and a page that comes back as a CAPTCHA / throttling page is loaded
+again after the back-off (up to ``block_retries`` times) instead of being
+parsed as an empty page. With a ``session_broker.SessionBroker`` each worker
+gets the signed-in session injected before its first page load. A worker
+that finds itself signed out has the broker sign in again and reloads the
+page; the others pick the new session up before their next page.
+"""
+import contextlib
+import os
+import queue
+import threading
+import time
+from urllib.parse import quote_plus
+
+import tracing
+from extraction import parse_search_results
+from governor import Blocked
+from lean import apply_lean_options, block_urls as lean_block_urls
+from session_cache import SessionCache
+
+RESULTS_XPATH = "//div[contains(@class,'s-result-item') and normalize-space(@data-asin)!='']"
+RESULTS_OR_CAPTCHA_XPATH = RESULTS_XPATH + " | //input[@id='captchacharacters']"
+
+_STOP = object()
+
+
+def search_url(base_url, query, page):
+    return f"{base_url.rstrip('/')}/s?k={quote_plus(query)}&page={page}"
+
+
+def make_headless_driver(block_urls=None, config=None):
+    """Default worker factory: a quiet headless Chrome session.
+
+    With ``block_urls`` (see ``lean``) the session uses the lean profile and
+    refuses requests matching those patterns. The chromedriver binary comes
+    from ``amazon_agent.chromedriver_path`` (``config``, default
+    ``amazon_agent.configure()``), so workers reuse the cached lookup.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    from amazon_agent import chromedriver_path, configure
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1366,900")
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    options.add_argument("--log-level=3")
+    if block_urls:
+        apply_lean_options(options)
+    service = ChromeService(chromedriver_path(config or configure()), log_path=os.devnull)
+    driver = webdriver.Chrome(service=service, options=options)
+    if block_urls:
+        lean_block_urls(driver, block_urls)
+    return driver
+
+
+def merge_pages(pages):
+    """Merge ``{page: [records]}`` into one list, de-duplicated by ASIN.
+
+    Records are ordered by (page, position); an ASIN seen on several pages is
+    kept at its first position. Each kept record gets ``page`` and ``position``.
+    """
+    merged = []
+    seen = set()
+    for page in sorted(pages):
+        for position, rec in enumerate(pages[page]):
+            asin = rec.get("asin")
+            if asin in seen:
+                continue
+            seen.add(asin)
+            rec = dict(rec, page=page, position=position)
+            merged.append(rec)
+    return merged
+
+
+class ParallelSearch:
+    """Pool of headless workers fetching search result pages concurrently.
+
+    ``driver_factory`` is called once per worker thread and must return a new
+    WebDriver. ``on_page(page, records)`` is invoked from the merger (caller's
+    thread) as each page arrives, in completion order.
+    """
+
+    def __init__(self, base_url, workers=4, driver_factory=None, timeout=20, on_page=None,
+                 governor=None, block_retries=2, broker=None):
+        self.base_url = base_url
+        self.workers = max(1, int(workers))
+        self.driver_factory = driver_factory or make_headless_driver
+        self.timeout = timeout
+        self.on_page = on_page
+        self.governor = governor
+        self.block_retries = block_retries
+        self.broker = broker
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._alive = 0
+
+    def _worker(self, pages_q, results_q):
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = None
+        try:
+            driver = self.driver_factory()
+            if self.broker:
+                self.broker.attach(driver)
+            tracer = tracing.active()
+            if tracer:
+                tracer.instrument(driver)
+            wait = WebDriverWait(driver, self.timeout)
+            while True:
+                item = pages_q.get()
+                if item is _STOP:
+                    break
+                query, page = item
+                try:
+                    if self.broker:
+                        # another worker may have signed in again since this one got its cookies
+                        self.broker.sync(driver)
+                    with tracing.span("search-page", page=page):
+                        records = self._load(driver, wait, query, page)
+                    results_q.put((page, records, None))
+                except Exception as e:
+                    results_q.put((page, [], e))
+        except Exception as e:
+            # could not even start a browser: leave the pages to the other
+            # workers, unless this was the last one still alive
+            with self._lock:
+                self._alive -= 1
+                last = self._alive == 0
+            while last:
+                try:
+                    item = pages_q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    results_q.put((item[1], [], e))
+        finally:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
+    def _load(self, driver, wait, query, page):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+
+        blocked = 0
+        refreshed = False
+        while True:
+            with self.governor.slot() if self.governor else contextlib.nullcontext():
+                driver.get(search_url(self.base_url, query, page))
+                try:
+                    wait.until(EC.presence_of_element_located((By.XPATH, RESULTS_OR_CAPTCHA_XPATH)))
+                except Exception:
+                    # past the last page, or a block page without the CAPTCHA form: parse whatever is there
+                    pass
+            html, url = driver.page_source, driver.current_url
+            verdict = self.governor.observe(html, url) if self.governor else "ok"
+            if verdict != "ok":
+                if blocked >= self.block_retries:
+                    raise Blocked(f"page {page} is still a {verdict} page after {self.block_retries} reload(s)")
+                blocked += 1
+                continue
+            if self.broker and not SessionCache.signed_in(driver):
+                # signed-out results look like any others: refresh the session for every worker, reload once
+                if refreshed:
+                    raise RuntimeError(f"page {page} is still signed out after signing in again")
+                print(f"🔑 Search worker signed out on page {page}; signing in again for every worker...")
+                self.broker.expired(driver)
+                refreshed = True
+                continue
+            return parse_search_results(html, base_url=url)
+
+    def run(self, query, pages):
+        """Fetch ``pages`` (an iterable of page numbers) and return merged records."""
+        return merge_pages(self.fetch(query, pages))
+
+    def fetch(self, query, pages):
+        """Fetch ``pages`` concurrently and return ``{page: [records]}``."""
+        by_page = {}
+        for page, records, _ in self.iter_pages(query, pages):
+            by_page[page] = records
+            if self.on_page:
+                self.on_page(page, records)
+        return by_page
+
+    def iter_pages(self, query, pages):
+        """Yield ``(page, records, error)`` for ``pages`` in completion order.
+
+        Closing the generator early (or breaking out of a loop over it)
+        cancels the pages no worker has started yet; workers finish the page
+        in hand, then quit their browsers in the background.
+        """
+        pages = list(pages)
+        pages_q = queue.Queue()
+        results_q = queue.Queue()
+        for page in pages:
+            pages_q.put((query, page))
+        n_workers = min(self.workers, len(pages)) or 1
+        for _ in range(n_workers):
+            pages_q.put(_STOP)
+
+        self._alive = n_workers
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(pages_q, results_q), daemon=True)
+                   for _ in range(n_workers)]
+        for t in threads:
+            t.start()
+
+        errors = {}
+        done = records_total = 0
+        try:
+            for _ in pages:
+                page, records, err = results_q.get()
+                done += 1
+                records_total += len(records)
+                if err is not None:
+                    errors[page] = err
+                yield page, records, err
+        finally:
+            cancelled = 0
+            if done < len(pages):
+                # drop everything still queued and let each worker stop after its current page
+                while True:
+                    try:
+                        item = pages_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    cancelled += item is not _STOP
+                for _ in range(n_workers):
+                    pages_q.put(_STOP)
+            else:
+                for t in threads:
+                    t.join()
+            elapsed = time.perf_counter() - t0
+            self.stats = {
+                "workers": n_workers,
+                "pages": done,
+                "cancelled": cancelled,
+                "errors": errors,
+                "records": records_total,
+                "elapsed": elapsed,
+                "pages_per_sec": done / elapsed if elapsed else 0.0,
+            }
@@ -0,0 +1,172 @@
+"""Columnar filtering and ranking of parsed search results.
+
+Multi-page sweeps produce thousands of records. :class:`ResultTable` holds
+them as NumPy columns (price, rating, review count, listing order) with an
+ASIN index, so the PRICE_MIN / PRICE_MAX / MIN_RATING filters, ASIN
+de-duplication and scoring are single vectorized expressions, and
+:meth:`ResultTable.top_k` returns the best ``k`` without sorting everything.
+
+Building the columns costs about as much as ranking the dicts directly, so
+the table only pays off when it is queried several times (re-filtering or
+re-ranking one result set). :func:`rank_products`, which ranks a result set
+once, works on the dicts: per benchmarks/bench_ranking.py that is faster at
+every size from one page to millions of records.
+
+Missing numbers are NaN: a record without a price fails any price filter and
+a record without a rating fails MIN_RATING, like ``extraction.matches_filters``.
+"""
+import math
+
+import numpy as np
+
+from extraction import matches_filters
+
+# Bayesian prior for ratings: a product with few reviews is pulled towards this
+# rating as if it had PRIOR_REVIEWS extra reviews at PRIOR_RATING.
+PRIOR_RATING = 3.5
+PRIOR_REVIEWS = 50
+
+
+def _adjusted_rating(t):
+    reviews = np.nan_to_num(t.reviews, nan=0.0)
+    rating = np.nan_to_num(t.rating, nan=PRIOR_RATING)
+    return (rating * reviews + PRIOR_RATING * PRIOR_REVIEWS) / (reviews + PRIOR_REVIEWS)
+
+
+def score_value(t):
+    """Review-adjusted rating per order of magnitude of price (rating-weighted price)."""
+    return _adjusted_rating(t) / np.log10(t.price + 10)
+
+
+def score_rating(t):
+    """Review-adjusted rating."""
+    return _adjusted_rating(t)
+
+
+def score_cheapest(t):
+    return -t.price
+
+
+def score_page_order(t):
+    """Keep the order the site listed the results in."""
+    return -t.order.astype(float)
+
+
+SCORERS = {
+    "value": score_value,
+    "rating": score_rating,
+    "cheapest": score_cheapest,
+    "page": score_page_order,
+}
+
+
+class ResultTable:
+    """Typed columns over a list of record dicts, de-duplicated by ASIN (first wins).
+
+    ``index`` maps ASIN to row; ``records`` holds the kept dicts in row order.
+    """
+
+    def __init__(self, records):
+        # ASIN -> first record, in listing order
+        self.index = {}
+        for r in records:
+            self.index.setdefault(r.get("asin") or "", r)
+        self.records = list(self.index.values())
+        for i, asin in enumerate(self.index):
+            self.index[asin] = i
+        # one pass over the dicts; None becomes NaN in a float array
+        cols = np.array([(r.get("price_num"), r.get("rating_num"), r.get("reviews_num")) for r in self.records],
+                        dtype=float).reshape(-1, 3)
+        self.price, self.rating, self.reviews = cols[:, 0], cols[:, 1], cols[:, 2]
+        self.order = np.arange(len(self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def mask(self, price_min=None, price_max=None, min_rating=None):
+        """Boolean array of rows passing the filters (NaN never passes a set bound)."""
+        m = np.ones(len(self), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            if price_min is not None:
+                m &= self.price >= price_min
+            if price_max is not None:
+                m &= self.price <= price_max
+            if min_rating is not None:
+                m &= self.rating >= min_rating
+        return m
+
+    def top_k(self, k=None, score="value", price_min=None, price_max=None, min_rating=None):
+        """Row indices of the ``k`` best-scoring rows passing the filters, best first.
+
+        ``score`` is a name from :data:`SCORERS` or a callable taking the
+        table and returning one float per row (higher is better). NaN scores
+        rank last; equal scores keep listing order, so the result is the first
+        ``k`` rows of a stable sort by score.
+        """
+        scorer = SCORERS[score] if isinstance(score, str) else score
+        rows = np.flatnonzero(self.mask(price_min, price_max, min_rating))
+        if k is not None and k <= 0:
+            rows = rows[:0]
+        if rows.size == 0:
+            return rows
+        scores = np.asarray(scorer(self), dtype=float)[rows]
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        if k is not None and k < rows.size:
+            # partial selection first: O(n) instead of sorting every row. Of the rows tied
+            # with the k-th best score, the first listed ones are kept, as a stable sort would.
+            kth = -np.partition(-scores, k - 1)[k - 1]
+            better = np.flatnonzero(scores > kth)
+            keep = np.concatenate([better, np.flatnonzero(scores == kth)[:k - better.size]])
+            rows, scores = rows[keep], scores[keep]
+        return rows[np.lexsort((rows, -scores))]
+
+    def take(self, rows):
+        return [self.records[i] for i in rows]
+
+
+# The SCORERS for one record dict; a missing score is -inf (ranks last, as NaN does in a table)
+def _record_adjusted_rating(r):
+    reviews = r.get("reviews_num") or 0
+    rating = r.get("rating_num")
+    rating = PRIOR_RATING if rating is None else rating
+    return (rating * reviews + PRIOR_RATING * PRIOR_REVIEWS) / (reviews + PRIOR_REVIEWS)
+
+
+def _record_value(r):
+    price = r.get("price_num")
+    return -math.inf if price is None else _record_adjusted_rating(r) / math.log10(price + 10)
+
+
+def _record_cheapest(r):
+    price = r.get("price_num")
+    return -math.inf if price is None else -price
+
+
+RECORD_SCORERS = {
+    "value": _record_value,
+    "rating": _record_adjusted_rating,
+    "cheapest": _record_cheapest,
+    "page": None,
+}
+
+
+def rank_products(records, k=None, score="value", price_min=None, price_max=None, min_rating=None):
+    """Filter, de-duplicate and rank ``records``; returns up to ``k`` records, best first.
+
+    Gives the same result as ``ResultTable(records).top_k(...)``. A callable
+    ``score`` (which takes a table) goes through :class:`ResultTable`.
+    """
+    if callable(score):
+        table = ResultTable(records)
+        return table.take(table.top_k(k, score, price_min, price_max, min_rating))
+    scorer = RECORD_SCORERS[score]
+    first = {}
+    for r in records:
+        first.setdefault(r.get("asin") or "", r)
+    kept = [r for r in first.values() if matches_filters(r, price_min, price_max, min_rating)]
+    if scorer is not None:
+        # stable: equal scores keep listing order
+        kept.sort(key=scorer, reverse=True)
+    if k is not None:
+        kept = kept[:max(k, 0)]
+    return kept
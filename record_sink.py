@@ -0,0 +1,48 @@
+"""Append parsed search results to a JSONL file as they stream past.
+
+The extraction stages hand every record to :meth:`RecordSink.tap` on its way
+to the filter, so each one is on disk as soon as it is parsed and nothing has
+to be kept around for a dump at the end. Several threads (batch sessions) may
+share one sink; lines are written whole and flushed one at a time.
+"""
+import json
+import threading
+import time
+
+
+class RecordSink:
+    """JSONL writer for result records. With an empty ``path`` it only counts."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def write(self, record, **fields):
+        """Append one record; ``fields`` (query, page, ...) are added to the line."""
+        with self._lock:
+            self.count += 1
+            if self._file is None:
+                return
+            line = dict(record, seen_at=round(time.time(), 3), **fields)
+            self._file.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def tap(self, records, **fields):
+        """Yield ``records`` unchanged, writing each one first."""
+        for rec in records:
+            self.write(rec, **fields)
+            yield rec
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,126 @@
+"""Adaptive ordering of fallback selectors, persisted between runs.
+
+The agent locates the add-to-cart and Proceed-to-Buy controls by trying a
+list of candidate locators. A :class:`SelectorRegistry` counts hits, misses
+and time spent per (page type, selector) and returns the candidates ordered by
+observed success, so once the layout for a locale is known the selector that
+works is tried first and ones that never match sink to the end of the list.
+
+Counts are saved as JSON. Each save re-reads the file under a lock and adds
+only this process's new counts, so concurrent runs do not overwrite each
+other. Within a process one registry can be shared by several threads.
+"""
+import json
+import os
+import threading
+
+from session_cache import FileLock
+
+# Counts are halved once a selector has this many trials, so a layout change
+# is picked up after a few runs instead of being outvoted by old history.
+_MAX_TRIALS = 50
+
+
+def selector_key(by, value):
+    return f"{by}={value}"
+
+
+class SelectorRegistry:
+    """Hit/miss/latency statistics per page type and selector.
+
+    ``path`` is the JSON file to persist to; None keeps the statistics in
+    memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = FileLock(path + ".lock") if path else None
+        # guards stats / _delta against the other threads of this process
+        self._mutex = threading.Lock()
+        self.stats = {}    # page -> key -> {"hits", "misses", "ms"}
+        self._delta = {}   # same shape, counts recorded since the last save
+        if path:
+            self.stats = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("pages", {})
+        except Exception:
+            return {}
+
+    @staticmethod
+    def _add(table, page, key, hits, misses, ms, decay=True):
+        entry = table.setdefault(page, {}).setdefault(key, {"hits": 0, "misses": 0, "ms": 0.0})
+        entry["hits"] += hits
+        entry["misses"] += misses
+        entry["ms"] += ms
+        if decay and entry["hits"] + entry["misses"] > _MAX_TRIALS:
+            for k in entry:
+                entry[k] /= 2
+
+    def score(self, page, key):
+        """Estimated success rate: (hits + 1) / (trials + 2), 0.5 for an untried selector."""
+        entry = self.stats.get(page, {}).get(key)
+        if not entry:
+            return 0.5
+        return (entry["hits"] + 1) / (entry["hits"] + entry["misses"] + 2)
+
+    def mean_ms(self, page, key):
+        entry = self.stats.get(page, {}).get(key)
+        trials = entry and entry["hits"] + entry["misses"]
+        return entry["ms"] / trials if trials else 0.0
+
+    def rank(self, page, candidates, key=None, tier=None):
+        """Return ``candidates`` best first: by success rate, then mean time, then given order.
+
+        ``key(candidate)`` gives the selector's identity (default: its first
+        two items, e.g. a ``(By.ID, "add-to-cart-button")`` locator).
+        ``tier(candidate)`` gives its precedence tier (default: all in tier 0).
+        Candidates are only reordered within their tier, so a generic fallback
+        that matches almost anything never climbs above specific selectors.
+        """
+        key = key or (lambda c: selector_key(c[0], c[1]))
+        tier = tier or (lambda c: 0)
+        ranked = sorted(enumerate(candidates), key=lambda ic: (tier(ic[1]), -self.score(page, key(ic[1])),
+                                                               self.mean_ms(page, key(ic[1])), ic[0]))
+        return [c for _, c in ranked]
+
+    def record(self, page, key, hit, seconds):
+        """Count one attempt of selector ``key`` on ``page`` type."""
+        args = (page, key, 1 if hit else 0, 0 if hit else 1, seconds * 1000)
+        with self._mutex:
+            self._add(self.stats, *args)
+            self._add(self._delta, *args, decay=False)
+
+    @classmethod
+    def _merge(cls, table, delta, decay=True):
+        for page, entries in delta.items():
+            for key, e in entries.items():
+                cls._add(table, page, key, e["hits"], e["misses"], e["ms"], decay=decay)
+
+    def save(self):
+        """Merge this process's new counts into the file (no-op without a path)."""
+        if not self.path:
+            return
+        # counts recorded from here on go to a fresh delta and are saved next time
+        with self._mutex:
+            delta, self._delta = self._delta, {}
+        if not delta:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with self.lock:
+                merged = self._read()
+                self._merge(merged, delta)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"version": 1, "pages": merged}, f, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+        except BaseException:
+            with self._mutex:
+                self._merge(self._delta, delta, decay=False)
+            raise
+        with self._mutex:
+            # the file's counts plus the ones other threads recorded while it was written
+            self._merge(merged, self._delta)
+            self.stats = merged
@@ -0,0 +1,168 @@
+"""Sign in once, hand the session to every browser.
+
+Running the ``/ap/signin`` flow in each of several Chrome sessions multiplies
+the login time and the CAPTCHA risk by the number of sessions. A
+:class:`SessionBroker` runs it once, keeps the resulting cookies and
+localStorage (``SessionCache.export_state``) and injects them into each new
+browser before its first navigation. On Chrome the cookies are set with
+DevTools' ``Network.setCookies`` and the storage with a script that runs
+before any page script, so no page load is needed at all (other drivers
+fall back to ``SessionCache.apply_state``, which loads the home page).
+
+Every injected browser remembers the version of the state it got. When one
+of them finds the session signed out it calls :meth:`SessionBroker.expired`.
+That worker signs in again, unless another already did, and every other
+browser picks the new state up at its next :meth:`SessionBroker.sync`::
+
+    broker = SessionBroker(base_url, login=lambda d: sign_in(d, config), cache=SessionCache(path))
+    broker.attach(driver)            # first one signs in, the others are injected
+    ...
+    broker.sync(driver)              # before each job: re-inject if the state was refreshed
+    if not SessionCache.signed_in(driver):
+        broker.expired(driver)
+
+With a ``cache`` the state also outlives the process, and other processes
+start from it.
+"""
+import json
+import threading
+from urllib.parse import urlsplit
+
+from backend import Backend
+from session_cache import SessionCache
+
+# Runs before any script of every new document: fills in the saved localStorage on its origin
+_STORAGE_SCRIPT = """
+(function (origin, items) {
+  if (location.origin !== origin) return;
+  for (var k in items) {
+    try { if (window.localStorage.getItem(k) === null) window.localStorage.setItem(k, items[k]); } catch (e) {}
+  }
+})(%s, %s);
+"""
+
+
+def _cdp_cookie(cookie, base_url):
+    """A WebDriver cookie dict as DevTools' ``Network.CookieParam``."""
+    out = {"name": cookie["name"], "value": cookie["value"], "path": cookie.get("path", "/")}
+    if cookie.get("domain"):
+        out["domain"] = cookie["domain"]
+    else:
+        out["url"] = base_url
+    for key in ("secure", "httpOnly", "sameSite"):
+        if key in cookie:
+            out[key] = cookie[key]
+    # WebDriver says "expiry", DevTools "expires" (-1 for session cookies)
+    expires = cookie.get("expiry", cookie.get("expires"))
+    if expires is not None and expires > 0:
+        out["expires"] = expires
+    return out
+
+
+def export_state(driver):
+    """Cookies and localStorage of the page open in ``driver`` (a WebDriver or a Backend)."""
+    if isinstance(driver, Backend):
+        return {"url": driver.url, "cookies": driver.cookies(), "local_storage": {}}
+    return SessionCache.export_state(driver)
+
+
+def inject(driver, state, base_url):
+    """Put ``state`` (cookies, local_storage) into ``driver`` without loading a page where possible.
+
+    Returns True if no navigation was needed.
+    """
+    cookies = [_cdp_cookie(c, base_url) for c in state.get("cookies", [])]
+    if isinstance(driver, Backend):
+        driver.set_cookies(cookies)
+        return True
+    if not hasattr(driver, "execute_cdp_cmd"):
+        SessionCache.apply_state(driver, state, base_url)
+        return False
+    driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+    previous = getattr(driver, "_broker_storage_script", None)
+    if previous:
+        driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": previous})
+        driver._broker_storage_script = None
+    if state.get("local_storage"):
+        parts = urlsplit(state.get("url") or base_url)
+        source = _STORAGE_SCRIPT % (json.dumps(f"{parts.scheme}://{parts.netloc}"), json.dumps(state["local_storage"]))
+        res = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+        driver._broker_storage_script = (res or {}).get("identifier")
+    return True
+
+
+class SessionBroker:
+    """One sign-in shared by every browser of the process (and, through ``cache``, later processes).
+
+    ``login(driver)`` runs the full sign-in flow on ``driver`` and raises if it
+    fails. ``stats`` counts logins, injections and refreshes.
+    """
+
+    def __init__(self, base_url, login, cache=None):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.login = login
+        self.cache = cache
+        self.state = None
+        self.version = 0
+        self.stats = {"logins": 0, "injected": 0, "refreshes": 0}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _sign_in(self, driver):
+        """Run the login on ``driver`` and keep its state (lock held)."""
+        self.login(driver)
+        self.state = export_state(driver)
+        self.version += 1
+        self.stats["logins"] += 1
+        driver._broker_version = self.version
+        if self.cache is not None:
+            try:
+                self.cache.write(self.state)
+            except Exception as e:
+                print(f"⚠️ Could not save session cache: {e}")
+
+    def attach(self, driver):
+        """Sign ``driver`` in: inject the current state, or (the first time) log in on it.
+
+        Workers attaching while the one login runs wait for it instead of
+        signing in themselves. Returns "login" or "injected".
+        """
+        with self._lock:
+            if self.state is None and not self._loaded and self.cache is not None:
+                self._loaded = True
+                cached = self.cache.load()
+                if cached:
+                    self.state, self.version = cached, self.version + 1
+            if self.state is None:
+                self._sign_in(driver)
+                return "login"
+            state, version = self.state, self.version
+            self.stats["injected"] += 1
+        inject(driver, state, self.base_url)
+        driver._broker_version = version
+        return "injected"
+
+    def sync(self, driver):
+        """Re-inject ``driver`` if the state was refreshed since it got its copy. Returns True if it was."""
+        if getattr(driver, "_broker_version", None) == self.version:
+            return False
+        self.attach(driver)
+        return True
+
+    def expired(self, driver):
+        """``driver`` found itself signed out: sign in again (once for everyone) and re-inject it.
+
+        If another worker refreshed the state since ``driver`` got it, that
+        state is used; otherwise the login runs on ``driver`` and the other
+        workers pick the result up at their next :meth:`sync`.
+        """
+        with self._lock:
+            if getattr(driver, "_broker_version", None) == self.version:
+                if self.cache is not None:
+                    self.cache.clear()
+                if not isinstance(driver, Backend):
+                    driver.delete_all_cookies()
+                self._sign_in(driver)
+                self.stats["refreshes"] += 1
+                return "login"
+        return self.attach(driver)
@@ -0,0 +1,187 @@
+"""Persist an authenticated Amazon session between runs.
+
+After a successful password login the agent saves the browser's cookies and
+localStorage to a small JSON file. Later runs restore that state, do one cheap
+probe of the home page, and only fall back to the /ap/signin flow when the
+probe says we are signed out. The file carries its own expiry and all reads
+and writes go through a lock file so several processes can share it.
+"""
+import json
+import os
+import tempfile
+import time
+
+# Greeting in the nav bar: "Hello, sign in" when signed out, "Hello, <name>" otherwise
+_PROBE_JS = """
+var el = document.getElementById('nav-link-accountList-nav-line-1')
+      || document.getElementById('nav-link-accountList');
+return {
+  search: !!document.getElementById('twotabsearchtextbox'),
+  greeting: el ? el.textContent.trim() : null
+};
+"""
+
+_DUMP_STORAGE_JS = """
+var out = {};
+for (var i = 0; i < window.localStorage.length; i++) {
+  var k = window.localStorage.key(i);
+  out[k] = window.localStorage.getItem(k);
+}
+return out;
+"""
+
+_LOAD_STORAGE_JS = """
+var items = arguments[0];
+for (var k in items) { try { window.localStorage.setItem(k, items[k]); } catch (e) {} }
+"""
+
+# Cookie fields accepted by WebDriver's add_cookie
+_COOKIE_KEYS = ("name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite")
+
+
+class FileLock:
+    """Minimal cross-process lock based on exclusive creation of a lock file."""
+
+    def __init__(self, path, timeout=30, stale_after=120):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._fd = None
+
+    def acquire(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(self._fd, str(os.getpid()).encode())
+                return
+            except FileExistsError:
+                # a crashed holder must not block everyone forever
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        os.unlink(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() >= deadline:
+                    raise TimeoutError(f"Could not lock {self.path} within {self.timeout}s")
+                time.sleep(0.05)
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SessionCache:
+    """Cookies + localStorage snapshot stored at ``path`` and valid for ``ttl`` seconds."""
+
+    def __init__(self, path, ttl=12 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.lock = FileLock(path + ".lock")
+
+    # --- storage ---
+    def load(self):
+        """Return the cached state dict, or None when missing, unreadable or expired."""
+        with self.lock:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    state = json.load(f)
+            except Exception:
+                return None
+        if time.time() - state.get("saved_at", 0) > self.ttl:
+            return None
+        return state
+
+    def write(self, state):
+        state = dict(state, saved_at=time.time())
+        with self.lock:
+            # mkstemp creates the file readable by this user only, before any cookie is written to it
+            fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".",
+                                       suffix=".tmp", dir=os.path.dirname(self.path) or ".")
+            try:
+                with open(fd, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+    def clear(self):
+        with self.lock:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    # --- browser state ---
+    @staticmethod
+    def export_state(driver):
+        """Capture cookies and localStorage of the page currently open in ``driver``."""
+        try:
+            storage = driver.execute_script(_DUMP_STORAGE_JS) or {}
+        except Exception:
+            storage = {}
+        return {"url": driver.current_url, "cookies": driver.get_cookies(), "local_storage": storage}
+
+    def save(self, driver):
+        self.write(self.export_state(driver))
+
+    @staticmethod
+    def apply_state(driver, state, base_url):
+        """Load ``state`` into ``driver``. Cookies can only be set on a page of the same domain."""
+        driver.get(base_url)
+        for c in state.get("cookies", []):
+            cookie = {k: c[k] for k in _COOKIE_KEYS if k in c}
+            try:
+                driver.add_cookie(cookie)
+            except Exception:
+                continue
+        if state.get("local_storage"):
+            try:
+                driver.execute_script(_LOAD_STORAGE_JS, state["local_storage"])
+            except Exception:
+                pass
+
+    @staticmethod
+    def probe(driver, base_url):
+        """Load the home page once and tell whether it shows a signed-in session."""
+        driver.get(base_url)
+        return SessionCache.signed_in(driver)
+
+    @staticmethod
+    def signed_in(driver):
+        """Whether the page open in ``driver`` shows a signed-in session (one script, no navigation)."""
+        try:
+            info = driver.execute_script(_PROBE_JS) or {}
+        except Exception:
+            return False
+        greeting = (info.get("greeting") or "").lower()
+        return bool(info.get("search")) and bool(greeting) and "sign in" not in greeting
+
+    def restore(self, driver, base_url):
+        """Apply the cached session and verify it. Returns True when signed in."""
+        state = self.load()
+        if not state:
+            return False
+        try:
+            self.apply_state(driver, state, base_url)
+            if self.probe(driver, base_url):
+                return True
+        except Exception:
+            pass
+        # stale or revoked: do not try it again next run
+        self.clear()
+        return False
@@ -0,0 +1,99 @@
+"""Uniform-grid spatial index for mapping points (button centres) to boxes (result cards).
+
+Replaces the O(candidates x products) containment scan and nearest-centre
+fallback of the visual-mapping diagnostic. Boxes are bucketed into square
+cells once; a point lookup only inspects the boxes overlapping its cell, and
+the nearest-centre search walks outward ring by ring and stops as soon as no
+unvisited cell can hold anything closer. Long infinite-scroll pages with
+thousands of nodes stay cheap because every lookup touches a handful of cells.
+"""
+import math
+import statistics
+
+
+class GridIndex:
+    """Index over ``boxes``: a sequence of (left, top, width, height) in one coordinate space.
+
+    Lookups return box indices. Containment ties go to the lowest index, so
+    results match a first-match linear scan over the same list.
+    """
+
+    def __init__(self, boxes, cell_size=None):
+        self.boxes = [tuple(float(v) for v in b) for b in boxes]
+        if cell_size is None:
+            sizes = [max(w, h) for _, _, w, h in self.boxes if w > 0 or h > 0]
+            cell_size = statistics.median(sizes) if sizes else 256.0
+        self.cell = max(float(cell_size), 1.0)
+        self._area_cells = {}    # cell -> indices of boxes overlapping it
+        self._centre_cells = {}  # cell -> indices of boxes whose centre is in it
+        for i, (left, top, w, h) in enumerate(self.boxes):
+            x0, y0 = self._cell_of(left, top)
+            x1, y1 = self._cell_of(left + w, top + h)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self._area_cells.setdefault((cx, cy), []).append(i)
+            self._centre_cells.setdefault(self._cell_of(left + w / 2, top + h / 2), []).append(i)
+        if self._centre_cells:
+            xs = [c[0] for c in self._centre_cells]
+            ys = [c[1] for c in self._centre_cells]
+            self._extent = (min(xs), min(ys), max(xs), max(ys))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _cell_of(self, x, y):
+        return (math.floor(x / self.cell), math.floor(y / self.cell))
+
+    def containing(self, x, y):
+        """Index of the first box containing (x, y) (edges inclusive), or None."""
+        best = None
+        for i in self._area_cells.get(self._cell_of(x, y), ()):
+            left, top, w, h = self.boxes[i]
+            if left <= x <= left + w and top <= y <= top + h and (best is None or i < best):
+                best = i
+        return best
+
+    def nearest(self, x, y):
+        """Index of the box whose centre is closest to (x, y), or None when empty."""
+        if not self._centre_cells:
+            return None
+        px, py = self._cell_of(x, y)
+        min_x, min_y, max_x, max_y = self._extent
+        max_ring = max(abs(px - min_x), abs(px - max_x), abs(py - min_y), abs(py - max_y))
+        outside = max(min_x - px, px - max_x, min_y - py, py - max_y, 0)
+        best, best_d = None, None
+        if outside * outside > len(self.boxes):
+            # point far outside the indexed area: a plain scan is cheaper than walking rings
+            for i, (left, top, w, h) in enumerate(self.boxes):
+                d = (left + w / 2 - x) ** 2 + (top + h / 2 - y) ** 2
+                if best is None or d < best_d:
+                    best, best_d = i, d
+            return best
+        for ring in range(max_ring + 1):
+            # every cell of this ring is at least (ring - 1) * cell away from the point
+            if best is not None and (ring - 1) * self.cell > 0 and ((ring - 1) * self.cell) ** 2 > best_d:
+                break
+            for cell in self._ring(px, py, ring):
+                for i in self._centre_cells.get(cell, ()):
+                    left, top, w, h = self.boxes[i]
+                    d = (left + w / 2 - x) ** 2 + (top + h / 2 - y) ** 2
+                    if best is None or d < best_d or (d == best_d and i < best):
+                        best, best_d = i, d
+        return best
+
+    @staticmethod
+    def _ring(px, py, r):
+        if r == 0:
+            yield (px, py)
+            return
+        for dx in range(-r, r + 1):
+            yield (px + dx, py - r)
+            yield (px + dx, py + r)
+        for dy in range(-r + 1, r):
+            yield (px - r, py + dy)
+            yield (px + r, py + dy)
+
+    def locate(self, x, y):
+        """Containing box if any, else the one with the nearest centre (the diagnostic's rule)."""
+        i = self.containing(x, y)
+        return i if i is not None else self.nearest(x, y)
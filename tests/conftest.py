@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureServer  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def site():
+    with FixtureServer(assets=False) as server:
+        yield server
+
+
+@pytest.fixture
+def config(site):
+    """A Config for the fixture site that writes nothing to disk and never paces or backs off."""
+    import amazon_agent
+
+    return amazon_agent.Config(base_url=site.url, email=site.email, password=site.password, backend="fake",
+                               timeout=2, rate_limit=0, session_cache="", catalog="", selector_stats="",
+                               flight_recorder="", payment_alert=False)
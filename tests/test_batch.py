@@ -0,0 +1,95 @@
+import dataclasses
+import json
+
+import pytest
+
+import amazon_agent
+from batch import BatchRunner, _coerce, load_jobs, make_job
+
+
+@pytest.mark.parametrize("key, value, expected", [
+    ("price_max", "60000", 60000),
+    ("price_max", 60000.0, 60000),
+    ("min_rating", "4", 4.0),
+    ("min_rating", 4, 4.0),
+    ("stream", "Yes", True),
+    ("stream", "0", False),
+    ("add", False, False),
+    ("search_pages", " 3 ", 3),
+    ("rank_by", "cheapest", "cheapest"),
+    ("block_urls", "*.jpg, *ads*", ("*.jpg", "*ads*")),
+    ("block_urls", ["*.png"], ("*.png",)),
+    ("price_min", "", None),
+    ("price_min", None, None),
+    ("not_a_field", "x", "x"),
+])
+def test_coerce(key, value, expected):
+    assert _coerce(key, value) == expected
+    assert type(_coerce(key, value)) is type(expected)
+
+
+@pytest.mark.parametrize("key, value, message", [
+    ("stream", "maybe", "stream='maybe' is not a valid bool (use true/false)"),
+    ("product_tabs", "3.5", "product_tabs='3.5' is not a valid int"),
+    ("price_max", "cheap", "price_max='cheap' is not a valid int"),
+    ("price_max", True, "price_max=True is not a valid int"),
+    ("query", ["laptop"], "query=['laptop'] is not a valid str"),
+])
+def test_coerce_rejects_bad_values(key, value, message):
+    with pytest.raises(ValueError) as e:
+        _coerce(key, value)
+    assert str(e.value) == message
+
+
+def test_make_job():
+    job = make_job({"query": "laptop", " price_max ": "50000", "add": "true", "note": ""}, "7")
+    assert job == {"search_item": "laptop", "price_max": 50000, "add": True, "note": None, "id": "7"}
+    assert make_job({"id": "x1", "query": "bag"}, "2")["id"] == "x1"
+
+
+def test_make_job_errors_name_the_job():
+    with pytest.raises(ValueError, match="job x1: min_rating='high'"):
+        make_job({"id": "x1", "query": "bag", "min_rating": "high"}, "2")
+    with pytest.raises(ValueError, match="job 3 has no query"):
+        make_job({"price_max": "100"}, "3")
+
+
+def test_load_jobs_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "jobs.csv"
+    csv_path.write_text("query,price_max,add\nlaptop,60000,yes\nbackpack,,no\n", encoding="utf-8")
+    assert load_jobs(str(csv_path)) == [
+        {"search_item": "laptop", "price_max": 60000, "add": True, "id": "1"},
+        {"search_item": "backpack", "price_max": None, "add": False, "id": "2"},
+    ]
+    jsonl_path = tmp_path / "jobs.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(j) for j in ({"query": "a", "stream": True},
+                                                             {"query": "b", "stream": "nope"})), encoding="utf-8")
+    with pytest.raises(ValueError, match=r"jobs\.jsonl: job 2: stream='nope'"):
+        load_jobs(str(jsonl_path))
+
+
+def test_stream_jobs_take_the_first_matches_from_the_stream(config, monkeypatch):
+    closed, added = [], []
+
+    def stream_products(driver, config):
+        try:
+            for i in range(100):
+                yield {"asin": f"A{i}", "title": f"item {i}"}
+        finally:
+            closed.append(True)
+
+    def extract(driver, config):
+        raise AssertionError("a stream job must not extract the whole results page")
+
+    monkeypatch.setattr(amazon_agent, "search", lambda driver, config: None)
+    monkeypatch.setattr(amazon_agent, "stream_products", stream_products)
+    monkeypatch.setattr(amazon_agent, "extract", extract)
+    monkeypatch.setattr(amazon_agent, "add_to_cart",
+                        lambda driver, config, records, choices: added.append(choices) or choices[:config.max_products])
+    runner = BatchRunner(dataclasses.replace(config, email="", max_products=2), top=3)
+    result = runner.run_job(None, make_job({"query": "laptop", "stream": "yes", "add": "yes"}, "1"))
+
+    assert closed == [True]
+    assert (result["records"], result["choices"]) == (3, 3)
+    assert [r["asin"] for r in result["top"]] == ["A0", "A1", "A2"]
+    assert [r["asin"] for r in result["added"]] == ["A0", "A1"]
@@ -0,0 +1,60 @@
+import pytest
+
+from catalog import Catalog
+
+HOUR = 3600
+
+
+def page(asins, price=100):
+    return [{"asin": a, "title": f"Product {a}", "url": f"/dp/{a}", "price_num": price, "rating_num": 4.0,
+             "position": i, "add_form": {"action": "/cart/add-to-cart", "fields": {"anti-csrftoken-a2z": "t"}}}
+            for i, a in enumerate(asins)]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    c = Catalog(str(tmp_path / "catalog.sqlite3"), ttl=HOUR)
+    yield c
+    c.close()
+
+
+def test_pages_are_cached_within_the_ttl(catalog):
+    catalog.store_page("Gaming  Laptop", 1, page(["A", "B"]), now=1000)
+    catalog.store_page("gaming laptop", 2, page(["C"]), now=1000)
+    assert catalog.plan("gaming laptop", [1, 2, 3], now=1000 + HOUR) == ([1, 2], [3])
+    assert catalog.plan("gaming laptop", [1, 2, 3], now=1001 + HOUR) == ([], [1, 2, 3])
+
+
+def test_stale_pages_are_served_while_page_1_is_unchanged(catalog):
+    catalog.store_page("q", 1, page("ABCDEFGHIJ"), now=0)
+    catalog.store_page("q", 2, page("KLM"), now=0)
+    later = 2 * HOUR
+    # one sponsored slot rotated: 9 of 11 ASINs shared is above the 0.8 similarity
+    assert catalog.plan("q", [2], first_page_records=page("ABCDEFGHIX"), now=later) == ([2], [])
+    assert catalog.plan("q", [2], first_page_records=page("ABCDEXYZUV"), now=later) == ([], [2])
+    # unchanged, but older than max_age (4 x ttl)
+    assert catalog.plan("q", [2], first_page_records=page("ABCDEFGHIJ"), now=4 * HOUR + 1) == ([], [2])
+
+
+def test_load_page_returns_the_listing_without_session_data(catalog):
+    catalog.store_page("q", 1, page(["A", "B"], price=100), now=0)
+    catalog.store_page("other", 1, page(["B"], price=90), now=10)
+    records = catalog.load_page("q", 1)
+    assert [r["asin"] for r in records] == ["A", "B"]
+    # latest product data, no listing position and no add form (its token belongs to the session that read it)
+    assert records[1]["price_num"] == 90
+    assert "position" not in records[0] and "add_form" not in records[0]
+    assert catalog.load_page("q", 2) is None
+    assert catalog.load_page("unknown", 1) is None
+
+
+def test_price_history_records_changes_only(catalog):
+    for now, price in ((0, 100), (10, 100), (20, 80), (30, 80), (40, 100)):
+        catalog.store_page("q", 1, page(["A"], price=price), now=now)
+    assert [(t, p) for t, p, _ in catalog.history("A")] == [(0, 100), (20, 80), (40, 100)]
+
+
+def test_store_page_reports_listing_changes(catalog):
+    assert catalog.store_page("q", 1, page(["A", "B"]), now=0)
+    assert not catalog.store_page("q", 1, page(["A", "B"], price=5), now=1)
+    assert catalog.store_page("q", 1, page(["B", "A"]), now=2)
@@ -0,0 +1,64 @@
+import pytest
+import requests
+
+from extraction import (is_captcha_page, iter_search_results, matches_filters, parse_cart, parse_price,
+                        parse_rating, parse_search_results)
+from fixture_server import CSRF_TOKEN
+
+
+@pytest.fixture
+def page(site):
+    url = f"{site.url}/s?k=laptop&page=2"
+    return requests.get(url, timeout=5).text, url
+
+
+def test_search_results_match_the_fixture_products(site, page):
+    html, url = page
+    records = parse_search_results(html, base_url=url)
+    expected = site.search("laptop", 2)
+    assert [r["asin"] for r in records] == [p["asin"] for p in expected]
+    for rec, p in zip(records, expected):
+        assert rec["title"] == p["title"]
+        assert (rec["price_num"], rec["rating_num"], rec["reviews_num"]) == (p["price"], p["rating"], p["reviews"])
+        assert rec["url"] == f"{site.url}/dp/{p['asin']}"
+        assert rec["add_form"]["action"].startswith(f"{site.url}/cart/add-to-cart")
+        assert rec["add_form"]["fields"]["anti-csrftoken-a2z"] == CSRF_TOKEN
+        assert rec["add_form"]["fields"]["items[0.base][asin]"] == p["asin"]
+
+
+def test_incremental_parse_matches_the_whole_page(page):
+    html, url = page
+    assert list(iter_search_results(html, base_url=url, chunk_size=1000)) == parse_search_results(html, base_url=url)
+
+
+def test_cart_lines_match_the_fixture_cart(site):
+    session = site.new_session()
+    for asin, qty in (("B0000000A1", 2), ("B0000000B2", 1)):
+        site.add_to_cart(session["value"], asin, qty)
+    html = requests.get(f"{site.url}/gp/cart/view.html", cookies={session["name"]: session["value"]}, timeout=5).text
+    assert parse_cart(html) == [
+        {"asin": "B0000000A1", "quantity": 2, "price_num": site.product("B0000000A1")["price"]},
+        {"asin": "B0000000B2", "quantity": 1, "price_num": site.product("B0000000B2")["price"]},
+    ]
+
+
+def test_cart_leaves_out_saved_for_later():
+    html = """<div id="sc-active-cart">
+      <div class="sc-list-item" data-asin="A1" data-quantity="3" data-price="1,299.00"><img></div>
+    </div>
+    <div id="sc-saved-cart"><div class="sc-list-item" data-asin="S1" data-quantity="1"></div></div>"""
+    assert parse_cart(html) == [{"asin": "A1", "quantity": 3, "price_num": 1299}]
+
+
+@pytest.mark.parametrize("text, expected", [("₹16,199", 16199), ("1,299.50", 1299.5), ("", None), (None, None)])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_filters_and_captcha():
+    rec = {"price_num": 500, "rating_num": parse_rating("4.2 out of 5 stars")}
+    assert matches_filters(rec, price_min=100, price_max=500, min_rating=4.2)
+    assert not matches_filters(rec, min_rating=4.3)
+    assert not matches_filters({"price_num": None}, price_max=1000)
+    assert is_captcha_page("", "https://www.amazon.in/errors/validateCaptcha?x=1")
+    assert not is_captcha_page("<html>results</html>", "https://www.amazon.in/s?k=laptop")
@@ -0,0 +1,118 @@
+import pytest
+
+import flow
+from amazon_agent import LoginError
+from backend import Backend
+from fake_backend import FakeBackend, parse_document, select
+from selector_registry import SelectorRegistry
+
+DOC = """<html><body>
+<div id="main" class="box wide" data-asin="B01">
+  <p class="x">one <b>bold</b></p>
+  <span><a href="/p/1" class="x">link</a></span>
+</div>
+<div class="box" data-asin=""><input name="q" value="v"></div>
+</body></html>"""
+
+
+def ids(nodes):
+    return [n.attrs.get("id") or n.attrs.get("href") or n.tag for n in nodes]
+
+
+@pytest.mark.parametrize("selector, expected", [
+    ("#main", ["main"]),
+    ("div.box", ["main", "div"]),
+    (".box.wide", ["main"]),
+    ("div[data-asin='B01']", ["main"]),
+    ("div[data-asin^='B']", ["main"]),
+    ("[data-asin]", ["main", "div"]),
+    ("#main a", ["/p/1"]),
+    ("#main > a", []),
+    ("div > span > a.x", ["/p/1"]),
+    ("p.x, input[name=q]", ["p", "input"]),
+    ("div[class~=wide]", ["main"]),
+    ("a[href$='/1'], a[href*=nothing]", ["/p/1"]),
+])
+def test_selectors(selector, expected):
+    assert ids(select(parse_document(DOC), selector)) == expected
+
+
+def test_text_and_attributes_resolve_against_the_page_url():
+    b = FakeBackend({"http://shop.test/list": DOC}, fetch=False)
+    b.navigate("http://shop.test/list")
+    assert b.text(b.query("p.x")) == "one bold"
+    assert b.attribute(b.query("a"), "href") == "http://shop.test/p/1"
+    assert b.find_text("div, a", ("link",)) is b.query("#main")
+    assert b.find_text("a", ("missing",)) is None
+
+
+def test_links_and_forms_navigate_through_the_fixtures():
+    pages = {
+        "/": "<a id='go' href='/form'>go</a>",
+        "/form": "<form action='/search'><input name='k'><select name='s'><option value='a'>"
+                 "<option value='b' selected></select><input type='checkbox' name='c'>"
+                 "<button name='btn' value='1'>Go</button></form>",
+        "/search?k=laptop&s=b&btn=1": "<h1 id='done'>results</h1>",
+    }
+    b = FakeBackend(pages, fetch=False)
+    b.navigate("http://shop.test/")
+    b.click(b.query("#go"))
+    assert b.url == "http://shop.test/form"
+    b.type(b.query("input[name=k]"), "laptop", submit=True)
+    assert b.query("#done") is not None
+    assert b.wait_for(["#nope", "#done"], timeout=0)[0] == 1
+
+
+def test_unknown_pages_are_404_without_fetching():
+    b = FakeBackend(fetch=False)
+    b.navigate("http://shop.test/missing")
+    assert b.status == 404
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        Backend()
+
+    class Partial(Backend):
+        def navigate(self, url):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_run_flow_against_the_fixture_site(site, config):
+    with FakeBackend(timeout=config.timeout) as b:
+        summary = flow.run_flow(b, config)
+        session = next(c.value for c in b.session.cookies if c.name == "session-id")
+    assert summary["records"] == 24
+    assert len(summary["added"]) == config.max_products
+    assert summary["checkout"] is True
+    assert sum(site.carts[session].values()) == config.max_products
+
+
+def test_login_with_a_wrong_password_raises(config):
+    config.password = "wrong"
+    with FakeBackend(timeout=config.timeout) as b, pytest.raises(LoginError, match="wrong credentials"):
+        flow.login(b, config)
+
+
+def test_search_without_results_times_out(config):
+    pages = {"/": "<input id='twotabsearchtextbox' name='k'>"}
+    with pytest.raises(TimeoutError):
+        flow.search(FakeBackend(pages, fetch=False), config, "laptop")
+
+
+def test_checkout_falls_back_to_a_proceed_link_and_records_the_race(config):
+    pages = {
+        "/gp/cart/view.html": "<a href='/gp/buy/spc'>Proceed to Buy</a>",
+        "/gp/buy/spc": "<form id='shippingOptionFormId'></form>",
+    }
+    b = FakeBackend(pages, fetch=False)
+    b.navigate(config.base_url + "/gp/cart/view.html")
+    registry = SelectorRegistry()
+    assert flow.checkout(b, config, registry) is True
+    # no CSS selector won: every one of them was tried and missed
+    stats = registry.stats["cart"]
+    assert len(stats) == len(flow.PROCEED)
+    assert all(e["hits"] == 0 and e["misses"] == 1 for e in stats.values())
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from governor import Governor, TokenBucket, classify
+
+
+@pytest.fixture
+def gov():
+    # short back-offs and a fast ramp, so recovery takes a few calls
+    return Governor(max_rate=2.0, min_rate=0.1, max_concurrency=4, step=0.5, backoff=0.02, max_backoff=0.05)
+
+
+def test_a_blocked_page_halves_rate_and_concurrency(gov):
+    delay = gov.throttled("captcha")
+    assert 0.01 <= delay <= 0.02
+    assert gov.bucket.rate == 1.0 and gov.limit == 2
+    assert gov.ceiling == pytest.approx(1.8)
+    assert gov.stats["captcha"] == 1 and gov.stats["backoffs"] == 1
+    # sessions reporting the same episode do not cut again
+    assert gov.throttled("captcha") == 0.0
+    assert gov.bucket.rate == 1.0 and gov.limit == 2 and gov.stats["backoffs"] == 1
+
+
+def test_back_off_grows_per_episode_and_is_capped(gov):
+    delays = []
+    for _ in range(4):
+        delays.append(gov.throttled())
+        time.sleep(delays[-1] + 0.005)
+    assert 0.01 <= delays[0] <= 0.02 and 0.02 <= delays[1] <= 0.04
+    assert all(d <= 0.05 for d in delays)
+    assert gov.bucket.rate == pytest.approx(0.125)  # 2 halved four times, above min_rate
+
+
+def test_rate_never_drops_below_min_rate(gov):
+    for _ in range(8):
+        gov.throttled()
+        time.sleep(0.06)
+    assert gov.bucket.rate == 0.1 and gov.limit == 1
+
+
+def test_normal_pages_ramp_back_up(gov):
+    gov.throttled()
+    time.sleep(0.03)
+    rates = []
+    for _ in range(200):
+        gov.success()
+        rates.append(gov.bucket.rate)
+    assert rates == sorted(rates)
+    assert rates[-1] == pytest.approx(2.0) and max(rates) <= 2.0
+    assert gov.limit == 4
+
+
+def test_the_ceiling_holds_the_rate_below_where_it_was_blocked(gov):
+    gov.throttled()
+    gov.success()
+    assert gov.bucket.rate <= gov.ceiling < 2.0
+
+
+def test_observe_classifies_pages(gov):
+    assert gov.observe("<html>results</html>", "https://www.amazon.in/s?k=x") == "ok"
+    assert gov.stats["ok"] == 1
+    assert gov.observe("", "https://www.amazon.in/s", status=503) == "throttled"
+    assert classify('<input id="captchacharacters">') == "captcha"
+
+
+def test_token_bucket_spaces_loads_and_honours_pauses():
+    bucket = TokenBucket(50, burst=1)
+    t0 = time.monotonic()
+    for _ in range(6):
+        assert bucket.acquire()
+    assert time.monotonic() - t0 >= 0.09
+    assert bucket.pause(0.2)
+    assert not bucket.pause(0.1)  # already paused
+    assert not bucket.acquire(timeout=0.05)
+
+
+def test_shared_bucket_state(tmp_path):
+    path = str(tmp_path / "rate.json")
+    first, second = TokenBucket(4, burst=1, path=path), TokenBucket(4, burst=1, path=path)
+    first.adjust(lambda rate: rate / 2)
+    assert second.rate == 2
+    assert first.acquire(timeout=0)
+    # the token the first process took is gone for the second one too
+    assert not second.acquire(timeout=0)
@@ -0,0 +1,52 @@
+import pytest
+import requests
+
+from extraction import parse_search_results
+from http_cart import HttpCart
+
+
+@pytest.fixture
+def results(site):
+    url = f"{site.url}/s?k=laptop"
+    return parse_search_results(requests.get(url, timeout=5).text, base_url=url)
+
+
+@pytest.fixture
+def cart(site):
+    session = site.new_session()
+    client = HttpCart(cookies=[session])
+    yield client, session["value"]
+    client.close()
+
+
+def test_add_is_confirmed_by_the_added_page(site, results, cart):
+    client, sid = cart
+    record = next(r for r in results if r["add_form"])
+    result = client.add(record)
+    assert result["ok"], result
+    assert record["asin"] in site.carts[sid]
+
+
+def test_rejected_form_is_not_added(site, results, cart):
+    client, sid = cart
+    record = next(r for r in results if r["add_form"])
+    fields = dict(record["add_form"]["fields"], **{"anti-csrftoken-a2z": "stale"})
+    result = client.add(dict(record, add_form=dict(record["add_form"], fields=fields)))
+    assert not result["ok"] and result["error"] == "HTTP 403"
+    assert sid not in site.carts
+
+
+def test_success_status_without_confirmation_is_not_added(site, results, cart, monkeypatch):
+    client, _ = cart
+    # the add ends on a 200 page that is not the confirmation (here: the home page)
+    monkeypatch.setattr(client.session, "post", lambda url, **kwargs: requests.get(f"{site.url}/", timeout=5))
+    result = client.add(next(r for r in results if r["add_form"]))
+    assert result["status"] == 200 and not result["ok"]
+    assert result["error"] == "no add-to-cart confirmation in the response"
+
+
+def test_signed_out_add_is_not_added(results):
+    client = HttpCart()
+    result = client.add(next(r for r in results if r["add_form"]))
+    client.close()
+    assert not result["ok"] and result["error"] == "signed out"
@@ -0,0 +1,80 @@
+import threading
+
+import requests
+
+from fake_backend import parse_document, select
+from parallel_search import ParallelSearch
+from session_broker import SessionBroker
+
+
+class RequestsDriver:
+    """Just enough of a WebDriver for ParallelSearch and SessionBroker, over plain HTTP."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.page_source, self.current_url = "", ""
+
+    def get(self, url):
+        resp = self.session.get(url, timeout=5)
+        self.page_source, self.current_url = resp.text, resp.url
+
+    def find_element(self, by, value):
+        raise LookupError("no element lookups here")  # the results wait gives up and parses the page
+
+    def execute_script(self, script, *args):
+        if "nav-link-accountList" not in script:
+            return {}
+        root = parse_document(self.page_source)
+        greeting = select(root, "#nav-link-accountList-nav-line-1")
+        return {"search": bool(select(root, "#twotabsearchtextbox")),
+                "greeting": greeting[0].text().strip() if greeting else None}
+
+    def get_cookies(self):
+        return [{"name": c.name, "value": c.value, "path": c.path} for c in self.session.cookies]
+
+    def add_cookie(self, cookie):
+        self.session.cookies.set(cookie["name"], cookie["value"], path=cookie.get("path", "/"))
+
+    def delete_all_cookies(self):
+        self.session.cookies.clear()
+
+    def quit(self):
+        self.session.close()
+
+
+def test_a_signed_out_worker_refreshes_the_session_for_every_worker(site):
+    logins = []
+
+    def login(driver):
+        session = site.new_session()
+        if not logins:
+            # the first sign-in expires before any results page is loaded
+            site.sessions.discard(session["value"])
+        logins.append(session["value"])
+        driver.add_cookie(session)
+
+    broker = SessionBroker(site.url, login=login)
+    pages = list(range(1, 6))
+    seen = {}
+    lock = threading.Lock()
+
+    def factory():
+        driver = RequestsDriver()
+        original = driver.get
+
+        def get(url):
+            original(url)
+            if "/s?" in url:
+                with lock:
+                    seen.setdefault(url, []).append(driver.session.cookies.get("session-id"))
+        driver.get = get
+        return driver
+
+    pool = ParallelSearch(site.url, workers=2, driver_factory=factory, timeout=0.1, broker=broker)
+    by_page = {page: (records, err) for page, records, err in pool.iter_pages("laptop", pages)}
+
+    assert all(err is None and len(records) == site.results_per_page for records, err in by_page.values())
+    assert broker.stats["logins"] == 2 and broker.stats["refreshes"] == 1
+    # after the refresh every results page was loaded with the new session only
+    final = [sids[-1] for sids in seen.values()]
+    assert set(final) == {logins[1]}
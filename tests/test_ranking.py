@@ -0,0 +1,71 @@
+import math
+import random
+
+import pytest
+
+from extraction import matches_filters
+from ranking import PRIOR_RATING, PRIOR_REVIEWS, ResultTable, rank_products
+
+
+def py_score(rec, score):
+    price, rating, reviews = rec.get("price_num"), rec.get("rating_num"), rec.get("reviews_num")
+    adjusted = ((rating if rating is not None else PRIOR_RATING) * (reviews or 0) + PRIOR_RATING * PRIOR_REVIEWS) \
+        / ((reviews or 0) + PRIOR_REVIEWS)
+    value = {
+        "value": adjusted / math.log10(price + 10) if price is not None else None,
+        "rating": adjusted,
+        "cheapest": -price if price is not None else None,
+    }[score]
+    return -math.inf if value is None else value
+
+
+def py_rank(records, k, score, **filters):
+    """The reference: de-duplicate (first ASIN wins), filter, then a full stable sort."""
+    seen, rows = set(), []
+    for rec in records:
+        if rec.get("asin") not in seen:
+            seen.add(rec.get("asin"))
+            rows.append(rec)
+    rows = [r for r in rows if matches_filters(r, **filters)]
+    return sorted(rows, key=lambda r: -py_score(r, score))[:k]
+
+
+@pytest.fixture
+def records():
+    rng = random.Random(5)
+    out = []
+    for i in range(3000):
+        out.append({
+            # about one in ten ASINs is listed twice (sponsored slots)
+            "asin": f"B{rng.randrange(2700):05d}",
+            "price_num": rng.choice([None, rng.randrange(100, 90000), rng.randrange(100, 300)]),
+            "rating_num": rng.choice([None, round(rng.uniform(1, 5), 1)]),
+            "reviews_num": rng.choice([None, 0, rng.randrange(20000)]),
+            "n": i,
+        })
+    return out
+
+
+@pytest.mark.parametrize("score", ["value", "rating", "cheapest"])
+@pytest.mark.parametrize("k", [1, 10, 250, None])
+def test_top_k_matches_a_full_sort(records, score, k):
+    filters = {"price_min": 500, "price_max": 60000, "min_rating": 3.0} if k == 10 else {}
+    expected = [r["n"] for r in py_rank(records, k, score, **filters)]
+    table = ResultTable(records)
+    assert [r["n"] for r in table.take(table.top_k(k, score, **filters))] == expected
+    assert [r["n"] for r in rank_products(records, k=k, score=score, **filters)] == expected
+
+
+def test_callable_scores_rank_on_the_table(records):
+    cheapest_first = rank_products(records, k=5, score=lambda t: -t.price)
+    assert [r["n"] for r in cheapest_first] == [r["n"] for r in py_rank(records, 5, "cheapest")]
+
+
+def test_page_order_and_empty_selection(records):
+    listed = py_rank(records, None, "rating")  # any score: only the de-duplicated rows are used here
+    first_seen = sorted(listed, key=lambda r: r["n"])
+    assert [r["n"] for r in rank_products(records, k=20, score="page")] == [r["n"] for r in first_seen[:20]]
+    table = ResultTable(records)
+    assert [r["n"] for r in table.take(table.top_k(20, "page"))] == [r["n"] for r in first_seen[:20]]
+    assert rank_products(records, k=0) == [] and table.top_k(0).size == 0
+    assert rank_products(records, price_min=10 ** 9) == []
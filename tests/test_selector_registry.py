@@ -0,0 +1,99 @@
+import json
+import threading
+
+from selector_registry import SelectorRegistry, selector_key
+
+CANDIDATES = [("css selector", "#add-to-cart-button"), ("name", "submit.add-to-cart"),
+              ("xpath", "//button[contains(., 'Add to Cart')]")]
+
+
+def key(c):
+    return selector_key(*c)
+
+
+def test_untried_selectors_keep_their_order():
+    registry = SelectorRegistry()
+    assert registry.score("product", key(CANDIDATES[0])) == 0.5
+    assert registry.rank("product", CANDIDATES) == CANDIDATES
+
+
+def test_rank_by_success_then_time():
+    registry = SelectorRegistry()
+    for _ in range(3):
+        registry.record("product", key(CANDIDATES[0]), False, 0.01)
+        registry.record("product", key(CANDIDATES[2]), True, 0.2)
+        registry.record("product", key(CANDIDATES[1]), True, 0.05)
+    assert registry.score("product", key(CANDIDATES[1])) == 4 / 5
+    assert registry.score("product", key(CANDIDATES[0])) == 1 / 5
+    assert registry.mean_ms("product", key(CANDIDATES[2])) == 200
+    assert registry.rank("product", CANDIDATES) == [CANDIDATES[1], CANDIDATES[2], CANDIDATES[0]]
+    # statistics are per page type
+    assert registry.rank("cart", CANDIDATES) == CANDIDATES
+
+
+def test_tiers_are_never_crossed():
+    registry = SelectorRegistry()
+    generic = ("css selector", "button.a-button")
+    for _ in range(10):
+        registry.record("product", key(generic), True, 0.01)
+        registry.record("product", key(CANDIDATES[0]), False, 0.01)
+    tiered = [c + (0,) for c in CANDIDATES[:2]] + [generic + (1,)]
+    ranked = registry.rank("product", tiered, key=lambda c: selector_key(c[0], c[1]), tier=lambda c: c[2])
+    assert [c[1] for c in ranked] == ["submit.add-to-cart", "#add-to-cart-button", "button.a-button"]
+
+
+def test_old_counts_decay():
+    registry = SelectorRegistry()
+    for _ in range(51):
+        registry.record("product", "k", False, 0)
+    entry = registry.stats["product"]["k"]
+    assert entry["hits"] + entry["misses"] <= 50
+
+
+def test_saves_merge_with_other_processes(tmp_path):
+    path = str(tmp_path / "selectors.json")
+    first, second = SelectorRegistry(path), SelectorRegistry(path)
+    first.record("cart", "a", True, 0.1)
+    first.save()
+    second.record("cart", "a", False, 0.3)
+    second.record("cart", "b", True, 0.1)
+    second.save()
+    with open(path, encoding="utf-8") as f:
+        pages = json.load(f)["pages"]
+    assert pages["cart"]["a"] == {"hits": 1, "misses": 1, "ms": 400.0}
+    reloaded = SelectorRegistry(path)
+    assert reloaded.score("cart", "a") == 0.5 and reloaded.score("cart", "b") == 2 / 3
+    # a save with nothing new does not write
+    reloaded.save()
+    assert SelectorRegistry(path).stats == reloaded.stats
+
+
+def test_memory_only_registry_does_not_write(tmp_path):
+    registry = SelectorRegistry()
+    registry.record("cart", "a", True, 0.1)
+    registry.save()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_counts_recorded_while_saving_are_kept(tmp_path):
+    path = str(tmp_path / "selectors.json")
+    registry = SelectorRegistry(path)
+
+    def work():
+        # under 50 trials per selector, so no decay: the totals are exact
+        for i in range(56):
+            registry.record("cart", f"k{i % 7}", i % 2 == 0, 0.001)
+            if i % 4 == 0:
+                registry.save()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    registry.save()
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)["pages"]["cart"]
+    assert {k: (e["hits"], e["misses"]) for k, e in saved.items()} == {f"k{j}": (24, 24) for j in range(7)}
+    assert {k: (e["hits"], e["misses"]) for k, e in registry.stats["cart"].items()} == {
+        k: (e["hits"], e["misses"]) for k, e in saved.items()}
@@ -0,0 +1,19 @@
+import os
+import stat
+
+from session_cache import SessionCache
+
+
+def test_write_is_private_and_atomic(tmp_path):
+    path = tmp_path / "session.json"
+    cache = SessionCache(str(path))
+    cache.write({"cookies": [{"name": "session-id", "value": "x"}]})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert sorted(os.listdir(tmp_path)) == ["session.json"]
+    assert cache.load()["cookies"][0]["value"] == "x"
+
+
+def test_expired_state_is_not_loaded(tmp_path):
+    cache = SessionCache(str(tmp_path / "session.json"), ttl=-1)
+    cache.write({"cookies": []})
+    assert cache.load() is None
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from spatial import GridIndex
+
+
+def brute_nearest(boxes, x, y):
+    return min(range(len(boxes)), key=lambda i: ((boxes[i][0] + boxes[i][2] / 2 - x) ** 2
+                                                 + (boxes[i][1] + boxes[i][3] / 2 - y) ** 2, i))
+
+
+def brute_containing(boxes, x, y):
+    return next((i for i, (left, top, w, h) in enumerate(boxes)
+                 if left <= x <= left + w and top <= y <= top + h), None)
+
+
+@pytest.fixture
+def boxes():
+    rng = random.Random(7)
+    # result cards in a 4-column grid, plus a few odd sizes and overlaps
+    cards = [(20 + col * 330, 150 + row * 420, 310, 400) for row in range(30) for col in range(4)]
+    cards += [(rng.uniform(0, 1300), rng.uniform(0, 12000), rng.uniform(5, 900), rng.uniform(5, 900))
+              for _ in range(40)]
+    return cards
+
+
+def test_nearest_matches_a_linear_scan(boxes):
+    rng = random.Random(3)
+    index = GridIndex(boxes)
+    points = [(rng.uniform(-2000, 3500), rng.uniform(-2000, 15000)) for _ in range(500)]
+    points += [(1e6, 1e6), (-5e5, 40.0)]  # far outside the indexed area
+    for x, y in points:
+        assert index.nearest(x, y) == brute_nearest(boxes, x, y), (x, y)
+
+
+@pytest.mark.parametrize("cell_size", [None, 25, 300, 5000])
+def test_lookups_do_not_depend_on_the_cell_size(boxes, cell_size):
+    rng = random.Random(11)
+    index = GridIndex(boxes, cell_size=cell_size)
+    for _ in range(200):
+        x, y = rng.uniform(0, 1400), rng.uniform(0, 13000)
+        expected = brute_containing(boxes, x, y)
+        assert index.containing(x, y) == expected
+        assert index.locate(x, y) == (expected if expected is not None else brute_nearest(boxes, x, y))
+
+
+def test_containment_ties_go_to_the_first_box():
+    index = GridIndex([(0, 0, 100, 100), (50, 50, 100, 100)])
+    assert index.containing(75, 75) == 0
+    assert index.containing(100, 100) == 0  # edges are inclusive
+    assert index.containing(140, 140) == 1
+    assert index.containing(200, 200) is None
+
+
+def test_empty_index():
+    index = GridIndex([])
+    assert len(index) == 0
+    assert index.nearest(1, 1) is None and index.locate(1, 1) is None
@@ -0,0 +1,260 @@
+"""WebDriver command tracing: where a run's wall-clock time goes.
+
+A :class:`Tracer` wraps ``driver.execute``, the single choke point every
+Selenium call goes through (WebElement methods call their parent driver's
+``execute`` too), and records each command with its name, selector, duration
+and outcome. Commands are attributed to the innermost open span of the calling
+thread; the agent opens spans for its stages (login, search, scrape,
+inline-add, diagnostic, product-page fallback, checkout).
+
+    tracer = Tracer().activate()
+    tracer.instrument(driver)
+    ...run the agent...
+    tracer.write_chrome_trace("trace.json")   # chrome://tracing or ui.perfetto.dev
+    print(tracer.format_summary())
+
+When no tracer is active :func:`span` returns a shared no-op context manager
+and drivers are left unwrapped, so tracing costs nothing when disabled.
+"""
+import contextlib
+import functools
+import itertools
+import json
+import math
+import os
+import threading
+import time
+
+_active = None
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def active():
+    """The tracer installed by :meth:`Tracer.activate`, or None."""
+    return _active
+
+
+def span(name, **args):
+    """Span on the active tracer; a no-op context manager when tracing is off."""
+    tracer = _active
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **args)
+
+
+def traced(name):
+    """Decorator running the function inside ``span(name)``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            tracer = _active
+            if tracer is None:
+                return fn(*a, **kw)
+            with tracer.span(name):
+                return fn(*a, **kw)
+        return wrapper
+    return decorate
+
+
+def sleep(seconds, reason="sleep"):
+    """``time.sleep`` that shows up in the trace as a fixed wait."""
+    tracer = _active
+    if tracer is None:
+        time.sleep(seconds)
+        return
+    t0 = time.perf_counter()
+    time.sleep(seconds)
+    tracer._record("sleep", f"sleep:{reason}", t0, time.perf_counter(), "ok")
+
+
+def _describe(params):
+    """Short selector/target string for a command's parameters."""
+    if not params:
+        return ""
+    if "using" in params:
+        return f"{params['using']}={params.get('value')}"
+    if "url" in params:
+        return params["url"]
+    if "script" in params:
+        return " ".join(params["script"].split())[:80]
+    if "expression" in params or "functionDeclaration" in params:
+        # DevTools commands (cdp_backend)
+        return " ".join((params.get("expression") or params["functionDeclaration"]).split())[:80]
+    if "name" in params:
+        return str(params["name"])
+    return ""
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class Tracer:
+    """Collects WebDriver command events and named spans.
+
+    Events are plain dicts (``kind``, ``name``, ``target``, ``start``, ``end``,
+    ``tid``, ``span``, ``span_ids``, ``result``) with times in seconds since
+    the tracer was created. A span's statistics include its nested spans.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.events = []
+        self.spans = []
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    # --- lifecycle ---
+    def activate(self):
+        global _active
+        _active = self
+        return self
+
+    def deactivate(self):
+        global _active
+        if _active is self:
+            _active = None
+
+    def instrument(self, driver):
+        """Record every command ``driver`` (and its elements) sends. Returns the driver."""
+        if getattr(driver, "_tracer", None) is self:
+            return driver
+        original = getattr(driver, "_untraced_execute", None) or driver.execute
+        tracer = self
+
+        def execute(driver_command, params=None):
+            t0 = time.perf_counter()
+            try:
+                response = original(driver_command, params)
+            except Exception as e:
+                tracer._record("command", driver_command, t0, time.perf_counter(), type(e).__name__, params)
+                raise
+            value = response.get("value") if isinstance(response, dict) else None
+            result = f"n={len(value)}" if isinstance(value, list) else "ok"
+            tracer._record("command", driver_command, t0, time.perf_counter(), result, params)
+            return response
+
+        driver._untraced_execute = original
+        driver.execute = execute
+        driver._tracer = self
+        return driver
+
+    # --- recording ---
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, kind, name, start, end, result, params=None):
+        stack = self._stack()
+        self.events.append({
+            "kind": kind,
+            "name": name,
+            "target": _describe(params) if kind == "command" else "",
+            "start": start - self.t0,
+            "end": end - self.t0,
+            "tid": threading.get_ident(),
+            "span": stack[-1][1] if stack else None,
+            "span_ids": tuple(sid for sid, _ in stack),
+            "result": result,
+        })
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        stack = self._stack()
+        sid = next(self._ids)
+        stack.append((sid, name))
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            self.spans.append({
+                "id": sid,
+                "name": name,
+                "start": t0 - self.t0,
+                "end": time.perf_counter() - self.t0,
+                "tid": threading.get_ident(),
+                "parent": stack[-1][1] if stack else None,
+                "args": args,
+            })
+
+    # --- export ---
+    def chrome_trace(self):
+        """Events in the Chrome trace-event format (complete "X" events, microseconds)."""
+        pid = os.getpid()
+        out = []
+        for s in self.spans:
+            out.append({"name": s["name"], "cat": "span", "ph": "X", "pid": pid, "tid": s["tid"],
+                        "ts": s["start"] * 1e6, "dur": (s["end"] - s["start"]) * 1e6, "args": s["args"]})
+        for e in self.events:
+            out.append({"name": e["name"], "cat": e["kind"], "ph": "X", "pid": pid, "tid": e["tid"],
+                        "ts": e["start"] * 1e6, "dur": (e["end"] - e["start"]) * 1e6,
+                        "args": {"target": e["target"], "result": e["result"], "span": e["span"]}})
+        out.sort(key=lambda ev: (ev["ts"], -ev["dur"]))
+        return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self):
+        """Per-command and per-span timing statistics (milliseconds)."""
+        by_name = {}
+        for e in self.events:
+            by_name.setdefault(e["name"], []).append((e["end"] - e["start"]) * 1000)
+        commands = {}
+        for name, durs in by_name.items():
+            durs.sort()
+            commands[name] = {
+                "count": len(durs),
+                "total_ms": sum(durs),
+                "p50_ms": _percentile(durs, 0.5),
+                "p95_ms": _percentile(durs, 0.95),
+                "max_ms": durs[-1],
+            }
+        spans = {}
+        for s in self.spans:
+            inside = [e for e in self.events if s["id"] in e["span_ids"]]
+            wall = (s["end"] - s["start"]) * 1000
+            busy = sum((e["end"] - e["start"]) * 1000 for e in inside if e["kind"] == "command")
+            slept = sum((e["end"] - e["start"]) * 1000 for e in inside if e["kind"] == "sleep")
+            agg = spans.setdefault(s["name"], {"count": 0, "wall_ms": 0.0, "command_ms": 0.0,
+                                               "sleep_ms": 0.0, "commands": 0})
+            agg["count"] += 1
+            agg["wall_ms"] += wall
+            agg["command_ms"] += busy
+            agg["sleep_ms"] += slept
+            agg["commands"] += sum(1 for e in inside if e["kind"] == "command")
+        # log2 buckets of command latency: "<1ms", "1-2ms", "2-4ms", ...
+        histogram = {}
+        for e in self.events:
+            if e["kind"] != "command":
+                continue
+            ms = (e["end"] - e["start"]) * 1000
+            b = 0 if ms < 1 else int(math.log2(ms)) + 1
+            histogram[b] = histogram.get(b, 0) + 1
+        buckets = [("<1ms" if b == 0 else f"{2 ** (b - 1)}-{2 ** b}ms", histogram[b]) for b in sorted(histogram)]
+        return {"commands": commands, "spans": spans, "histogram": buckets}
+
+    def format_summary(self, top=15):
+        """Human-readable version of :meth:`summary`."""
+        s = self.summary()
+        lines = ["Spans (ms):  wall  in-commands  sleeping  commands"]
+        for name, v in s["spans"].items():
+            lines.append(f"  {name:<18}{v['wall_ms']:>9.0f}{v['command_ms']:>12.0f}"
+                         f"{v['sleep_ms']:>10.0f}{v['commands']:>10}")
+        lines.append("Commands (ms):  count  total  p50  p95  max")
+        ranked = sorted(s["commands"].items(), key=lambda kv: -kv[1]["total_ms"])[:top]
+        for name, v in ranked:
+            lines.append(f"  {name:<22}{v['count']:>6}{v['total_ms']:>9.0f}{v['p50_ms']:>7.1f}"
+                         f"{v['p95_ms']:>7.1f}{v['max_ms']:>8.1f}")
+        lines.append("Command latency histogram:")
+        peak = max((n for _, n in s["histogram"]), default=0)
+        for label, n in s["histogram"]:
+            lines.append(f"  {label:>12} {'#' * max(1, round(40 * n / peak))} {n}")
+        return "\n".join(lines)
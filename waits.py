@@ -0,0 +1,251 @@
+"""Browser-side readiness signals used instead of fixed ``time.sleep`` calls.
+
+Each helper is one ``execute_async_script`` round-trip: the script resolves as
+soon as the page reaches the state we care about (a MutationObserver or an
+animation frame fires) or when its own deadline passes, so the agent waits
+for the page's real response time instead of a guessed constant.
+
+Async scripts are bounded by the driver's script timeout; ``launch_browser``
+raises it above the longest wait used here.
+"""
+import time
+
+# Text that shows up in Amazon's add-to-cart confirmations (lowercase)
+CONFIRM_PHRASES = ("added to cart", "added to your cart", "item added")
+
+# Installs a MutationObserver that records the first sign of a successful add:
+# the cart badge count going up or a visible node with a confirmation phrase.
+# arguments: phrases, prev count (null = read it now), check_existing
+_ARM_CART_WATCH_JS = r"""
+var phrases = arguments[0], prevArg = arguments[1], checkExisting = arguments[2];
+var old = window.__agentCartWatch;
+if (old && old.obs) old.obs.disconnect();
+function count() {
+  var el = document.getElementById('nav-cart-count');
+  if (!el) return null;
+  var n = parseInt(el.textContent.replace(/[^0-9]/g, ''), 10);
+  return isNaN(n) ? null : n;
+}
+function phraseIn(text) {
+  text = (text || '').toLowerCase();
+  for (var i = 0; i < phrases.length; i++) if (text.indexOf(phrases[i]) >= 0) return phrases[i];
+  return null;
+}
+var st = {prev: prevArg === null ? count() : prevArg, result: null, cb: null, t0: performance.now()};
+function finish(res) {
+  if (st.result) return;
+  res.ms = performance.now() - st.t0;
+  st.result = res;
+  st.obs.disconnect();
+  if (st.cb) { var cb = st.cb; st.cb = null; cb(res); }
+}
+function countChanged() {
+  var c = count();
+  if (c !== null && c !== st.prev && (st.prev === null || c > st.prev)) {
+    finish({ok: true, how: 'cart-count', count: c});
+    return true;
+  }
+  return false;
+}
+st.obs = new MutationObserver(function (muts) {
+  if (countChanged()) return;
+  for (var i = 0; i < muts.length; i++) {
+    var m = muts[i];
+    var nodes = m.type === 'childList' ? m.addedNodes : [m.target];
+    for (var j = 0; j < nodes.length; j++) {
+      var n = nodes[j];
+      var el = n.nodeType === 1 ? n : n.parentElement;
+      if (!el || el.getClientRects().length === 0) continue;  // not rendered
+      var p = phraseIn(n.textContent);
+      if (p) { finish({ok: true, how: 'text', text: p}); return; }
+    }
+  }
+});
+st.obs.observe(document.documentElement, {
+  childList: true, subtree: true, characterData: true,
+  attributes: true, attributeFilter: ['class', 'style', 'hidden']
+});
+window.__agentCartWatch = st;
+if (checkExisting && !countChanged() && document.body) {
+  var p = phraseIn(document.body.innerText);
+  if (p) finish({ok: true, how: 'text', text: p});
+}
+return {prev: st.prev, result: st.result};
+"""
+
+# Resolves with the watch result, or {ok:false} after arguments[0] ms.
+_WAIT_CART_WATCH_JS = r"""
+var timeoutMs = arguments[0], done = arguments[arguments.length - 1];
+var st = window.__agentCartWatch;
+if (!st) { done({ok: false, how: 'not-armed'}); return; }
+if (st.result) { done(st.result); return; }
+st.cb = done;
+setTimeout(function () {
+  if (st.result) return;
+  st.obs.disconnect();
+  st.cb = null;
+  done({ok: false, how: 'timeout', ms: performance.now() - st.t0});
+}, timeoutMs);
+"""
+
+# Scroll an element to the viewport centre and resolve after two frames have painted.
+_SCROLL_INTO_VIEW_JS = r"""
+var el = arguments[0], done = arguments[arguments.length - 1];
+el.scrollIntoView({block: 'center', inline: 'nearest', behavior: 'instant'});
+requestAnimationFrame(function () { requestAnimationFrame(function () { done(true); }); });
+"""
+
+# Resolve once the DOM has seen no mutation for quietMs (or after timeoutMs).
+_DOM_QUIET_JS = r"""
+var quietMs = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var t0 = performance.now(), timer = null, finished = false;
+function finish(ok) {
+  if (finished) return;
+  finished = true;
+  obs.disconnect();
+  clearTimeout(timer);
+  clearTimeout(hard);
+  done({ok: ok, ms: performance.now() - t0});
+}
+var obs = new MutationObserver(function () {
+  clearTimeout(timer);
+  timer = setTimeout(function () { finish(true); }, quietMs);
+});
+obs.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+timer = setTimeout(function () { finish(true); }, quietMs);
+var hard = setTimeout(function () { finish(false); }, timeoutMs);
+"""
+
+# Resolve when the document is at least interactive (DOMContentLoaded fired).
+_READY_JS = r"""
+var done = arguments[arguments.length - 1];
+if (document.readyState !== 'loading') { done(document.readyState); return; }
+document.addEventListener('DOMContentLoaded', function () { done(document.readyState); });
+"""
+
+# Race several locators: resolve with the first (in list order) that matches and,
+# if required, is clickable (rendered, visible, enabled). Re-checks on every DOM
+# mutation plus a slow poll for style/layout changes that mutate nothing.
+# arguments: [[using, value, needClickable], ...], root element or null, timeoutMs
+_FIRST_OF_JS = r"""
+var locators = arguments[0], root = arguments[1] || document, timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var doc = root.ownerDocument || root, t0 = performance.now(), finished = false, obs = null, poll = null, hard = null;
+function find(using, value) {
+  try {
+    if (using === 'id') return root === document ? document.getElementById(value) : root.querySelector('#' + CSS.escape(value));
+    if (using === 'name') return root.querySelector('[name="' + CSS.escape(value) + '"]');
+    if (using === 'css selector') return root.querySelector(value);
+    if (using === 'class name') return root.querySelector('.' + CSS.escape(value));
+    if (using === 'tag name') return root.querySelector(value);
+    if (using === 'xpath') return doc.evaluate(value, root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  } catch (e) {}
+  return null;
+}
+function clickable(el) {
+  if (!el.getClientRects().length) return false;
+  var st = window.getComputedStyle(el);
+  if (st.visibility === 'hidden' || st.display === 'none') return false;
+  return !el.disabled;
+}
+function check() {
+  var matched = [], winner = -1, el = null;
+  for (var i = 0; i < locators.length; i++) {
+    var e = find(locators[i][0], locators[i][1]);
+    var ok = !!e && (!locators[i][2] || clickable(e));
+    matched.push(ok);
+    if (ok && winner < 0) { winner = i; el = e; }
+  }
+  return winner < 0 ? null : {index: winner, element: el, matched: matched};
+}
+function finish(res) {
+  if (finished) return;
+  finished = true;
+  if (obs) obs.disconnect();
+  clearInterval(poll);
+  clearTimeout(hard);
+  res.ms = performance.now() - t0;
+  done(res);
+}
+var res = check();
+if (res || timeoutMs <= 0) { finish(res || {index: -1, element: null, matched: locators.map(function () { return false; })}); return; }
+obs = new MutationObserver(function () { var r = check(); if (r) finish(r); });
+obs.observe(doc.documentElement, {childList: true, subtree: true, attributes: true});
+poll = setInterval(function () { var r = check(); if (r) finish(r); }, 100);
+hard = setTimeout(function () {
+  finish({index: -1, element: null, matched: locators.map(function () { return false; })});
+}, timeoutMs);
+"""
+
+
+def wait_for_first(driver, locators, timeout=10, root=None, clickable=True):
+    """Wait once for whichever of ``locators`` appears first.
+
+    ``locators`` are ``(by, value)`` or ``(by, value, clickable)`` tuples with
+    Selenium ``By`` strategies (id, name, xpath, css selector, class name, tag
+    name); all of them are checked in the browser on every DOM change, so the
+    worst case is one ``timeout`` rather than one per locator. ``root`` scopes
+    the search to an element (XPaths relative to it). ``timeout=0`` checks once.
+
+    Returns a dict with ``index`` (position in ``locators`` of the first match,
+    -1 on timeout), ``element``, ``matched`` (per-locator booleans at that
+    moment) and ``ms``.
+    """
+    spec = [[loc[0], loc[1], bool(loc[2]) if len(loc) > 2 else clickable] for loc in locators]
+    res = driver.execute_async_script(_FIRST_OF_JS, spec, root, int(timeout * 1000))
+    return res or {"index": -1, "element": None, "matched": [False] * len(spec), "ms": 0}
+
+
+def arm_cart_watch(driver, phrases=CONFIRM_PHRASES):
+    """Start watching for an add-to-cart confirmation; call right before the click.
+
+    Returns the cart count seen when arming (None if the badge is missing).
+    """
+    res = driver.execute_script(_ARM_CART_WATCH_JS, list(phrases), None, False) or {}
+    return res.get("prev")
+
+
+def wait_cart_confirmation(driver, prev_count=None, timeout=12, phrases=CONFIRM_PHRASES):
+    """Wait for the watch armed by :func:`arm_cart_watch` to fire.
+
+    Returns a dict with ``ok`` (bool), ``how`` ('cart-count', 'text', 'timeout')
+    and ``ms``. If the click navigated away (product-page adds usually do), the
+    new page is checked once and re-armed with the same ``prev_count``.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {"ok": False, "how": "timeout"}
+        try:
+            res = driver.execute_async_script(_WAIT_CART_WATCH_JS, int(remaining * 1000))
+            if res and res.get("how") != "not-armed":
+                return res
+        except Exception:
+            # document unloaded while waiting: the add navigated to a new page
+            pass
+        try:
+            wait_for_ready(driver)
+            res = driver.execute_script(_ARM_CART_WATCH_JS, list(phrases), prev_count, True) or {}
+            if res.get("result"):
+                return res["result"]
+        except Exception:
+            time.sleep(0.05)
+
+
+def scroll_into_view(driver, el):
+    """Centre ``el`` in the viewport and return once the scroll has painted."""
+    driver.execute_async_script(_SCROLL_INTO_VIEW_JS, el)
+
+
+def wait_for_dom_quiet(driver, quiet_ms=150, timeout=5):
+    """Return once the DOM stops changing for ``quiet_ms`` (e.g. after a variation swap)."""
+    try:
+        return driver.execute_async_script(_DOM_QUIET_JS, quiet_ms, int(timeout * 1000))
+    except Exception:
+        return {"ok": False}
+
+
+def wait_for_ready(driver):
+    """Return once the current document has finished parsing."""
+    return driver.execute_async_script(_READY_JS)